@@ -0,0 +1,102 @@
+"""
+Microbenchmark for SearchService.deduplicate_results.
+
+Compares the indexed deduplicator against the previous all-pairs loop on
+synthetic result batches and checks both keep exactly the same results.
+
+Usage (from backend/):
+    python benchmarks/dedup.py [--results 10000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_batch import ResultBatch  # noqa: E402
+from search_service import search_service  # noqa: E402
+
+BRANDS = ["Apple", "Samsung", "Sony", "Bose", "Dyson", "LG", "Anker", "Logitech", "Razer", "Google"]
+PRODUCTS = ["phone", "tablet", "laptop", "headphones", "earbuds", "speaker", "monitor", "vacuum", "keyboard", "mouse"]
+VARIANTS = ["Pro", "Max", "Lite", "Mini", "Standard", "Plus", "Ultra", "SE", "Air", "Neo"]
+EXTRAS = ["2024", "wireless", "black", "white", "128GB", "256GB", "refurbished", "bundle", "new", "edition"]
+SOURCES = ["Amazon", "Best Buy", "Walmart", "Target", "eBay", "Newegg"]
+
+
+def synthetic_results(n: int, seed: int):
+    """Listings drawn from a catalog of n/3 products, so the same product shows up from several stores"""
+    rng = random.Random(seed)
+    catalog = []
+    for _ in range(max(1, n // 3)):
+        words = [rng.choice(BRANDS), rng.choice(PRODUCTS), f"{rng.choice('ABCDEFGHKMSXZ')}{rng.randint(1, 999)}", rng.choice(VARIANTS)]
+        catalog.append((words, rng.uniform(20, 2000)))
+
+    results = ResultBatch()
+    for _ in range(n):
+        words, base_price = rng.choice(catalog)
+        title = words + rng.sample(EXTRAS, rng.randint(0, 2))
+        results.append(
+            title=" ".join(title),
+            price=round(base_price * rng.uniform(0.92, 1.08), 2),
+            currency="USD",
+            source=rng.choice(SOURCES),
+            url="https://example.com",
+            image_url=None,
+            description="",
+            rating=None,
+            review_count=None
+        )
+    return results
+
+
+def legacy_deduplicate(results):
+    """The previous O(n^2) implementation, kept here as the reference; returns kept row indices"""
+    unique_results = []
+    seen_combinations = set()
+    for position in range(len(results)):
+        title_words = set(results.title[position].lower().split())
+        signature = (frozenset(title_words), results.price[position], results.source[position])
+        is_duplicate = False
+        for seen_sig in seen_combinations:
+            title_overlap = len(signature[0].intersection(seen_sig[0])) / max(len(signature[0]), len(seen_sig[0]))
+            price_diff = abs((signature[1] or 0) - (seen_sig[1] or 0)) / max(signature[1] or 1, seen_sig[1] or 1)
+            if title_overlap > 0.7 and price_diff < 0.1:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            seen_combinations.add(signature)
+            unique_results.append(position)
+    return unique_results
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="deduplicate_results microbenchmark")
+    parser.add_argument("--results", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = synthetic_results(args.results, args.seed)
+
+    legacy, legacy_time = timed(legacy_deduplicate, results)
+    indexed, indexed_time = timed(search_service.deduplicate_results, results)
+
+    same = [(results.title[i], results.price[i], results.source[i]) for i in legacy] == list(
+        zip(indexed.title, indexed.price, indexed.source)
+    )
+    print(f"results:  {len(results)} in, {len(indexed)} kept (identical to legacy: {same})")
+    print(f"legacy:   {legacy_time * 1000:9.1f} ms")
+    print(f"indexed:  {indexed_time * 1000:9.1f} ms  ({legacy_time / indexed_time:.1f}x faster)")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Event-loop lag under mixed DB + LLM load, sync Session vs AsyncSession.
+
+Each simulated request awaits a fake LLM call and then runs a catalog query.
+A monitor task measures how late the event loop wakes it up; with the sync
+session every query stalls the loop, with the async session it should not.
+
+Usage (from backend/):
+    python benchmarks/event_loop_lag.py [--products 200000] [--requests 200] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="shopmart-bench-"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, func, insert  # noqa: E402
+
+from database import Base, engine, SessionLocal, AsyncSessionLocal, Product, close_db  # noqa: E402
+
+LLM_LATENCY = 0.05
+MONITOR_INTERVAL = 0.005
+
+
+def seed(n_products: int):
+    Base.metadata.create_all(bind=engine)
+    rows = [
+        {
+            "name": f"Product {i} {'phone' if i % 7 == 0 else 'laptop'}",
+            "category": ["electronics", "audio", "home", "gaming"][i % 4],
+            "brand": f"Brand{i % 50}",
+            "price": float(i % 2000),
+            "description": "x" * 40,
+        }
+        for i in range(n_products)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Product), rows)
+
+
+def catalog_query():
+    # Unindexed LIKE scan, roughly what a naive catalog lookup costs
+    return select(func.count(Product.id)).where(Product.name.like("%phone%"), Product.price < 1500)
+
+
+async def sync_request():
+    await asyncio.sleep(LLM_LATENCY)
+    db = SessionLocal()
+    try:
+        db.execute(catalog_query()).scalar()
+    finally:
+        db.close()
+
+
+async def async_request():
+    await asyncio.sleep(LLM_LATENCY)
+    async with AsyncSessionLocal() as db:
+        (await db.execute(catalog_query())).scalar()
+
+
+async def monitor(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(MONITOR_INTERVAL)
+        lags.append(time.perf_counter() - start - MONITOR_INTERVAL)
+
+
+async def run(mode: str, n_requests: int, concurrency: int):
+    handler = sync_request if mode == "sync" else async_request
+    semaphore = asyncio.Semaphore(concurrency)
+    lags, stop = [], asyncio.Event()
+
+    async def one():
+        async with semaphore:
+            await handler()
+
+    monitor_task = asyncio.create_task(monitor(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n_requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor_task
+
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p95 = lags_ms[int(len(lags_ms) * 0.95) - 1] if lags_ms else 0.0
+    print(
+        f"{mode:>5}: {n_requests / elapsed:8.1f} req/s | loop lag mean {statistics.mean(lags_ms):7.2f} ms "
+        f"p95 {p95:7.2f} ms max {lags_ms[-1]:7.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.products} products into {DB_PATH} ...")
+    seed(args.products)
+
+    await run("sync", args.requests, args.concurrency)
+    await run("async", args.requests, args.concurrency)
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,197 @@
+"""
+Parse-time benchmark for page_parser.
+
+Compares the previous BeautifulSoup (html.parser) extraction against the lxml
+streaming parser on product pages and a DuckDuckGo results page, and checks
+both extract the same data.
+
+The built-in pages mirror the layout of large retailer product pages (inline
+state scripts, navigation, gallery, spec tables, reviews, recommendation
+carousels). Saved pages can be added with --pages: every *.html file in the
+directory is parsed as a product page.
+
+Usage (from backend/):
+    python benchmarks/page_parser.py [--pages DIR] [--repeat 5]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_parser import PRODUCT_META_TAGS, parse_product_page, parse_search_results  # noqa: E402
+
+BASE_URL = "https://shop.example.com/p/12345"
+
+
+def product_page(seed: int) -> bytes:
+    rng = random.Random(seed)
+    name = f"{rng.choice(['Sony', 'Bose', 'Apple', 'Samsung'])} Wireless Headphones {rng.randint(100, 999)}"
+    price = round(rng.uniform(50, 500), 2)
+    state = {"products": [{"id": i, "name": f"Item {i}", "price": rng.random() * 100, "tags": ["a"] * 10}
+                          for i in range(400)]}
+    json_ld = {"@context": "https://schema.org", "@type": "Product", "name": name,
+               "offers": {"@type": "Offer", "price": price, "priceCurrency": "USD"}}
+    head = [
+        "<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'>",
+        f"<title>{name} | Example Shop</title>",
+        *(f"<link rel='preload' href='/static/chunk-{i}.js' as='script'>" for i in range(30)),
+        *(f"<meta name='x-config-{i}' content='value-{i}'>" for i in range(20)),
+        f"<meta property='og:title' content='{name}'>",
+        f"<meta property='og:description' content='Great sound from {name}'>",
+        f"<meta property='og:price:amount' content='{price}'><meta property='og:price:currency' content='USD'>",
+        "<meta property='og:image' content='https://cdn.example.com/product/main.jpg'>",
+        f"<meta name='twitter:title' content='{name}'>",
+        f"<script>window.__STATE__ = {json.dumps(state)};</script>",
+        f"<script type='application/ld+json'>{json.dumps({'@type': 'BreadcrumbList'})}</script>",
+        f"<script type='application/ld+json'>{json.dumps(json_ld)}</script>",
+        "<style>" + "".join(f".c{i}{{margin:{i}px}}" for i in range(300)) + "</style>",
+        "</head>",
+    ]
+    body = [
+        "<body><header><nav><ul>",
+        *(f"<li><a href='/c/{i}'>Category {i}</a></li>" for i in range(200)),
+        "</ul></nav></header><main>",
+        "<div class='product-image gallery'>",
+        *(f"<img src='/product/img-{i}.jpg' alt='view {i}'>" for i in range(8)),
+        "</div><div id='product-image'><img data-src='https://cdn.example.com/product/zoom.jpg'></div>",
+        f"<h1>{name}</h1><p class='price'>${price}</p>",
+        *(f"<p>Paragraph {i} about {name}: " + "excellent noise cancelling and comfort. " * 8 + "</p>" for i in range(20)),
+        "<table class='specs'>",
+        *(f"<tr><th>Spec {i}</th><td>Value {rng.randint(1, 999)}</td></tr>" for i in range(60)),
+        "</table><section class='reviews'>",
+        *(f"<div class='review'><span class='stars'>{rng.randint(1, 5)}</span><p>"
+          + "Really happy with these headphones. " * rng.randint(3, 12) + "</p></div>" for _ in range(40)),
+        "</section><section class='carousel'>",
+        *(f"<div class='card'><a href='/p/{i}'><img src='https://cdn.example.com/thumbs/{i}.jpg'>"
+          f"<span>Related {i}</span></a><span>${rng.randint(10, 400)}.99</span></div>" for i in range(60)),
+        "</section></main><footer>",
+        *(f"<a href='/help/{i}'>Help {i}</a>" for i in range(120)),
+        "</footer></body></html>",
+    ]
+    return "\n".join(head + body).encode("utf-8")
+
+
+def search_page(results: int = 30) -> bytes:
+    blocks = [
+        f"<div class='result results_links results_links_deep web-result'><div class='links_main links_deep result__body'>"
+        f"<h2 class='result__title'><a rel='nofollow' class='result__a' href='https://store{i}.example.com/item'>"
+        f"Wireless Headphones {i} - <b>Store</b></a></h2>"
+        f"<a class='result__snippet' href='https://store{i}.example.com/item'>Now only ${i + 20}.99 with free "
+        f"<b>shipping</b>. Rated 4.{i % 10} stars.</a></div></div>"
+        for i in range(results)
+    ]
+    page = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>headphones at DuckDuckGo</title>",
+            "<link rel='stylesheet' href='/dist/s.css'></head><body><div id='links' class='results'>",
+            *blocks, "</div><div class='nav-link'><form><input type='submit' value='Next'></form></div></body></html>"]
+    return "\n".join(page).encode("utf-8")
+
+
+def legacy_product(content: bytes, url: str):
+    """The previous get_product_details extraction"""
+    soup = BeautifulSoup(content, "html.parser")
+    structured_data = {}
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string)
+            if isinstance(data, dict) and data.get("@type") == "Product":
+                structured_data = data
+                break
+        except (json.JSONDecodeError, AttributeError):
+            continue
+    meta_info = {}
+    for tag_name in PRODUCT_META_TAGS:
+        meta_tag = soup.find("meta", {"property": tag_name}) or soup.find("meta", {"name": tag_name})
+        if meta_tag and meta_tag.get("content"):
+            meta_info[tag_name] = meta_tag["content"]
+    images = []
+    for selector in ['img[data-src*="product"]', 'img[src*="product"]', ".product-image img",
+                     "#product-image img", ".gallery img"]:
+        for img in soup.select(selector)[:5]:
+            src = img.get("data-src") or img.get("src")
+            if src:
+                full_url = urljoin(url, src)
+                if full_url not in images:
+                    images.append(full_url)
+    return {
+        "structured_data": structured_data,
+        "meta_info": meta_info,
+        "page_title": soup.title.string if soup.title else "",
+        "images": images,
+    }
+
+
+def legacy_search(content: bytes, limit: int = 3):
+    """The previous search_web_general result parsing"""
+    soup = BeautifulSoup(content, "html.parser")
+    listings = []
+    for result_div in soup.find_all("div", class_="result")[:limit]:
+        title_elem = result_div.find("a", class_="result__a")
+        if not title_elem:
+            continue
+        desc_elem = result_div.find("a", class_="result__snippet")
+        listings.append((title_elem.get_text(strip=True), title_elem.get("href", ""),
+                         desc_elem.get_text(strip=True) if desc_elem else ""))
+    return listings
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare(label, content, legacy_fn, new_fn, repeat):
+    same = legacy_fn(content) == new_fn(content)
+    legacy_time = best_time(lambda: legacy_fn(content), repeat)
+    new_time = best_time(lambda: new_fn(content), repeat)
+    print(f"  {label:<28} {len(content) / 1024:7.0f} KiB {legacy_time * 1000:9.1f} ms {new_time * 1000:8.1f} ms"
+          f"  ({legacy_time / new_time:5.1f}x){'' if same else '  OUTPUT DIFFERS'}")
+    return legacy_time, new_time, same
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BeautifulSoup vs lxml streaming parse benchmark")
+    parser.add_argument("--pages", help="directory of saved product pages (*.html)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = [(f"built-in product page {seed}", product_page(seed)) for seed in range(3)]
+    if args.pages:
+        for path in sorted(glob.glob(os.path.join(args.pages, "*.html"))):
+            with open(path, "rb") as f:
+                pages.append((os.path.basename(path)[:28], f.read()))
+
+    print(f"  {'page':<28} {'size':>11} {'bs4':>12} {'lxml':>11}")
+    totals = [0.0, 0.0]
+    all_same = True
+    for label, content in pages:
+        legacy_time, new_time, same = compare(
+            label, content, lambda c: legacy_product(c, BASE_URL), lambda c: parse_product_page(c, BASE_URL), args.repeat
+        )
+        totals[0] += legacy_time
+        totals[1] += new_time
+        all_same = all_same and same
+    print(f"  product pages total: {totals[0] * 1000:.1f} ms -> {totals[1] * 1000:.1f} ms "
+          f"({totals[0] / totals[1]:.1f}x faster)")
+
+    _, _, same = compare("search results (first 3)", search_page(), legacy_search, parse_search_results, args.repeat)
+    all_same = all_same and same
+
+    if not all_same:
+        print("FAIL: lxml extraction differs from the BeautifulSoup extraction")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Event-loop lag and light-request latency while product pages are being parsed,
+inline on the event loop vs in the parse pool.
+
+Each simulated scrape waits on a fake network fetch and then parses a large
+product page (built by benchmarks/page_parser.py). Alongside, light requests
+that only await a short sleep measure how long the loop keeps them waiting.
+The scrape load is stepped up; with the pool, light-request latency should
+stay flat as it grows.
+
+Usage (from backend/):
+    python benchmarks/parse_offload.py [--scrapes 10,40,80] [--workers 2]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_parser import parse_product_page  # noqa: E402
+from parse_pool import ParsePool  # noqa: E402
+from benchmarks.page_parser import BASE_URL, product_page  # noqa: E402
+
+FETCH_LATENCY = 0.02
+LIGHT_LATENCY = 0.002
+LIGHT_INTERVAL = 0.005
+
+
+async def light_requests(latencies: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LIGHT_LATENCY)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(LIGHT_INTERVAL)
+
+
+async def run(label: str, pool: ParsePool, pages: list, n_scrapes: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, stop = [], asyncio.Event()
+
+    async def scrape(i):
+        async with semaphore:
+            await asyncio.sleep(FETCH_LATENCY)
+            await pool.run(parse_product_page, pages[i % len(pages)], BASE_URL, "utf-8")
+
+    light = asyncio.create_task(light_requests(latencies, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(scrape(i) for i in range(n_scrapes)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await light
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    p95 = latencies_ms[max(int(len(latencies_ms) * 0.95) - 1, 0)]
+    print(f"  {label:<7} {n_scrapes:5d} scrapes {n_scrapes / elapsed:7.1f} pages/s | light request "
+          f"p50 {statistics.median(latencies_ms):6.1f} ms p95 {p95:6.1f} ms max {latencies_ms[-1]:6.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scrapes", default="10,40,80", help="comma-separated scrape counts")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    pages = [product_page(seed) for seed in range(4)]
+    print(f"product pages of ~{len(pages[0]) // 1024} KiB, {args.concurrency} concurrent scrapes, "
+          f"light request = {LIGHT_LATENCY * 1000:.0f} ms sleep")
+    inline = ParsePool(workers=0)
+    pool = ParsePool(workers=args.workers)
+    # Start the workers before timing
+    await asyncio.gather(*(pool.run(parse_product_page, page, BASE_URL) for page in pages))
+
+    for n_scrapes in (int(n) for n in args.scrapes.split(",")):
+        await run("inline", inline, pages, n_scrapes, args.concurrency)
+        await run("pool", pool, pages, n_scrapes, args.concurrency)
+    await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""
+Accuracy check and microbenchmark for price_extractor.
+
+Runs the labelled snippets in price_corpus.jsonl through the previous
+four-regex extractor and the combined single-pass one and reports how many
+each gets right (amount and currency). If the new extractor falls below
+--min-accuracy it lists the misses and exits with status 1 before timing
+anything, so the corpus doubles as a regression check (--check stops there).
+Otherwise it times the old extractor against the batch API over synthetic
+search snippets built from the corpus: all of it, dollar prices only, other
+currencies, and snippets without a price.
+
+Usage (from backend/):
+    python benchmarks/price_extractor.py --check
+    python benchmarks/price_extractor.py [--snippets 20000] [--min-accuracy 1.0]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_extractor import extract_price, extract_prices  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_corpus.jsonl")
+
+LEGACY_PATTERNS = [
+    r'\$\s*(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
+    r'(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)\s*dollars?',
+    r'USD\s*(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
+    r'Price:?\s*\$?(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',
+]
+
+
+def legacy_extract(text):
+    """The previous SearchService.extract_price_from_text (US dollars only)"""
+    for pattern in LEGACY_PATTERNS:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            try:
+                price = float(matches[0].replace(',', ''))
+                if 5 <= price <= 20000:
+                    return price
+            except (ValueError, AttributeError):
+                continue
+    return None
+
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check_accuracy(corpus):
+    """Share of the corpus each extractor gets right, and the new extractor's misses"""
+    legacy_hits = new_hits = 0
+    misses = []
+    batch = extract_prices(case["text"] for case in corpus)
+    for case, batched in zip(corpus, batch):
+        expected = (case["amount"], case["currency"])
+        legacy_price = legacy_extract(case["text"])
+        legacy = (legacy_price, "USD" if legacy_price is not None else None)
+        extracted = extract_price(case["text"])
+        new = (extracted.amount, extracted.currency) if extracted else (None, None)
+        legacy_hits += legacy == expected
+        if new == expected and batched == extracted:
+            new_hits += 1
+        else:
+            misses.append(f"  MISS {case['text']!r}: expected {expected}, got {new} (batch {batched})")
+    return legacy_hits / len(corpus), new_hits / len(corpus), misses
+
+
+def synthetic_snippets(corpus, n, seed):
+    """Search-result sized snippets: corpus texts with fresh numbers and surrounding copy"""
+    rng = random.Random(seed)
+    filler = [
+        "Free delivery on eligible orders.", "Rated 4.6 by 2,318 customers.", "Compare prices from 12 stores.",
+        "In stock and ready to ship.", "Official retailer with 2 year warranty.", "Trusted seller since 2009."
+    ]
+    snippets = []
+    for i in range(n):
+        text = rng.choice(corpus)["text"]
+        text = re.sub(r"\d+", lambda m: str(rng.randint(1, 9) * 10 ** (len(m.group()) - 1) + rng.randint(0, 9)), text)
+        snippets.append(f"{rng.choice(filler)} {text} {rng.choice(filler)} #{i}")
+    return snippets
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Price extractor accuracy check and microbenchmark")
+    parser.add_argument("--snippets", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--min-accuracy", type=float, default=1.0)
+    parser.add_argument("--check", action="store_true", help="only run the corpus accuracy check")
+    parser.add_argument("--verbose", action="store_true", help="list misses even when above --min-accuracy")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    legacy_accuracy, new_accuracy, misses = check_accuracy(corpus)
+    print(f"corpus of {len(corpus)} labelled snippets (amount and currency):")
+    print(f"  legacy:  {legacy_accuracy:6.1%}")
+    print(f"  single:  {new_accuracy:6.1%}")
+    if new_accuracy < args.min_accuracy or args.verbose:
+        print("\n".join(misses))
+    if new_accuracy < args.min_accuracy:
+        print(f"FAIL: accuracy {new_accuracy:.1%} is below {args.min_accuracy:.1%}")
+        sys.exit(1)
+    if args.check:
+        return
+
+    mixes = [
+        ("mixed", corpus),
+        ("dollar prices", [case for case in corpus if case["currency"] == "USD"]),
+        ("other currencies", [case for case in corpus if case["currency"] not in ("USD", None)]),
+        ("no price", [case for case in corpus if case["currency"] is None]),
+    ]
+    print(f"{args.snippets} snippets per mix:       legacy    single-pass batch")
+    for label, cases in mixes:
+        snippets = synthetic_snippets(cases, args.snippets, args.seed)
+        legacy_time = best_time(lambda: [legacy_extract(text) for text in snippets], args.repeat)
+        batch_time = best_time(lambda: extract_prices(snippets), args.repeat)
+        print(f"  {label:<18} {legacy_time * 1000:9.1f} ms {batch_time * 1000:9.1f} ms  ({legacy_time / batch_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
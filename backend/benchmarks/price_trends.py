@@ -0,0 +1,93 @@
+"""
+Microbenchmark for the vectorized price-trend engine.
+
+Builds synthetic 90-day price histories, times packing them into a
+PriceSeriesBatch and computing every product's statistics in one pass, and
+compares the slopes and percentile bands against a per-product NumPy loop.
+
+Usage (from backend/):
+    python benchmarks/price_trends.py [--products 5000] [--points 60] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_trends import EPOCH, PERCENTILES, PriceSeriesBatch, compute_trend_stats, trend_reports  # noqa: E402
+
+
+def synthetic_rows(products: int, max_points: int, seed: int):
+    """(product_id, recorded_at, price) rows ordered by product then time"""
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(days=90)
+    rows = []
+    for product_id in range(1, products + 1):
+        base_price = rng.uniform(10, 2000)
+        drift = rng.uniform(-0.004, 0.004) * base_price
+        times = sorted(start + timedelta(days=rng.uniform(0, 90)) for _ in range(rng.randint(1, max_points)))
+        for recorded_at in times:
+            days = (recorded_at - start).total_seconds() / 86400
+            rows.append((product_id, recorded_at, max(1.0, base_price + drift * days + rng.gauss(0, base_price * 0.03))))
+    return rows
+
+
+def per_product_reference(rows):
+    """Slope and percentile bands computed product by product"""
+    series = {}
+    for product_id, recorded_at, price in rows:
+        series.setdefault(product_id, ([], []))
+        series[product_id][0].append((recorded_at - EPOCH).total_seconds() / 86400)
+        series[product_id][1].append(price)
+
+    reference = {}
+    for product_id, (days, prices) in series.items():
+        days, prices = np.array(days), np.array(prices)
+        slope = np.polyfit(days - days[0], prices, 1)[0] if len(days) > 1 and np.ptp(days) > 0 else 0.0
+        reference[product_id] = (slope, np.percentile(prices, PERCENTILES))
+    return reference
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="price trend engine microbenchmark")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--points", type=int, default=60, help="maximum observations per product")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.products, args.points, args.seed)
+
+    batch, pack_time = timed(PriceSeriesBatch.from_rows, rows)
+    stats, compute_time = timed(compute_trend_stats, batch)
+    _, report_time = timed(trend_reports, batch)
+    reference, loop_time = timed(per_product_reference, rows)
+
+    max_error = 0.0
+    for i, product_id in enumerate(batch.product_ids.tolist()):
+        slope, bands = reference[product_id]
+        max_error = max(max_error, abs(stats["slope_per_day"][i] - slope))
+        max_error = max(max_error, max(abs(stats[f"p{q}"][i] - band) for q, band in zip(PERCENTILES, bands)))
+
+    print(f"series:     {len(batch)} products, {len(rows)} observations")
+    print(f"pack:       {pack_time * 1000:9.1f} ms")
+    print(f"stats:      {compute_time * 1000:9.1f} ms  ({compute_time / len(batch) * 1e6:.2f} us/product)")
+    print(f"reports:    {report_time * 1000:9.1f} ms  (stats + JSON-ready dicts)")
+    print(f"loop:       {loop_time * 1000:9.1f} ms  (per-product NumPy reference, {loop_time / compute_time:.1f}x slower)")
+    print(f"max error:  {max_error:.2e}")
+    if max_error > 1e-6:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
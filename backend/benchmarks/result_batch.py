@@ -0,0 +1,177 @@
+"""
+Memory and throughput benchmark for ResultBatch.
+
+Compares the columnar batch against the previous representation (a list of
+SearchResult dataclasses, copied into a fresh dict per result for every
+round) over the path a search round takes: build the results, rank them,
+convert them for the SearchRound and serialize them into LLM prompts.
+
+Usage (from backend/):
+    python benchmarks/result_batch.py [--results 20000] [--repeat 5]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_service import SearchRound, round_payload  # noqa: E402
+from result_batch import ResultBatch  # noqa: E402
+from ranker import rank_results  # noqa: E402
+
+QUERIES = ["wireless headphones", "noise cancelling headphones", "bose headphones"]
+
+
+@dataclass
+class SearchResult:
+    """The previous per-result representation"""
+    title: str
+    price: Optional[float]
+    currency: str
+    source: str
+    url: str
+    image_url: Optional[str]
+    description: str
+    rating: Optional[float]
+    review_count: Optional[int]
+    availability: bool = True
+    category: Optional[str] = None
+    brand: Optional[str] = None
+    features: List[str] = None
+    discount_percentage: Optional[float] = None
+
+
+def synthetic_rows(n: int, seed: int):
+    rng = random.Random(seed)
+    brands = ["Apple", "Samsung", "Sony", "Bose", "Anker", "JBL", "Sennheiser"]
+    rows = []
+    for i in range(n):
+        brand = rng.choice(brands)
+        rows.append(dict(
+            title=f"{brand} {rng.choice(QUERIES)} {rng.choice(['Pro', 'Max', 'Lite', 'Mini'])} {i}",
+            price=round(rng.uniform(20, 500), 2),
+            currency="USD",
+            source=rng.choice(["Amazon", "Best Buy", "Walmart", "Target"]),
+            url=f"https://example.com/product/{i}",
+            image_url=f"https://images.example.com/{i}.jpg",
+            description=f"High-quality {brand} headphones with premium features, model {i}",
+            rating=round(rng.uniform(3, 5), 1),
+            review_count=rng.randint(10, 5000),
+            availability=rng.random() < 0.75,
+            category="audio",
+            brand=brand,
+            features=rng.sample(["Wireless", "Noise Cancellation", "Long Battery", "Comfortable Fit"], 2),
+            discount_percentage=rng.choice([None, 5.0, 15.0, 30.0])
+        ))
+    return rows
+
+
+def legacy_round(rows):
+    results = [SearchResult(**row) for row in rows]
+
+    known_brands = ['Apple', 'Samsung', 'Sony', 'Bose', 'Dyson']
+
+    def relevance(result):
+        score = 0.0
+        for query in QUERIES:
+            if query.lower() in result.title.lower():
+                score += 10
+        if result.rating:
+            score += result.rating * 2
+        if result.availability:
+            score += 5
+        if result.brand and result.brand in known_brands:
+            score += 3
+        if result.discount_percentage and result.discount_percentage > 10:
+            score += 2
+        return score
+
+    results = sorted(results, key=relevance, reverse=True)
+    dicts = [
+        {
+            "title": r.title, "price": r.price, "currency": r.currency, "source": r.source, "url": r.url,
+            "image_url": r.image_url, "description": r.description, "rating": r.rating,
+            "review_count": r.review_count, "availability": r.availability
+        }
+        for r in results
+    ]
+    search_round = SearchRound(query="round", results=dicts, reasoning="")
+    json.dumps(dicts[:5])
+    json.dumps([search_round.dict()])
+    return results, search_round
+
+
+def batch_round(rows):
+    batch = ResultBatch()
+    for row in rows:
+        batch.append(**row)
+    batch = rank_results(batch, QUERIES)
+    records = batch.records()
+    search_round = SearchRound.model_construct(query="round", results=records, reasoning="")
+    json.dumps(records[:5])
+    json.dumps([round_payload(search_round)])
+    return batch, search_round
+
+
+def legacy_results(rows):
+    return [SearchResult(**row) for row in rows]
+
+
+def batch_results(rows):
+    batch = ResultBatch()
+    for row in rows:
+        batch.append(**row)
+    return batch
+
+
+def measure(fn, rows, repeat):
+    """Best wall time, plus bytes still held by the return value and the peak while building it"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = fn(rows)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return best, retained - before, peak - before
+
+
+def report(label, legacy, batch):
+    (legacy_time, legacy_bytes, legacy_peak), (batch_time, batch_bytes, batch_peak) = legacy, batch
+    print(f"{label}")
+    print(f"  legacy:  {legacy_time * 1000:8.1f} ms  {legacy_bytes / 1024:8.0f} KiB held  {legacy_peak / 1024:8.0f} KiB peak")
+    print(f"  batch:   {batch_time * 1000:8.1f} ms  {batch_bytes / 1024:8.0f} KiB held  {batch_peak / 1024:8.0f} KiB peak")
+    print(f"  batch runs at {legacy_time / batch_time:.2f}x legacy speed, holds {batch_bytes / legacy_bytes:.0%} "
+          f"and peaks at {batch_peak / legacy_peak:.0%} of legacy memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ResultBatch memory/throughput benchmark")
+    parser.add_argument("--results", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.results, args.seed)
+    report(f"{args.results} results held (dataclasses vs columns):",
+           measure(legacy_results, rows, args.repeat), measure(batch_results, rows, args.repeat))
+    report(f"{args.results} results through a round (build, rank, SearchRound, prompt JSON):",
+           measure(legacy_round, rows, args.repeat), measure(batch_round, rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Similar-product lookups on a synthetic catalog: LSH candidates vs a full scan.
+
+Builds the hashed TF-IDF index over generated products (brand, category, model
+names and feature lists), then times nearest-neighbour queries for stored
+products and reports the LSH results' recall against the exact top-k.
+
+Usage (from backend/):
+    python benchmarks/similarity.py [--products 50000] [--queries 500] [--k 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import product_similarity  # noqa: E402
+from product_similarity import ProductSimilarityIndex  # noqa: E402
+
+CATALOG = {
+    "electronics": (["Apple", "Samsung", "Sony", "Google", "OnePlus"],
+                    ["Phone", "Tablet", "Smartwatch", "Laptop", "Earbuds", "Headphones"],
+                    ["5G", "OLED display", "fast charging", "noise cancelling", "wireless", "long battery life"]),
+    "home": (["Dyson", "Philips", "Ninja", "iRobot", "Shark"],
+             ["Vacuum", "Air Fryer", "Blender", "Air Purifier", "Robot Mop", "Coffee Maker"],
+             ["cordless", "HEPA filter", "quiet", "smart app", "dishwasher safe", "1500W"]),
+    "fashion": (["Nike", "Adidas", "Levi's", "Zara", "Puma"],
+                ["Running Shoes", "Sneakers", "Jeans", "Jacket", "Hoodie", "T-Shirt"],
+                ["breathable", "cotton", "slim fit", "waterproof", "lightweight", "recycled"]),
+}
+
+
+def synthetic_products(n: int, seed: int):
+    rng = random.Random(seed)
+    categories = list(CATALOG)
+    for product_id in range(1, n + 1):
+        category = rng.choice(categories)
+        brands, kinds, features = CATALOG[category]
+        brand, kind = rng.choice(brands), rng.choice(kinds)
+        yield {
+            "id": product_id,
+            "name": f"{brand} {kind} {rng.choice(['Pro', 'Max', 'Lite', 'Plus', 'Mini', ''])} {rng.randint(1, 99)}".strip(),
+            "brand": brand,
+            "category": category,
+            "characteristics": {"features": rng.sample(features, 3), "pros": [], "cons": []},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    products = list(synthetic_products(args.products, args.seed))
+    index = ProductSimilarityIndex()
+    start = time.perf_counter()
+    index.add_products(products)
+    print(f"indexed {len(index)} products in {time.perf_counter() - start:.2f}s "
+          f"({index.stats()['matrix_bytes'] / 2 ** 20:.0f} MiB matrix)")
+
+    start = time.perf_counter()
+    for product in products[:200]:
+        index.add_products([{**product, "id": product["id"] + args.products}])
+    print(f"incremental adds: {(time.perf_counter() - start) / 200 * 1000:.2f} ms per product")
+
+    rng = random.Random(args.seed)
+    query_ids = [rng.randint(1, args.products) for _ in range(args.queries)]
+
+    def run(exact_below):
+        product_similarity.EXACT_SCAN_MAX_ROWS = exact_below
+        timings, results = [], []
+        for product_id in query_ids:
+            start = time.perf_counter()
+            results.append(index.similar_to_product(product_id, args.k))
+            timings.append(time.perf_counter() - start)
+        return np.array(timings) * 1000, results
+
+    exact_ms, exact = run(exact_below=sys.maxsize)
+    lsh_ms, approximate = run(exact_below=0)
+
+    # Neighbours tied on score are interchangeable: a hit is any result scoring at least the exact k-th best
+    recall = np.mean([
+        sum(score >= truth[-1][1] for _, score in found) / len(truth)
+        for found, truth in zip(approximate, exact) if truth
+    ])
+    for label, timings in (("full scan", exact_ms), ("LSH", lsh_ms)):
+        print(f"  {label:<10} p50 {np.percentile(timings, 50):6.2f} ms  p95 {np.percentile(timings, 95):6.2f} ms")
+    print(f"  LSH recall@{args.k}: {recall:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Trending engine throughput and accuracy on a synthetic interaction stream.
+
+Feeds Zipf-distributed product interactions spread over a few days through
+TrendingEngine, timing updates and top-k reads, and compares the bounded
+space-saving top-k against exact decayed counts over every product.
+
+Usage (from backend/):
+    python benchmarks/trending.py [--events 500000] [--products 100000] [--k 20]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trending import EVENT_WEIGHTS, TrendingEngine  # noqa: E402
+
+CATEGORIES = ["electronics", "home", "fashion", "sports", "books", "health", "automotive", "toys"]
+TYPES = ["view"] * 12 + ["click"] * 5 + ["like"] * 2 + ["share", "add_to_cart", "purchase"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=500_000)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--days", type=float, default=3.0)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # Popularity shifts over time: each day favours a different slice of the catalog
+    now = time.time()
+    times = np.sort(now - rng.uniform(0, args.days * 86400, args.events))
+    ranks = np.minimum(rng.zipf(1.2, args.events), args.products) - 1
+    shift = ((now - times) // 86400).astype(np.int64) * 7919
+    product_ids = (ranks + shift) % args.products + 1
+    type_rng = random.Random(args.seed)
+    types = [type_rng.choice(TYPES) for _ in range(args.events)]
+
+    engine = TrendingEngine(refresh_interval=0)
+    start = time.perf_counter()
+    for product_id, event_type, at in zip(product_ids.tolist(), types, times.tolist()):
+        engine.record_interaction(event_type, product_id, CATEGORIES[product_id % len(CATEGORIES)], at=at)
+    elapsed = time.perf_counter() - start
+    print(f"{args.events} events over {args.days:g} days into {engine.capacity} counters: "
+          f"{elapsed / args.events * 1e6:.2f} us per event ({args.events / elapsed:,.0f} events/s)")
+
+    engine.refresh_interval = 60
+    engine.top_products(args.k)  # builds the ranking
+    start = time.perf_counter()
+    for _ in range(10_000):
+        engine.top_products(args.k)
+    print(f"top-{args.k} read: {(time.perf_counter() - start) / 10_000 * 1e6:.2f} us "
+          f"(ranking rebuild every {engine.refresh_interval:g}s)")
+
+    # Exact decayed weight of every product, for comparison
+    weights = np.array([EVENT_WEIGHTS[event_type] for event_type in types])
+    decayed = weights * np.exp(-math.log(2) / engine.half_life * (now - times))
+    exact = np.bincount(product_ids, weights=decayed)
+    exact_top = set(np.argsort(-exact)[:args.k].tolist())
+    found = {product_id for product_id, _ in engine.top_products(args.k)}
+    print(f"top-{args.k} overlap with exact decayed counts: {len(found & exact_top) / args.k:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Product
+
+# BM25 column weights for products_fts: name, brand, description, characteristics
+BM25_WEIGHTS = (10.0, 5.0, 1.0, 2.0)
+
+_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+_FTS_QUERY = f"""
+    SELECT p.id, p.name, p.brand, p.category, p.price, p.currency, p.image_url,
+           p.source_url, p.ratings, p.reviews_count,
+           bm25(products_fts, {", ".join(str(w) for w in BM25_WEIGHTS)}) AS rank
+    FROM products_fts
+    JOIN products p ON p.id = products_fts.rowid
+    WHERE products_fts MATCH :match {{category_filter}}
+    ORDER BY rank
+    LIMIT :limit
+"""
+
+
+def build_match_expression(query: str) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word is quoted so user input can't inject FTS syntax; the last word
+    also matches as a prefix so partially typed queries still hit. Words are
+    OR-ed and BM25 ranks listings that match more of them first.
+    """
+    terms = _TERM_PATTERN.findall(query.lower())
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] = f"{quoted[-1]}*"
+    return " OR ".join(quoted)
+
+
+def _row_to_dict(row: Any, score: Optional[float]) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "brand": row.brand,
+        "category": row.category,
+        "price": row.price,
+        "currency": row.currency,
+        "image_url": row.image_url,
+        "source_url": row.source_url,
+        "ratings": row.ratings,
+        "reviews_count": row.reviews_count,
+        "score": score
+    }
+
+
+async def search_catalog(db: AsyncSession, query: str, limit: int = 20,
+                         category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Full-text search over stored products, best BM25 match first"""
+    match = build_match_expression(query)
+    if not match:
+        return []
+
+    if db.bind.dialect.name == "sqlite":
+        sql = _FTS_QUERY.format(category_filter="AND p.category = :category" if category else "")
+        params = {"match": match, "limit": limit}
+        if category:
+            params["category"] = category
+        result = await db.execute(text(sql), params)
+        # bm25() is lower-is-better; flip it so clients can sort descending
+        return [_row_to_dict(row, round(-row.rank, 6)) for row in result]
+
+    # Other databases: plain substring match, best rated first
+    terms = _TERM_PATTERN.findall(query.lower())
+    conditions = [
+        column.ilike(f"%{term}%")
+        for term in terms
+        for column in (Product.name, Product.brand, Product.description)
+    ]
+    statement = select(Product).where(or_(*conditions))
+    if category:
+        statement = statement.where(Product.category == category)
+    statement = statement.order_by(Product.ratings.desc()).limit(limit)
+    result = await db.execute(statement)
+    return [_row_to_dict(product, None) for product in result.scalars()]
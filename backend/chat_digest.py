@@ -0,0 +1,165 @@
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+# Prompt budget for the per-search context sent with every chat message
+CHAT_DIGEST_TOKENS = int(os.getenv("CHAT_DIGEST_TOKENS", "600"))
+# Products whose full details may be attached to a single chat turn
+MAX_DETAIL_PRODUCTS = 3
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_INDEX_PATTERN = re.compile(r"(?:#|\b(?:product|option|item|number|no\.?)\s*)(\d{1,2})\b")
+_ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5, "sixth": 6, "seventh": 7, "eighth": 8}
+# Filler words that never identify a product ("this one", "the new model")
+_GENERIC_WORDS = {"the", "and", "for", "with", "one", "this", "that", "new", "edition", "model", "usd"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token for English text)"""
+    return math.ceil(len(text) / 4)
+
+
+def _truncate(text: str, tokens: int) -> str:
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    return text[:max(limit - 3, 0)].rsplit(" ", 1)[0] + "..."
+
+
+def _money(value: Any, currency: str = "USD") -> Optional[str]:
+    try:
+        return f"{currency} {float(value):.2f}"
+    except (TypeError, ValueError):
+        return None
+
+
+def _product_line(position: int, product: Dict[str, Any], detailed: bool) -> str:
+    parts = [f"{position}. {product.get('name', 'Unknown')}"]
+    if product.get("brand"):
+        parts.append(str(product["brand"]))
+    price = _money(product.get("price"), product.get("currency", "USD"))
+    if price:
+        parts.append(price)
+    if product.get("source"):
+        parts.append(str(product["source"]))
+    if product.get("rating"):
+        reviews = f" ({product['review_count']} reviews)" if product.get("review_count") else ""
+        parts.append(f"rated {product['rating']}{reviews}")
+    if detailed:
+        for label in ("key_features", "pros", "cons"):
+            values = product.get(label) or []
+            if values:
+                parts.append(f"{label.replace('_', ' ')}: {', '.join(str(value) for value in values[:3])}")
+    return " | ".join(parts)
+
+
+def build_chat_digest(query: str, query_analysis: Dict[str, Any], product_summary: Dict[str, Any],
+                      budget: int = CHAT_DIGEST_TOKENS) -> Dict[str, Any]:
+    """
+    Compact chat context for a search, built once when the search is stored.
+
+    Returns {"text": ..., "tokens": ..., "products": [...]} where text lists
+    the query, price stats, top products and the summary's insights, filled in
+    priority order until the token budget is spent. "products" keeps each
+    product's name and brand so chat can tell which ones a question mentions.
+    """
+    products = product_summary.get("products") or []
+    price_analysis = product_summary.get("price_analysis") or {}
+
+    header = f"Search: \"{query}\""
+    context = [
+        f"{key}: {query_analysis[key]}" for key in ("category", "intent") if query_analysis.get(key)
+    ]
+    price_range = query_analysis.get("price_range") or {}
+    if price_range.get("max"):
+        context.append(f"budget: {price_range.get('min', 0)}-{price_range['max']}")
+    if context:
+        header += f" ({', '.join(context)})"
+
+    prices = []
+    for product in products:
+        try:
+            prices.append(float(product.get("price")))
+        except (TypeError, ValueError):
+            continue
+    stats = f"{len(products)} products"
+    if prices:
+        stats += f", prices {min(prices):.2f}-{max(prices):.2f}, average {sum(prices) / len(prices):.2f}"
+    if price_analysis.get("best_deal"):
+        stats += f", best deal: {price_analysis['best_deal']}"
+
+    # Must-have lines first, then products (short, then detailed), then free text
+    lines = [header, f"Results: {stats}"]
+    used = sum(estimate_tokens(line) + 1 for line in lines)
+
+    product_lines = {}
+    for detailed in (False, True):
+        for position, product in enumerate(products, start=1):
+            line = _product_line(position, product, detailed)
+            previous = product_lines.get(position)
+            cost = estimate_tokens(line) + 1 - (estimate_tokens(previous) + 1 if previous else 0)
+            if used + cost > budget:
+                break
+            product_lines[position] = line
+            used += cost
+
+    free_text = []
+    for label, key in (("Recommendation", "buying_recommendation"), ("Insights", "category_insights")):
+        text = " ".join(str(product_summary.get(key) or "").split())
+        remaining = budget - used - estimate_tokens(label) - 2
+        if text and remaining > 10:
+            line = f"{label}: {_truncate(text, remaining)}"
+            free_text.append(line)
+            used += estimate_tokens(line) + 1
+
+    if product_lines:
+        lines.append("Products:")
+        lines.extend(product_lines[position] for position in sorted(product_lines))
+    lines.extend(free_text)
+    text = "\n".join(lines)
+
+    return {
+        "text": text,
+        "tokens": estimate_tokens(text),
+        "products": [
+            {"name": product.get("name", ""), "brand": product.get("brand") or ""} for product in products
+        ]
+    }
+
+
+def referenced_products(message: str, digest_products: List[Dict[str, str]],
+                        limit: int = MAX_DETAIL_PRODUCTS) -> List[int]:
+    """
+    Zero-based positions of the products a chat message refers to, either by
+    number ("#2", "the second one", "product 3") or by distinctive name words.
+    """
+    lowered = message.lower()
+    positions = []
+
+    for match in _INDEX_PATTERN.finditer(lowered):
+        positions.append(int(match.group(1)) - 1)
+    words = set(_WORD_PATTERN.findall(lowered))
+    for word, number in _ORDINALS.items():
+        if word in words:
+            positions.append(number - 1)
+
+    # Name words shared by every product (e.g. the searched product type) don't identify one
+    name_words = [
+        set(_WORD_PATTERN.findall(f"{product['name']} {product['brand']}".lower())) - _GENERIC_WORDS
+        for product in digest_products
+    ]
+    common = set.intersection(*name_words) if len(name_words) > 1 else set()
+    scored = []
+    for position, product_words in enumerate(name_words):
+        distinctive = {word for word in product_words - common if len(word) > 2 or word.isdigit()}
+        hits = len(distinctive & words)
+        if hits:
+            scored.append((-hits, position))
+    positions.extend(position for _, position in sorted(scored))
+
+    picked = []
+    for position in positions:
+        if 0 <= position < len(digest_products) and position not in picked:
+            picked.append(position)
+    return picked[:limit]
@@ -1,14 +1,29 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import create_engine, inspect, Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON, LargeBinary, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship, deferred
 from datetime import datetime
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./shopmart.db")
 
+def _async_database_url(url: str) -> str:
+    """Map a sync database URL onto the matching asyncio driver"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_database_url(DATABASE_URL))
+
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API routers so queries never block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 class User(Base):
@@ -36,6 +51,7 @@ class Product(Base):
     brand = Column(String)
     price = Column(Float)
     currency = Column(String, default="USD")
+    source = Column(String, index=True)  # Retailer the listing came from
     source_url = Column(String)
     image_url = Column(String)
     characteristics = Column(JSON)  # Store product features
@@ -48,19 +64,42 @@ class Product(Base):
     # Relationships
     price_history = relationship("PriceHistory", back_populates="product")
 
+    # One row per listing, so ingestion can upsert on (name, source)
+    __table_args__ = (UniqueConstraint("name", "source", name="uq_products_name_source"),)
+
 class SearchHistory(Base):
     __tablename__ = "search_history"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     query = Column(String, index=True)
-    search_results = Column(JSON)  # Store search results
     search_rounds = Column(Integer, default=1)  # Number of search rounds performed
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Summary columns, enough for history listings without touching the payloads
+    results_count = Column(Integer)
+    top_products = Column(JSON)  # [{"name", "price", "currency", "source"}] for the first few products
+    price_min = Column(Float)
+    price_max = Column(Float)
+    
+    # Pre-split rows keep everything in this blob; newer rows leave it empty
+    # and store their rounds, summary and analysis in search_payloads
+    search_results = deferred(Column(JSON))
+    
     # Relationships
     user = relationship("User", back_populates="search_history")
 
+class SearchPayload(Base):
+    __tablename__ = "search_payloads"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    search_id = Column(Integer, ForeignKey("search_history.id"), index=True)
+    part = Column(String)  # 'analysis', 'summary' or 'round'
+    position = Column(Integer, default=0)  # Round number for 'round' parts
+    data = Column(LargeBinary)  # zlib-compressed JSON
+    
+    __table_args__ = (UniqueConstraint("search_id", "part", "position", name="uq_search_payloads_part"),)
+
 class PriceHistory(Base):
     __tablename__ = "price_history"
     
@@ -99,14 +138,80 @@ class Recommendation(Base):
     reason = Column(Text)  # Why this was recommended
     created_at = Column(DateTime, default=datetime.utcnow)
 
-# Database dependency
+# SQLite FTS5 index over the product catalog, kept in sync by triggers
+PRODUCT_FTS_STATEMENTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, brand, description, characteristics,
+        content='products', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, brand, description, characteristics)
+        VALUES (new.id, new.name, new.brand, new.description, new.characteristics);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand, description, characteristics)
+        VALUES ('delete', old.id, old.name, old.brand, old.description, old.characteristics);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_update
+    AFTER UPDATE OF name, brand, description, characteristics ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand, description, characteristics)
+        VALUES ('delete', old.id, old.name, old.brand, old.description, old.characteristics);
+        INSERT INTO products_fts(rowid, name, brand, description, characteristics)
+        VALUES (new.id, new.name, new.brand, new.description, new.characteristics);
+    END""",
+]
+
+def _upgrade_products_table(conn):
+    """Add the source column and (name, source) unique index to databases created before they existed"""
+    columns = {column["name"] for column in inspect(conn).get_columns("products")}
+    if "source" not in columns:
+        conn.exec_driver_sql("ALTER TABLE products ADD COLUMN source VARCHAR")
+        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_products_source ON products (source)")
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_products_name_source ON products (name, source)"
+        )
+
+def _upgrade_search_history_table(conn):
+    """Add the summary columns to search_history tables created before they existed"""
+    columns = {column["name"] for column in inspect(conn).get_columns("search_history")}
+    for name, column_type in (("results_count", "INTEGER"), ("top_products", "JSON"),
+                              ("price_min", "FLOAT"), ("price_max", "FLOAT")):
+        if name not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE search_history ADD COLUMN {name} {column_type}")
+
+def _create_product_fts(conn):
+    """Create the FTS5 catalog index and backfill it for databases created before it existed"""
+    if conn.dialect.name != "sqlite":
+        return
+    index_exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+    ).first()
+    for statement in PRODUCT_FTS_STATEMENTS:
+        conn.exec_driver_sql(statement)
+    if not index_exists:
+        conn.exec_driver_sql("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+# Database dependencies
 def get_db():
+    """Synchronous session for scripts and tooling; async endpoints use get_async_db"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 async def init_db():
     """Initialize database tables"""
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_upgrade_products_table)
+        await conn.run_sync(_upgrade_search_history_table)
+        await conn.run_sync(_create_product_fts)
+
+async def close_db():
+    """Dispose pooled connections on shutdown"""
+    await async_engine.dispose() 
\ No newline at end of file
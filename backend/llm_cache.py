@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached response stays valid, per LLMService method
+DEFAULT_TTLS = {
+    "analyze_user_query": 7 * 24 * 3600,
+    "generate_search_queries": 24 * 3600,
+    "analyze_search_results": 3600,
+    "generate_recommendations": 6 * 3600,
+    "analyze_price_trends": 6 * 3600,
+}
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Collapse insignificant whitespace so equivalent prompts share a cache key"""
+    return [
+        {"role": message.get("role", ""), "content": " ".join(str(message.get("content", "")).split())}
+        for message in messages
+    ]
+
+
+class LLMResponseCache:
+    """
+    Disk-backed LLM response cache stored in a local SQLite file.
+
+    The file is opened in WAL mode so every worker process on the host can read
+    and write the same cache concurrently, and entries survive restarts.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttls: Optional[Dict[str, int]] = None,
+                 max_entries_per_operation: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.path = path or os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.ttls = dict(DEFAULT_TTLS)
+        for operation in self.ttls:
+            env_ttl = os.getenv(f"LLM_CACHE_TTL_{operation.upper()}")
+            if env_ttl:
+                self.ttls[operation] = int(env_ttl)
+        self.ttls.update(ttls or {})
+        self.max_entries_per_operation = max_entries_per_operation or int(
+            os.getenv("LLM_CACHE_MAX_ENTRIES", "20000")
+        )
+        self.max_bytes = max_bytes or int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+        self._store = SQLiteStore(self.path, (
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                operation TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS ix_llm_cache_op_access ON llm_cache (operation, last_access)",
+            "CREATE INDEX IF NOT EXISTS ix_llm_cache_expires ON llm_cache (expires_at)",
+        ), prune=self._prune)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def make_key(self, model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        """Stable hash of model + normalized messages + sampling parameters"""
+        material = json.dumps(
+            {"model": model, "messages": normalize_messages(messages), "params": params},
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _get(self, key: str) -> Optional[str]:
+        conn = self._store.connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT response FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _set(self, operation: str, key: str, response: str):
+        conn = self._store.connection()
+        now = time.time()
+        ttl = self.ttls.get(operation, 3600)
+        conn.execute(
+            """INSERT OR REPLACE INTO llm_cache (key, operation, response, size, created_at, expires_at, last_access)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (key, operation, response, len(response.encode()), now, now + ttl, now)
+        )
+        self._store.wrote(conn)
+
+    def _prune(self, conn: sqlite3.Connection):
+        """
+        Drop expired rows, then trim the least recently used rows past the size
+        caps. Every operation in the file is trimmed, including ones this
+        process no longer writes, so none can grow past its entry cap.
+        """
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        operations = [row[0] for row in conn.execute("SELECT DISTINCT operation FROM llm_cache")]
+        for operation in operations:
+            conn.execute(
+                """DELETE FROM llm_cache WHERE operation = ? AND key NOT IN (
+                       SELECT key FROM llm_cache WHERE operation = ?
+                       ORDER BY last_access DESC LIMIT ?
+                   )""",
+                (operation, operation, self.max_entries_per_operation)
+            )
+        total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total_bytes > self.max_bytes:
+            # Evict oldest rows until roughly 10% below the byte cap
+            target = int(self.max_bytes * 0.9)
+            rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC").fetchall()
+            doomed = []
+            for key, size in rows:
+                if total_bytes <= target:
+                    break
+                doomed.append((key,))
+                total_bytes -= size
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            response = await asyncio.to_thread(self._get, key)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def set(self, operation: str, key: str, response: str):
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._set, operation, key, response)
+            self.writes += 1
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
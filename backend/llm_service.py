@@ -1,16 +1,35 @@
 import httpx
 import json
 import os
-from typing import List, Dict, Any, Optional
+import importlib.util
+import logging
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from pydantic import BaseModel
 import asyncio
+import time
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from llm_cache import LLMResponseCache
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
 class SearchRound(BaseModel):
     query: str
     results: List[Dict[str, Any]]
     reasoning: str
 
+def round_payload(search_round: SearchRound) -> Dict[str, Any]:
+    """JSON-ready view of a round that shares its results list instead of deep-copying it like .dict()"""
+    return {"query": search_round.query, "results": search_round.results, "reasoning": search_round.reasoning}
+
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except (json.JSONDecodeError, TypeError):
+        return False
+
 class LLMService:
     def __init__(self):
         self.api_key = os.getenv("OPENROUTER_API_KEY")
@@ -23,28 +42,200 @@ class LLMService:
             "X-Title": "ShopMart"
         }
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    async def call_llm(self, messages: List[Dict[str, str]], max_tokens: int = 2000) -> str:
-        """Make a call to the DeepSeek model via OpenRouter"""
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "stream": False
-            }
-            
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
+        # Connection pool settings for the shared OpenRouter client
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "60"))
+        self.connect_timeout = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+        self.max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.max_keepalive_connections = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        self.keepalive_expiry = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+        self.http2 = os.getenv("LLM_HTTP2", "false").lower() in ("1", "true", "yes")
+
+        self._client: Optional[httpx.AsyncClient] = None
+        # Created on first use, inside the running event loop
+        self._client_lock: Optional[asyncio.Lock] = None
+        self._requests = 0
+        self._new_connections = 0
+        self._tls_handshakes = 0
+
+        # Persistent response cache shared by all worker processes
+        self.response_cache = LLMResponseCache()
+
+    async def start(self):
+        """Open the shared, connection-pooled HTTP client"""
+        if self._client_lock is None:
+            self._client_lock = asyncio.Lock()
+        async with self._client_lock:
+            if self._client is not None and not self._client.is_closed:
+                return
+
+            http2 = self.http2
+            if http2 and importlib.util.find_spec("h2") is None:
+                logger.warning("LLM_HTTP2 is set but the 'h2' package is not installed, falling back to HTTP/1.1")
+                http2 = False
+
+            self._client = httpx.AsyncClient(
                 headers=self.headers,
-                json=payload
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                http2=http2
+            )
+            logger.info(
+                f"LLM client started (max_connections={self.max_connections}, "
+                f"keepalive={self.max_keepalive_connections}, http2={http2})"
             )
-            response.raise_for_status()
-            
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+
+    async def close(self):
+        """Close the shared HTTP client and release pooled connections"""
+        if self._client_lock is None:
+            return  # never started
+        async with self._client_lock:
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+                logger.info("LLM client closed")
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, opening it lazily outside the app lifespan"""
+        if self._client is None or self._client.is_closed:
+            await self.start()
+        return self._client
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        """httpcore trace hook used to count fresh connections and TLS handshakes"""
+        if event_name == "connection.connect_tcp.complete":
+            self._new_connections += 1
+        elif event_name == "connection.start_tls.complete":
+            self._tls_handshakes += 1
+
+    def connection_stats(self) -> Dict[str, Any]:
+        """Connection reuse counters for the shared client"""
+        reused = max(self._requests - self._new_connections, 0)
+        return {
+            "requests": self._requests,
+            "new_connections": self._new_connections,
+            "reused_connections": reused,
+            "tls_handshakes": self._tls_handshakes,
+            "reuse_rate": round(reused / self._requests, 4) if self._requests else 0.0
+        }
+
+    async def call_llm(self, messages: List[Dict[str, str]], max_tokens: int = 2000,
+                       timeout: Optional[float] = None, operation: Optional[str] = None) -> str:
+        """
+        Make a call to the DeepSeek model via OpenRouter.
+
+        When `operation` names a cacheable LLMService method, JSON responses are
+        served from and stored in the persistent response cache.
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "stream": False
+        }
+
+        cache_key = None
+        if operation and operation in self.response_cache.ttls:
+            cache_key = self.response_cache.make_key(
+                self.model, messages, {"max_tokens": max_tokens, "temperature": 0.7, "top_p": 0.9}
+            )
+            cached = await self.response_cache.get(cache_key)
+            metrics.inc("llm_cache_lookups_total", operation, "hit" if cached is not None else "miss")
+            if cached is not None:
+                return cached
+
+        with metrics.track("llm_call_duration_seconds", (operation or "call_llm",),
+                           errors="llm_call_errors_total", in_flight="llm_calls_in_flight"):
+            content = await self._post_completion(payload, timeout)
+
+        # Only cache answers the calling method can actually parse
+        if cache_key is not None and _is_json(content):
+            await self.response_cache.set(operation, cache_key, content)
+        return content
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def _post_completion(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> str:
+        """POST a chat completion request over the shared client"""
+        client = await self._get_client()
+
+        self._requests += 1
+        response = await client.post(
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            extensions={"trace": self._trace}
+        )
+        response.raise_for_status()
+
+        result = response.json()
+        return result["choices"][0]["message"]["content"]
+
+    async def stream_llm(self, messages: List[Dict[str, str]], max_tokens: int = 2000,
+                         timeout: Optional[float] = None, operation: Optional[str] = None,
+                         include_reasoning: bool = False) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream a completion as ("content", text) pairs as tokens arrive.
+
+        With include_reasoning, the model's reasoning tokens are yielded too as
+        ("reasoning", text) pairs. Streams are not retried or cached. Closing or
+        cancelling the generator closes the upstream response, which tells
+        OpenRouter to stop generating.
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "stream": True
+        }
+        client = await self._get_client()
+        label = operation or "stream_llm"
+
+        self._requests += 1
+        with metrics.track("llm_call_duration_seconds", (label,),
+                           errors="llm_call_errors_total", in_flight="llm_calls_in_flight"):
+            start = time.perf_counter()
+            first_token = True
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                extensions={"trace": self._trace}
+            ) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    # Blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+
+                    chunk = json.loads(data)
+                    if "error" in chunk:
+                        raise RuntimeError(f"LLM stream failed: {chunk['error']}")
+                    choices = chunk.get("choices") or []
+                    if not choices:
+                        continue
+                    delta = choices[0].get("delta") or {}
+
+                    for kind, text in (("reasoning", delta.get("reasoning")), ("content", delta.get("content"))):
+                        if not text or (kind == "reasoning" and not include_reasoning):
+                            continue
+                        if first_token:
+                            first_token = False
+                            metrics.observe("llm_first_token_seconds", time.perf_counter() - start, label)
+                        yield kind, text
 
     async def analyze_user_query(self, query: str) -> Dict[str, Any]:
         """Analyze user query to understand search intent and extract key information"""
@@ -70,7 +261,7 @@ Extract and return in JSON format:
             }
         ]
         
-        response = await self.call_llm(messages)
+        response = await self.call_llm(messages, operation="analyze_user_query")
         try:
             return json.loads(response)
         except json.JSONDecodeError:
@@ -105,7 +296,7 @@ Return a JSON array of search query strings."""
             }
         ]
         
-        response = await self.call_llm(messages)
+        response = await self.call_llm(messages, operation="generate_search_queries")
         try:
             queries = json.loads(response)
             return queries if isinstance(queries, list) else [response]
@@ -147,7 +338,7 @@ Return JSON:
             }
         ]
         
-        response = await self.call_llm(messages)
+        response = await self.call_llm(messages, operation="analyze_search_results")
         try:
             return json.loads(response)
         except json.JSONDecodeError:
@@ -198,11 +389,11 @@ Return JSON with:
             },
             {
                 "role": "user",
-                "content": f"Analyze these search results and create a product summary: {json.dumps([round.dict() for round in all_results])}"
+                "content": f"Analyze these search results and create a product summary: {json.dumps([round_payload(round) for round in all_results])}"
             }
         ]
         
-        response = await self.call_llm(messages, max_tokens=3000)
+        response = await self.call_llm(messages, max_tokens=3000, operation="generate_product_summary")
         try:
             return json.loads(response)
         except json.JSONDecodeError:
@@ -237,44 +428,35 @@ Return JSON array of recommendations:
             }
         ]
         
-        response = await self.call_llm(messages)
+        response = await self.call_llm(messages, operation="generate_recommendations")
         try:
             recommendations = json.loads(response)
             return recommendations if isinstance(recommendations, list) else []
         except json.JSONDecodeError:
             return []
 
-    async def analyze_price_trends(self, price_history: List[Dict]) -> Dict[str, Any]:
-        """Analyze price trends and predict future prices"""
+    async def analyze_price_trends(self, trend_report: Dict[str, Any]) -> Dict[str, Any]:
+        """Write a shopper-facing narrative for a trend report computed by price_trends"""
         messages = [
             {
                 "role": "system",
-                "content": """Analyze price history and trends. Return JSON:
+                "content": """You explain price statistics to shoppers. The numbers are already computed;
+do not recompute or contradict them. Return JSON:
 {
-    "trend": "increasing|decreasing|stable",
-    "confidence": 0.8,
-    "prediction": "likely to increase/decrease in next 30 days",
-    "best_time_to_buy": "now|wait|seasonal",
-    "insights": "detailed analysis"
+    "insights": "2-4 sentences explaining the trend and whether to buy now or wait"
 }"""
             },
             {
                 "role": "user",
-                "content": f"Price history: {json.dumps(price_history)}"
+                "content": f"Price trend report: {json.dumps(trend_report)}"
             }
         ]
         
-        response = await self.call_llm(messages)
+        response = await self.call_llm(messages, max_tokens=400, operation="analyze_price_trends")
         try:
             return json.loads(response)
         except json.JSONDecodeError:
-            return {
-                "trend": "stable",
-                "confidence": 0.5,
-                "prediction": "No clear prediction available",
-                "best_time_to_buy": "now",
-                "insights": "Insufficient data for analysis"
-            }
+            return {"insights": trend_report.get("insights", "")}
 
 # Global LLM service instance
 llm_service = LLMService() 
\ No newline at end of file
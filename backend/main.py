@@ -1,4 +1,5 @@
 from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -9,8 +10,15 @@ import logging
 import time
 from contextlib import asynccontextmanager
 import asyncio
+from typing import Any, Dict
 
-from database import init_db
+from database import init_db, close_db
+from llm_service import llm_service
+from search_service import search_service
+from product_similarity import similarity_index
+from trending import trending_engine
+from rate_limiter import create_rate_limiter
+from metrics import metrics
 from routers import search, users, products, recommendations
 
 load_dotenv()
@@ -28,9 +36,21 @@ async def lifespan(app: FastAPI):
     logger.info("Starting ShopMart API...")
     await init_db()
     logger.info("Database initialized successfully")
+    try:
+        await similarity_index.sync(force=True)
+    except Exception as e:
+        logger.warning(f"Similarity index not loaded, it will sync on first use: {e}")
+    try:
+        await trending_engine.warm_up()
+    except Exception as e:
+        logger.warning(f"Trending counters start empty: {e}")
+    await llm_service.start()
     yield
     # Shutdown
     logger.info("Shutting down ShopMart API...")
+    await llm_service.close()
+    await search_service.close()
+    await close_db()
 
 app = FastAPI(
     title="ShopMart API",
@@ -59,7 +79,7 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-# Request logging middleware
+# Request logging and metrics middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
@@ -68,10 +88,20 @@ async def log_requests(request: Request, call_next):
     logger.info(f"Request: {request.method} {request.url.path}")
     
     # Process request
-    response = await call_next(request)
+    metrics.add("http_requests_in_flight", 1)
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.add("http_requests_in_flight", -1)
     
     # Calculate processing time
     process_time = time.time() - start_time
+
+    # Label by route template rather than raw path to keep cardinality bounded
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", "unmatched")
+    metrics.observe("http_request_duration_seconds", process_time, request.method, route_path)
+    metrics.inc("http_requests_total", request.method, route_path, str(response.status_code))
     
     # Log response
     logger.info(
@@ -86,35 +116,26 @@ async def log_requests(request: Request, call_next):
     
     return response
 
-# Rate limiting middleware (simple implementation)
-request_counts = {}
-RATE_LIMIT = 100  # requests per minute
-RATE_LIMIT_WINDOW = 60  # seconds
+# Rate limiting middleware: sliding-window counters with per-route costs
+rate_limiter = create_rate_limiter()
 
 @app.middleware("http")
 async def rate_limit(request: Request, call_next):
-    client_ip = request.client.host
-    current_time = time.time()
-    
-    # Clean old entries
-    request_counts[client_ip] = [
-        req_time for req_time in request_counts.get(client_ip, [])
-        if current_time - req_time < RATE_LIMIT_WINDOW
-    ]
-    
-    # Check rate limit
-    if len(request_counts.get(client_ip, [])) >= RATE_LIMIT:
+    client_ip = request.client.host if request.client else "unknown"
+
+    decision = await rate_limiter.check(client_ip, request.method, request.url.path)
+    if not decision.allowed:
         logger.warning(f"Rate limit exceeded for IP: {client_ip}")
         return Response(
             content="Rate limit exceeded",
             status_code=429,
-            headers={"Retry-After": "60"}
+            headers={"Retry-After": str(decision.retry_after)}
         )
-    
-    # Add current request
-    request_counts.setdefault(client_ip, []).append(current_time)
-    
-    return await call_next(request)
+
+    response = await call_next(request)
+    response.headers["X-RateLimit-Limit"] = str(int(decision.limit))
+    response.headers["X-RateLimit-Remaining"] = str(int(decision.remaining))
+    return response
 
 # Include routers with tags
 app.include_router(search.router, prefix="/api/search", tags=["Search & AI"])
@@ -144,23 +165,82 @@ async def health_check():
         "timestamp": time.time()
     }
 
+def _cache_metrics():
+    """Cache counters exported as gauges at scrape time"""
+    search_stats = search_service.search_cache.stats()
+    llm_stats = llm_service.response_cache.stats()
+    yield "cache_hit_rate", "Cache hit rate since process start", {"cache": "search_results"}, search_stats["hit_rate"]
+    yield "cache_hit_rate", "Cache hit rate since process start", {"cache": "llm_responses"}, llm_stats["hit_rate"]
+    yield "cache_entries", "Entries held in the in-process cache", {"cache": "search_results"}, search_stats["entries"]
+    yield "cache_bytes", "Approximate bytes held in the in-process cache", {"cache": "search_results"}, search_stats["bytes"]
+    yield "cache_evictions", "Entries evicted since process start", {"cache": "search_results"}, search_stats["evictions"]
+    ranking_stats = search_service.ranking_cache.stats()
+    yield "cache_hit_rate", "Cache hit rate since process start", {"cache": "rankings"}, ranking_stats["hit_rate"]
+    yield "cache_entries", "Entries held in the in-process cache", {"cache": "rankings"}, ranking_stats["entries"]
+    yield "cache_bytes", "Approximate bytes held in the in-process cache", {"cache": "rankings"}, ranking_stats["bytes"]
+    yield "cache_evictions", "Entries evicted since process start", {"cache": "rankings"}, ranking_stats["evictions"]
+    connection_stats = llm_service.connection_stats()
+    yield "llm_connections_reused", "Upstream LLM requests served on a pooled connection", {}, connection_stats["reused_connections"]
+    yield "llm_connections_opened", "New upstream LLM connections opened", {}, connection_stats["new_connections"]
+
+metrics.register_collector(_cache_metrics)
+
+def _latency_summary(name: str) -> Dict[str, Any]:
+    return {
+        " ".join(labels): histogram.summary()
+        for labels, histogram in sorted(metrics.histograms(name).items())
+    }
+
 @app.get("/api/status", tags=["Health"])
 async def api_status():
     """Detailed API status with performance metrics"""
+    cache_stats = search_service.search_cache.stats()
+    rate_limit_stats = await rate_limiter.stats()
+
+    # Overall average across every route
+    route_histograms = metrics.histograms("http_request_duration_seconds").values()
+    total_requests = sum(h.count for h in route_histograms)
+    avg_response_ms = (
+        round(sum(h.sum for h in route_histograms) / total_requests * 1000, 2) if total_requests else None
+    )
+    llm_errors = metrics.values("llm_call_errors_total")
+
     return {
         "api_version": "2.0.0",
         "status": "operational",
         "database": "connected",
         "search_service": "active",
         "llm_service": "active" if os.getenv("OPENROUTER_API_KEY") else "fallback_mode",
-        "uptime": "calculating...",
+        "uptime": round(metrics.uptime(), 1),
+        "llm_connections": llm_service.connection_stats(),
+        "llm_cache": llm_service.response_cache.stats(),
         "performance": {
-            "avg_response_time": "< 500ms",
-            "cache_hit_rate": "85%",
-            "active_searches": len(request_counts)
-        }
+            "avg_response_time_ms": avg_response_ms,
+            "total_requests": total_requests,
+            "requests_in_flight": int(metrics.values("http_requests_in_flight")[()]),
+            "cache_hit_rate": f"{cache_stats['hit_rate']:.0%}",
+            "active_searches": int(metrics.values("search_pipelines_in_flight")[()])
+        },
+        "routes": _latency_summary("http_request_duration_seconds"),
+        "llm_calls": {
+            labels[0]: {**histogram.summary(), "errors": int(llm_errors.get(labels, 0))}
+            for labels, histogram in sorted(metrics.histograms("llm_call_duration_seconds").items())
+        },
+        "scrapes": _latency_summary("scrape_duration_seconds"),
+        "scrape_hosts": search_service.scheduler.stats(),
+        "product_page_cache": search_service.page_cache.stats(),
+        "similarity_index": similarity_index.stats(),
+        "trending": trending_engine.stats(),
+        "rate_limit": rate_limit_stats,
+        "search_cache": cache_stats,
+        "ranking_cache": search_service.ranking_cache.stats()
     }
 
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc):
@@ -0,0 +1,205 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency bucket upper bounds in seconds, from fast DB reads up to full LLM searches
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observing is a bisect and two additions"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating linearly inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    return lower
+                upper = self.bounds[i]
+                return lower + (upper - lower) * ((rank - seen) / bucket_count)
+            seen += bucket_count
+        return self.bounds[-1]
+
+    def summary(self) -> Dict[str, Any]:
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "count": self.count,
+            "avg_ms": ms(self.sum / self.count) if self.count else None,
+            "p50_ms": ms(self.quantile(0.5)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "p99_ms": ms(self.quantile(0.99))
+        }
+
+
+class _Family:
+    __slots__ = ("name", "kind", "help", "labelnames", "buckets", "series")
+
+    def __init__(self, name: str, kind: str, help: str, labelnames: Tuple[str, ...], buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series: Dict[Tuple[str, ...], Any] = {}
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    In-process metrics: counters, gauges and latency histograms keyed by label
+    values. Everything runs on the event loop thread, so updates need no locks.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._families: Dict[str, _Family] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self._families.setdefault(name, _Family(name, "counter", help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        family = self._families.setdefault(name, _Family(name, "gauge", help, labelnames))
+        if not labelnames:
+            family.series.setdefault((), 0.0)
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self._families.setdefault(name, _Family(name, "histogram", help, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]):
+        """Add a callback yielding (name, help, labels, value) gauges computed at scrape time"""
+        self._collectors.append(collector)
+
+    def inc(self, name: str, *labels: str, amount: float = 1.0):
+        series = self._families[name].series
+        series[labels] = series.get(labels, 0.0) + amount
+
+    def add(self, name: str, delta: float, *labels: str):
+        series = self._families[name].series
+        series[labels] = series.get(labels, 0.0) + delta
+
+    def observe(self, name: str, value: float, *labels: str):
+        family = self._families[name]
+        histogram = family.series.get(labels)
+        if histogram is None:
+            histogram = family.series[labels] = Histogram(family.buckets)
+        histogram.observe(value)
+
+    @contextmanager
+    def track(self, histogram: str, labels: Tuple[str, ...] = (), errors: Optional[str] = None,
+              in_flight: Optional[str] = None):
+        """Time a block into `histogram`, counting exceptions into `errors` and concurrency into `in_flight`"""
+        if in_flight:
+            self.add(in_flight, 1, *labels)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            if errors:
+                self.inc(errors, *labels)
+            raise
+        finally:
+            self.observe(histogram, time.perf_counter() - start, *labels)
+            if in_flight:
+                self.add(in_flight, -1, *labels)
+
+    def histograms(self, name: str) -> Dict[Tuple[str, ...], Histogram]:
+        return self._families[name].series
+
+    def values(self, name: str) -> Dict[Tuple[str, ...], float]:
+        return self._families[name].series
+
+    def uptime(self) -> float:
+        return time.time() - self.started_at
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for family in self._families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, value in family.series.items():
+                if family.kind == "histogram":
+                    cumulative = 0
+                    for bound, bucket_count in zip(family.buckets + (float("inf"),), value.counts):
+                        cumulative += bucket_count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        bucket_labels = _format_labels(family.labelnames, labels, f'le="{le}"')
+                        lines.append(f"{family.name}_bucket{bucket_labels} {cumulative}")
+                    lines.append(f"{family.name}_sum{_format_labels(family.labelnames, labels)} {repr(value.sum)}")
+                    lines.append(f"{family.name}_count{_format_labels(family.labelnames, labels)} {value.count}")
+                else:
+                    lines.append(f"{family.name}{_format_labels(family.labelnames, labels)} {_format_value(value)}")
+
+        seen_help = set()
+        for collector in self._collectors:
+            for name, help, labels, value in collector():
+                if name not in seen_help:
+                    seen_help.add(name)
+                    lines.append(f"# HELP {name} {help}")
+                    lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+
+        lines.append("# HELP process_uptime_seconds Seconds since the API process started")
+        lines.append("# TYPE process_uptime_seconds gauge")
+        lines.append(f"process_uptime_seconds {self.uptime():.3f}")
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+metrics.histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+metrics.counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+metrics.gauge("http_requests_in_flight", "HTTP requests currently being processed")
+metrics.gauge("search_pipelines_in_flight", "Multi-round product searches currently running")
+metrics.counter("search_coalesced_total", "Searches served by joining an identical in-flight search")
+metrics.histogram("llm_call_duration_seconds", "Upstream LLM call latency by LLMService method", ("operation",))
+metrics.histogram("llm_first_token_seconds", "Time until a streamed LLM call yields its first token", ("operation",))
+metrics.counter("llm_call_errors_total", "Failed LLM calls by LLMService method", ("operation",))
+metrics.gauge("llm_calls_in_flight", "LLM calls currently waiting on the upstream model", ("operation",))
+metrics.counter("llm_cache_lookups_total", "LLM response cache lookups", ("operation", "result"))
+metrics.histogram("scrape_duration_seconds", "Outbound scrape latency by source", ("source",))
+metrics.counter("scrape_errors_total", "Failed outbound scrapes by source", ("source",))
+metrics.histogram("page_parse_duration_seconds", "Scraped page parse time, inline or in the parse pool", ("mode",))
+metrics.histogram("page_parse_queue_wait_seconds", "Time a page waited for a parse pool slot")
+metrics.gauge("page_parses_pending", "Pages queued or parsing in the parse pool")
+metrics.histogram("scrape_queue_wait_seconds", "Time an outbound scrape waited for a request slot", ("priority",))
+metrics.counter("scrape_backoffs_total", "Times a scraped host answered 429/503 and was paused")
+metrics.counter("scrape_queue_timeouts_total", "Outbound scrapes given up after waiting too long for a request slot", ("priority",))
+metrics.counter("product_page_cache_lookups_total", "Product page cache lookups: fresh hit, revalidated by a 304, or miss", ("result",))
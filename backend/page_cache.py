@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from metrics import metrics
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Seconds a scraped product page is served without asking the retailer again
+DEFAULT_FRESHNESS = 3600
+
+
+def _load_domain_freshness() -> Dict[str, int]:
+    """PAGE_CACHE_DOMAIN_FRESHNESS_JSON: {"domain": seconds}, covering its subdomains too"""
+    raw = os.getenv("PAGE_CACHE_DOMAIN_FRESHNESS_JSON")
+    if not raw:
+        return {}
+    try:
+        return {domain.lower().lstrip("."): int(seconds) for domain, seconds in json.loads(raw).items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid PAGE_CACHE_DOMAIN_FRESHNESS_JSON: {e}")
+        return {}
+
+
+class CachedPage(NamedTuple):
+    details: Dict[str, Any]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Validators to send, so an unchanged page comes back as an empty 304"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ProductPageCache:
+    """
+    Disk-backed cache of extracted product page details, keyed by URL, with the
+    ETag/Last-Modified validators they were served with.
+
+    A page is served straight from the cache while fresh (per-domain freshness).
+    After that it is kept for revalidation until max_age, so a changed page is
+    re-downloaded and re-parsed but an unchanged one only costs a 304. Like the
+    LLM response cache, the SQLite file is in WAL mode, shared by every worker
+    process and kept across restarts.
+    """
+
+    def __init__(self, path: Optional[str] = None, freshness: Optional[int] = None,
+                 domain_freshness: Optional[Dict[str, int]] = None, max_age: Optional[int] = None,
+                 max_entries: Optional[int] = None):
+        self.path = path or os.getenv("PAGE_CACHE_PATH", "./page_cache.db")
+        self.enabled = os.getenv("PAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.freshness = freshness if freshness is not None else int(os.getenv("PAGE_CACHE_FRESHNESS", str(DEFAULT_FRESHNESS)))
+        self.domain_freshness = domain_freshness if domain_freshness is not None else _load_domain_freshness()
+        self.max_age = max_age or int(os.getenv("PAGE_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+        self.max_entries = max_entries or int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "50000"))
+
+        self._store = SQLiteStore(self.path, (
+            """CREATE TABLE IF NOT EXISTS product_pages (
+                url TEXT PRIMARY KEY,
+                details TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                fresh_until REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS ix_product_pages_access ON product_pages (last_access)",
+        ), prune=self._prune)
+
+        self.hits = 0
+        self.revalidated = 0
+        self.stale = 0
+        self.misses = 0
+
+    def freshness_for(self, host: str) -> int:
+        """Freshness of the most specific configured domain the host belongs to"""
+        host = host.lower()
+        while host:
+            if host in self.domain_freshness:
+                return self.domain_freshness[host]
+            host = host.partition(".")[2]
+        return self.freshness
+
+    def _get(self, url: str) -> Optional[CachedPage]:
+        conn = self._store.connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT details, etag, last_modified, fresh_until FROM product_pages WHERE url = ? AND fetched_at > ?",
+            (url, now - self.max_age)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE product_pages SET last_access = ? WHERE url = ?", (now, url))
+        details, etag, last_modified, fresh_until = row
+        return CachedPage(json.loads(details), etag, last_modified, fresh_until > now)
+
+    def _set(self, url: str, host: str, details: Dict[str, Any], etag: Optional[str], last_modified: Optional[str]):
+        conn = self._store.connection()
+        now = time.time()
+        conn.execute(
+            """INSERT OR REPLACE INTO product_pages (url, details, etag, last_modified, fetched_at, fresh_until, last_access)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (url, json.dumps(details), etag, last_modified, now, now + self.freshness_for(host), now)
+        )
+        self._store.wrote(conn)
+
+    def _touch(self, url: str, host: str, etag: Optional[str], last_modified: Optional[str]):
+        """The page is unchanged: restart its freshness, taking any updated validators"""
+        now = time.time()
+        self._store.connection().execute(
+            """UPDATE product_pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified),
+                   fetched_at = ?, fresh_until = ?, last_access = ? WHERE url = ?""",
+            (etag, last_modified, now, now + self.freshness_for(host), now, url)
+        )
+
+    def _delete(self, url: str):
+        self._store.connection().execute("DELETE FROM product_pages WHERE url = ?", (url,))
+
+    def _prune(self, conn: sqlite3.Connection):
+        """Drop pages too old to revalidate, then the least recently used past max_entries"""
+        conn.execute("DELETE FROM product_pages WHERE fetched_at <= ?", (time.time() - self.max_age,))
+        conn.execute(
+            """DELETE FROM product_pages WHERE url NOT IN (
+                   SELECT url FROM product_pages ORDER BY last_access DESC LIMIT ?
+               )""",
+            (self.max_entries,)
+        )
+
+    async def get(self, url: str) -> Optional[CachedPage]:
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._get, url)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Product page cache read failed: {e}")
+            return None
+
+    async def set(self, url: str, host: str, details: Dict[str, Any], etag: Optional[str], last_modified: Optional[str]):
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._set, url, host, details, etag, last_modified)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Product page cache write failed: {e}")
+
+    async def touch(self, url: str, host: str, etag: Optional[str], last_modified: Optional[str]):
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._touch, url, host, etag, last_modified)
+        except sqlite3.Error as e:
+            logger.warning(f"Product page cache write failed: {e}")
+
+    async def delete(self, url: str):
+        """Forget a page, e.g. one the retailer now marks no-store"""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._delete, url)
+        except sqlite3.Error as e:
+            logger.warning(f"Product page cache write failed: {e}")
+
+    def record(self, result: str):
+        """Count a lookup outcome: hit, revalidated, stale (served after a failed refetch) or miss"""
+        if result == "hit":
+            self.hits += 1
+        elif result == "revalidated":
+            self.revalidated += 1
+        elif result == "stale":
+            self.stale += 1
+        else:
+            self.misses += 1
+        metrics.inc("product_page_cache_lookups_total", result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup counters for this process: served fresh, confirmed by a 304, served stale on error, or fetched"""
+        lookups = self.hits + self.revalidated + self.stale + self.misses
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "stale": self.stale,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,166 @@
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin
+
+from lxml import etree
+
+# Meta tags kept from product pages, matched on property= first, then name=
+PRODUCT_META_TAGS = (
+    "og:title", "og:description", "og:price:amount",
+    "og:price:currency", "og:image", "product:price:amount",
+    "product:price:currency", "twitter:title", "twitter:description",
+)
+# Images taken from each rule, which are tried in this order
+MAX_IMAGES_PER_RULE = 5
+
+# Pages are fed to the parser in chunks so search result parsing can stop early
+_CHUNK_SIZE = 16 * 1024
+_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+
+def decode_html(content: bytes, encoding: Optional[str] = None) -> str:
+    """Page text, using the given encoding, else the page's own <meta charset>, else UTF-8 (cp1252 as a last resort)"""
+    if not encoding:
+        declared = _CHARSET_PATTERN.search(content[:2048])
+        encoding = declared.group(1).decode("ascii") if declared else "utf-8"
+    try:
+        return content.decode(encoding)
+    except (LookupError, UnicodeDecodeError):
+        try:
+            return content.decode("utf-8")
+        except UnicodeDecodeError:
+            return content.decode("cp1252", errors="replace")
+
+
+def _iter_elements(html: str, tags: Sequence[str]) -> Iterator[etree._Element]:
+    """Completed elements with the given tags, in document order, parsing only as far as the caller reads"""
+    parser = etree.HTMLPullParser(events=("end",), tag=tags)
+    for offset in range(0, len(html), _CHUNK_SIZE):
+        parser.feed(html[offset:offset + _CHUNK_SIZE])
+        for _, element in parser.read_events():
+            yield element
+    parser.close()
+    for _, element in parser.read_events():
+        yield element
+
+
+def _classes(element: etree._Element) -> List[str]:
+    return (element.get("class") or "").split()
+
+
+def _text(element: etree._Element) -> str:
+    """Stripped text of the element and its descendants, joined like BeautifulSoup's get_text(strip=True)"""
+    return "".join(text.strip() for text in element.itertext())
+
+
+def parse_search_results(content: bytes, limit: int = 3, encoding: Optional[str] = None) -> List[Tuple[str, str, str]]:
+    """
+    (title, url, snippet) for the first `limit` DuckDuckGo result blocks.
+
+    Parsing stops after the last block needed, so the rest of the page is never read.
+    """
+    listings = []
+    blocks = 0
+    for div in _iter_elements(decode_html(content, encoding), ("div",)):
+        if "result" not in _classes(div):
+            continue
+        blocks += 1
+        title, snippet = None, None
+        for link in div.iter("a"):
+            classes = _classes(link)
+            if title is None and "result__a" in classes:
+                title = link
+            elif snippet is None and "result__snippet" in classes:
+                snippet = link
+        if title is not None:
+            listings.append((_text(title), title.get("href", ""), _text(snippet) if snippet is not None else ""))
+        if blocks >= limit:
+            break
+    return listings
+
+
+def _json_ld_product(script: etree._Element) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(script.text or "")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) and data.get("@type") == "Product" else None
+
+
+def _image_rules(img: etree._Element) -> List[int]:
+    """
+    Which image rules an <img> matches, in rule order: data-src or src mentioning
+    "product", or inside .product-image, #product-image or .gallery.
+    """
+    rules = []
+    if "product" in (img.get("data-src") or ""):
+        rules.append(0)
+    if "product" in (img.get("src") or ""):
+        rules.append(1)
+    in_product_image = in_product_image_id = in_gallery = False
+    for ancestor in img.iterancestors():
+        classes = _classes(ancestor)
+        in_product_image = in_product_image or "product-image" in classes
+        in_product_image_id = in_product_image_id or ancestor.get("id") == "product-image"
+        in_gallery = in_gallery or "gallery" in classes
+    rules.extend(rule for rule, matched in ((2, in_product_image), (3, in_product_image_id), (4, in_gallery)) if matched)
+    return rules
+
+
+def parse_product_page(content: bytes, url: str, encoding: Optional[str] = None) -> Dict[str, Any]:
+    """
+    JSON-LD Product data, product meta tags, page title and product images of a page.
+
+    Only <meta>, <title>, JSON-LD <script> and <img> elements are looked at, and
+    each is visited once.
+    """
+    structured_data: Dict[str, Any] = {}
+    by_property: Dict[str, Optional[str]] = {}
+    by_name: Dict[str, Optional[str]] = {}
+    page_title = None
+    rule_images: List[List[Optional[str]]] = [[] for _ in range(5)]
+    wanted = set(PRODUCT_META_TAGS)
+
+    for element in _iter_elements(decode_html(content, encoding), ("meta", "title", "script", "img")):
+        tag = element.tag
+        if tag == "meta":
+            # The first tag per key wins, even when its content is empty
+            prop, name = element.get("property"), element.get("name")
+            if prop in wanted and prop not in by_property:
+                by_property[prop] = element.get("content")
+            if name in wanted and name not in by_name:
+                by_name[name] = element.get("content")
+        elif tag == "title":
+            if page_title is None:
+                page_title = element.text or ""
+        elif tag == "script":
+            if not structured_data and element.get("type") == "application/ld+json":
+                structured_data = _json_ld_product(element) or {}
+        else:
+            # Like the CSS selectors this replaces, the first matches count even without a source
+            src = element.get("data-src") or element.get("src")
+            for rule in _image_rules(element):
+                if len(rule_images[rule]) < MAX_IMAGES_PER_RULE:
+                    rule_images[rule].append(src)
+        element.clear(keep_tail=True)
+
+    meta_info = {}
+    for tag_name in PRODUCT_META_TAGS:
+        content_value = by_property[tag_name] if tag_name in by_property else by_name.get(tag_name)
+        if content_value:
+            meta_info[tag_name] = content_value
+
+    images = []
+    for sources in rule_images:
+        for src in filter(None, sources):
+            full_url = urljoin(url, src)
+            if full_url not in images:
+                images.append(full_url)
+
+    return {
+        "structured_data": structured_data,
+        "meta_info": meta_info,
+        "page_title": page_title or "",
+        "images": images,
+    }
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ParsePool:
+    """
+    Process pool for CPU-bound page parsing, so a large page never stalls the
+    event loop. Tasks take raw response bytes and return plain data, so they
+    pickle cheaply both ways.
+
+    Documents under inline_max_bytes are parsed inline, where the round trip
+    to a worker would cost more than the parse. At most max_pending parses are
+    queued or running; further callers wait for a slot. Workers are recycled
+    after about max_tasks_per_child parses each, to bound memory held by the
+    parser: the whole pool is swapped for a fresh one, and the old workers
+    exit once their queued parses are done. (ProcessPoolExecutor's own
+    max_tasks_per_child can deadlock when it replaces a worker on 3.11.)
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 max_tasks_per_child: Optional[int] = None, inline_max_bytes: Optional[int] = None):
+        self.workers = workers if workers is not None else int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_pending = max_pending or int(os.getenv("PARSE_MAX_PENDING", str(max(self.workers, 1) * 4)))
+        self.max_tasks_per_child = max_tasks_per_child or int(os.getenv("PARSE_MAX_TASKS_PER_CHILD", "200"))
+        self.inline_max_bytes = (inline_max_bytes if inline_max_bytes is not None
+                                 else int(os.getenv("PARSE_INLINE_MAX_BYTES", str(32 * 1024))))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._submitted = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is not None and self._submitted >= self.workers * self.max_tasks_per_child:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._executor is None:
+            # Workers start on demand; spawn (not fork) keeps them free of the server's threads and sockets
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            self._submitted = 0
+            logger.debug(f"Parse pool started (workers={self.workers}, max_pending={self.max_pending})")
+        self._submitted += 1
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], content: bytes, *args: Any) -> Any:
+        """fn(content, *args), in a worker process unless the document is small or the pool is disabled"""
+        if self.workers <= 0 or len(content) <= self.inline_max_bytes:
+            with metrics.track("page_parse_duration_seconds", ("inline",)):
+                return fn(content, *args)
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        wait_start = time.perf_counter()
+        async with self._slots:
+            metrics.observe("page_parse_queue_wait_seconds", time.perf_counter() - wait_start)
+            metrics.add("page_parses_pending", 1)
+            try:
+                with metrics.track("page_parse_duration_seconds", ("pool",)):
+                    executor = self._get_executor()
+                    return await asyncio.get_running_loop().run_in_executor(executor, fn, content, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); replace the pool and parse this one inline
+                logger.warning("Parse pool broken, restarting it")
+                if self._executor is executor:
+                    self._executor = None
+                    executor.shutdown(wait=False, cancel_futures=True)
+                return fn(content, *args)
+            finally:
+                metrics.add("page_parses_pending", -1)
+
+    async def close(self):
+        """Stop the workers, dropping parses that have not started"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+            logger.info("Parse pool closed")
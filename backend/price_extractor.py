@@ -0,0 +1,190 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# Currency markers, mapped to ISO codes. The longest marker at a position wins,
+# so "US$" is read as US dollars and "C$" as Canadian ones rather than "$".
+_PREFIX_CURRENCIES = {
+    "US$": "USD", "C$": "CAD", "CA$": "CAD", "A$": "AUD", "AU$": "AUD", "R$": "BRL",
+    "$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY", "₹": "INR", "₩": "KRW",
+    "USD": "USD", "EUR": "EUR", "GBP": "GBP", "JPY": "JPY", "INR": "INR",
+    "CAD": "CAD", "AUD": "AUD", "CHF": "CHF", "Rs.": "INR", "Rs": "INR",
+}
+_SUFFIX_CURRENCIES = {
+    "€": "EUR", "£": "GBP", "¥": "JPY", "円": "JPY", "₹": "INR", "zł": "PLN", "kr": "SEK",
+    "USD": "USD", "EUR": "EUR", "GBP": "GBP", "JPY": "JPY", "INR": "INR", "CAD": "CAD",
+    "AUD": "AUD", "CHF": "CHF", "PLN": "PLN", "SEK": "SEK",
+    "dollars": "USD", "dollar": "USD", "euros": "EUR", "euro": "EUR",
+    "pounds": "GBP", "pound": "GBP", "yen": "JPY", "rupees": "INR",
+}
+
+# Rough units per US dollar, only used to scale the plausibility bounds
+_UNIT_SCALE = {"JPY": 150, "INR": 85, "KRW": 1400, "SEK": 11, "PLN": 4, "BRL": 5}
+
+# Plausible price bounds in dollar terms; amounts outside are skipped (e.g. "$3 off", model numbers)
+MIN_PRICE = 5.0
+MAX_PRICE = 20000.0
+
+
+def _variants(markers: Dict[str, str]) -> Dict[str, str]:
+    """Spellings to match for each marker: codes and symbols as written, words in any usual case"""
+    spellings = {}
+    for marker, code in markers.items():
+        spellings[marker] = code
+        if marker.isalpha() and not marker.isupper():  # "dollars", "Dollars", "DOLLARS"
+            spellings[marker.capitalize()] = spellings[marker.upper()] = code
+    return spellings
+
+
+def _trie(markers: Iterable[str], first_consumed: bool = False) -> str:
+    """
+    Regex alternation over the markers, factored into a trie so each position is
+    rejected by a single character comparison. The longest marker wins, and
+    letter markers must not run into other letters ("EUR" but not "EUROPE",
+    "kr" but not "kraft"); digits may touch them ("49.99USD").
+
+    With first_consumed the markers' first character has already been matched,
+    and the trie only checks which one it was.
+    """
+    root = {}
+    for marker in markers:
+        node = root
+        for char in marker:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def is_letter(char):
+        return char.isascii() and char.isalpha()
+
+    def emit(node, previous, depth):
+        branches = []
+        for char in sorted(char for char in node if char):
+            branch = rf"(?<={re.escape(char)})" if depth == 0 and first_consumed else re.escape(char)
+            if depth == 0 and is_letter(char):
+                branch += r"(?<![A-Za-z].)"
+            branches.append(branch + emit(node[char], char, depth + 1))
+        if "" in node:
+            branches.append(r"(?![A-Za-z])" if is_letter(previous) else "")
+        if len(branches) == 1:
+            return branches[0]
+        return f"(?:{'|'.join(branches)})"
+
+    trie = emit(root, "", 0)
+    # One class check turns away every other first character before the per-marker checks
+    first_chars = "[" + "".join(sorted({re.escape(char) for char in root if char})) + "]"
+    return f"(?<={first_chars}){trie}" if first_consumed else f"(?={first_chars}){trie}"
+
+
+_PREFIX_LOOKUP = _variants(_PREFIX_CURRENCIES)
+_SUFFIX_LOOKUP = _variants(_SUFFIX_CURRENCIES)
+_LABELS = ("price", "Price", "PRICE")
+
+# Digits with "," or "." groups, or thin/non-breaking space and apostrophe thousands groups.
+_NUMBER_BODY = r"\d*(?:[.,]\d+|[ '\u00a0\u202f]\d{3}(?!\d))*"
+
+
+def _number_tail(name: str) -> str:
+    """
+    The number body, matched atomically so a number is never cut short to satisfy
+    what follows it ("12,99 EUR" is not "12,9"). A lookahead is never backtracked
+    into, so capturing in one and matching the capture back stands in for an
+    atomic group (only native from Python 3.11). Each use needs its own group name.
+    """
+    return rf"(?=(?P<{name}>{_NUMBER_BODY}))(?P={name})"
+
+
+_SUFFIX = _trie(_SUFFIX_LOOKUP)
+
+# Every candidate starts with a digit, a prefix marker or a label. Leading with that one
+# character class lets the regex engine skip straight to those positions; the branches
+# then tell from the character just matched which kind of candidate it is.
+_FIRST_CHAR = "[\\d" + "".join(sorted({re.escape(marker[0]) for marker in (*_PREFIX_LOOKUP, *_LABELS)})) + "]"
+
+# One pass finds every candidate in text order: "$1,299.99", "1.299,99 €", "Price: 49.99".
+# A suffixed number must start a number that is not part of a model name ("S24 £1,049"
+# is £1,049), and a labelled number followed by a currency is left to the suffix branch.
+PRICE_PATTERN = re.compile(
+    rf"{_FIRST_CHAR}(?:"
+    rf"(?<=\d)(?<![A-Za-z\d.,].){_number_tail('suffixed_tail')}\s?(?P<suffix>{_SUFFIX})(?!\s?\d)"
+    rf"|{_trie(_PREFIX_LOOKUP, first_consumed=True)}\s?(?P<prefixed>\d{_number_tail('prefixed_tail')})"
+    rf"|{_trie(_LABELS, first_consumed=True)}\s*:?\s*(?P<labelled>\d{_number_tail('labelled_tail')})(?!\s?{_SUFFIX}))"
+)
+
+# The common "$1,234.56", led by a literal so the engine only has to scan for "$". Letters
+# before the "$" ("US$", "C$") and anything that would extend the number are left to
+# PRICE_PATTERN, so the amount read here is the one it would read at the same spot.
+_DOLLAR_PATTERN = re.compile(r"\$(?<![A-Za-z$]\$)\s?(\d{1,3}(?:,\d{3})*(?:\.\d\d)?)(?![.,' \u00a0\u202f]?\d)")
+
+_GROUPING = str.maketrans("", "", " '\u00a0\u202f")
+
+
+class ExtractedPrice(NamedTuple):
+    amount: float
+    currency: str
+
+
+def parse_number(text: str) -> Optional[float]:
+    """
+    Read a locale-formatted number: "1,234.56", "1.234,56", "1 234,56",
+    "1'234.56", "12,99", "1,23,456". When only one separator kind appears, a
+    single group of one or two digits is a decimal part, otherwise grouping.
+    """
+    text = text.translate(_GROUPING)
+    last_dot, last_comma = text.rfind("."), text.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        decimal, grouping = (".", ",") if last_dot > last_comma else (",", ".")
+        text = text.replace(grouping, "").replace(decimal, ".")
+    elif last_dot >= 0 or last_comma >= 0:
+        separator, position = (".", last_dot) if last_dot >= 0 else (",", last_comma)
+        trailing = len(text) - position - 1
+        if trailing <= 2 and text.count(separator) == 1:
+            text = text.replace(",", ".")
+        elif trailing == 3 and all(len(group) in (2, 3) for group in text.split(separator)[1:]):
+            text = text.replace(separator, "")
+        else:
+            return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def extract_price(text: str, default_currency: str = "USD", min_price: float = MIN_PRICE,
+                  max_price: float = MAX_PRICE) -> Optional[ExtractedPrice]:
+    """
+    First plausible price in the text, or None. A plain dollar amount
+    ("$1,234.56") is taken before anything else, as the legacy extractor did:
+    it is the common case and prices are compared in dollars. Numbers
+    labelled "Price" but without a currency marker are taken to be in
+    default_currency.
+    """
+    dollar = _DOLLAR_PATTERN.search(text)
+    while dollar is not None:
+        amount = float(dollar.group(1).replace(",", ""))
+        if min_price <= amount <= max_price:
+            return ExtractedPrice(amount, "USD")
+        dollar = _DOLLAR_PATTERN.search(text, dollar.end())
+
+    search = PRICE_PATTERN.search
+    match = search(text)
+    while match is not None:
+        kind = match.lastgroup
+        # Markers and suffixed numbers begin at the match start, which no group can
+        # cover without hiding the leading character class from the engine
+        if kind == "suffix":
+            number, currency = text[match.start():match.start("suffix")].rstrip(), _SUFFIX_LOOKUP[match.group("suffix")]
+        elif kind == "prefixed":
+            number, currency = match.group("prefixed"), _PREFIX_LOOKUP[text[match.start():match.start("prefixed")].rstrip()]
+        else:
+            number, currency = match.group("labelled"), default_currency
+        amount = float(number) if number.isdigit() else parse_number(number)
+        scale = _UNIT_SCALE.get(currency, 1)
+        if amount is not None and min_price * scale <= amount <= max_price * scale:
+            return ExtractedPrice(amount, currency)
+        match = search(text, match.end())
+    return None
+
+
+def extract_prices(texts: Iterable[str], default_currency: str = "USD", min_price: float = MIN_PRICE,
+                   max_price: float = MAX_PRICE) -> List[Optional[ExtractedPrice]]:
+    """First plausible price of each text (snippets or whole page texts), in input order"""
+    return [extract_price(text, default_currency, min_price, max_price) for text in texts]
@@ -0,0 +1,222 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Product, PriceHistory
+
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400.0
+
+# Projected 30-day move (relative to the mean price) that counts as a trend
+TREND_THRESHOLD = 0.02
+# Observations needed before confidence is no longer scaled down
+FULL_CONFIDENCE_POINTS = 10
+PERCENTILES = (10, 25, 50, 75, 90)
+MOVING_AVERAGE_WINDOWS = (7, 30)
+
+
+class PriceSeriesBatch:
+    """
+    Price histories for many products packed into flat arrays.
+
+    Observations are sorted by (product, time); product i owns the slice
+    offsets[i]:offsets[i + 1] of `days` and `prices`, so every statistic is a
+    segmented reduction over contiguous memory.
+    """
+
+    __slots__ = ("product_ids", "offsets", "days", "prices")
+
+    def __init__(self, product_ids: np.ndarray, offsets: np.ndarray, days: np.ndarray, prices: np.ndarray):
+        self.product_ids = product_ids
+        self.offsets = offsets
+        self.days = days
+        self.prices = prices
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[int, datetime, float]]) -> "PriceSeriesBatch":
+        """Build from (product_id, recorded_at, price) rows already ordered by product then time"""
+        if not rows:
+            empty = np.empty(0)
+            return cls(np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64), empty, empty)
+
+        ids, recorded, prices = zip(*rows)
+        ids = np.fromiter(ids, dtype=np.int64, count=len(rows))
+        days = np.fromiter(
+            ((ts - EPOCH).total_seconds() for ts in recorded), dtype=np.float64, count=len(rows)
+        ) / SECONDS_PER_DAY
+        prices = np.fromiter(prices, dtype=np.float64, count=len(rows))
+
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        offsets = np.r_[starts, len(rows)].astype(np.int64)
+        return cls(ids[starts], offsets, days, prices)
+
+    @classmethod
+    def from_points(cls, product_id: int, points: Iterable[Tuple[datetime, float]]) -> "PriceSeriesBatch":
+        return cls.from_rows([(product_id, ts, price) for ts, price in sorted(points, key=lambda p: p[0])])
+
+
+def compute_trend_stats(batch: PriceSeriesBatch) -> Dict[str, np.ndarray]:
+    """Per-product trend statistics for the whole batch, one array per statistic"""
+    if not len(batch):
+        return {}
+
+    starts = batch.offsets[:-1]
+    ends = batch.offsets[1:] - 1
+    n = np.diff(batch.offsets).astype(np.float64)
+    segment = np.repeat(np.arange(len(batch)), np.diff(batch.offsets))
+    prices = batch.prices
+
+    # Least-squares slope in price per day; time is measured from each series' first point
+    x = batch.days - batch.days[starts][segment]
+    mean_x = np.add.reduceat(x, starts) / n
+    mean_price = np.add.reduceat(prices, starts) / n
+    dx = x - mean_x[segment]
+    dy = prices - mean_price[segment]
+    sxx = np.add.reduceat(dx * dx, starts)
+    syy = np.add.reduceat(dy * dy, starts)
+    sxy = np.add.reduceat(dx * dy, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+        r_squared = np.where((sxx > 0) & (syy > 0), sxy * sxy / (sxx * syy), 0.0)
+    std = np.sqrt(syy / n)
+
+    # Volatility: standard deviation of relative moves between consecutive observations
+    returns = np.zeros_like(prices)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = np.where(prices[:-1] > 0, np.diff(prices) / prices[:-1], 0.0)
+    first = np.zeros(len(prices), dtype=bool)
+    first[starts] = True
+    returns[first] = 0.0
+    moves = np.maximum(n - 1, 1)
+    mean_return = np.add.reduceat(returns, starts) / moves
+    centered = np.where(first, 0.0, returns - mean_return[segment])
+    volatility = np.sqrt(np.add.reduceat(centered * centered, starts) / moves)
+
+    current = prices[ends]
+    stats = {
+        "observations": n.astype(np.int64),
+        "current": current,
+        "mean": mean_price,
+        "std": std,
+        "min": np.minimum.reduceat(prices, starts),
+        "max": np.maximum.reduceat(prices, starts),
+        "slope_per_day": slope,
+        "r_squared": r_squared,
+        "volatility": volatility,
+        "span_days": batch.days[ends] - batch.days[starts],
+    }
+
+    # Moving averages over the trailing window ending at each series' latest point
+    for window in MOVING_AVERAGE_WINDOWS:
+        inside = (batch.days >= (batch.days[ends] - window)[segment]).astype(np.float64)
+        stats[f"ma_{window}d"] = np.add.reduceat(prices * inside, starts) / np.add.reduceat(inside, starts)
+
+    # Percentile bands: sort prices within each segment, then interpolate by position
+    sorted_prices = prices[np.lexsort((prices, segment))]
+    for q in PERCENTILES:
+        position = starts + (q / 100.0) * (n - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, ends)
+        fraction = position - lower
+        stats[f"p{q}"] = sorted_prices[lower] + (sorted_prices[upper] - sorted_prices[lower]) * fraction
+
+    stats["current_percentile"] = np.add.reduceat((prices <= current[segment]).astype(np.float64), starts) / n
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_30d = np.where(mean_price > 0, slope * 30 / mean_price, 0.0)
+    stats["projected_change_30d"] = change_30d
+    stats["projected_price_30d"] = np.maximum(current + slope * 30, 0.0)
+
+    # Trend: -1 decreasing, 0 stable, 1 increasing; two points are not enough to call one
+    enough = n >= 3
+    trend = np.where(enough & (change_30d > TREND_THRESHOLD), 1,
+                     np.where(enough & (change_30d < -TREND_THRESHOLD), -1, 0))
+    stats["trend"] = trend
+
+    coverage = np.minimum(1.0, (n - 1) / FULL_CONFIDENCE_POINTS)
+    stability = 1.0 - 0.5 * np.minimum(1.0, np.abs(change_30d) / TREND_THRESHOLD)
+    stats["confidence"] = coverage * np.where(trend == 0, stability, r_squared)
+
+    # Buy now while the price is climbing, or flat and below its expensive band;
+    # wait while it is falling or sits at the top of its range
+    stats["buy_now"] = (trend > 0) | ((trend == 0) & (current < stats["p75"]))
+    return stats
+
+
+_TREND_NAMES = {-1: "decreasing", 0: "stable", 1: "increasing"}
+
+
+def _describe(product_stats: Dict[str, Any], currency: str) -> Tuple[str, str]:
+    trend = product_stats["trend"]
+    projected = product_stats["projected_price_30d"]
+    if trend == "stable":
+        prediction = f"likely to stay around {currency} {product_stats['ma_7d']:.2f} in the next 30 days"
+    else:
+        verb = "increase" if trend == "increasing" else "decrease"
+        prediction = f"likely to {verb} to about {currency} {projected:.2f} in the next 30 days"
+
+    insights = (
+        f"Over {product_stats['span_days']:.0f} days and {product_stats['observations']} observations the price "
+        f"ranged {currency} {product_stats['min']:.2f}-{product_stats['max']:.2f} "
+        f"(typical {product_stats['p25']:.2f}-{product_stats['p75']:.2f}). "
+        f"The current price of {product_stats['current']:.2f} is higher than or equal to "
+        f"{product_stats['current_percentile'] * 100:.0f}% of observed prices, "
+        f"with {product_stats['volatility'] * 100:.1f}% typical move between observations."
+    )
+    return prediction, insights
+
+
+def trend_reports(batch: PriceSeriesBatch, currencies: Optional[Dict[int, str]] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    Analyze every product in the batch in one vectorized pass.
+
+    Returns product_id -> report using the same keys the LLM analysis used
+    (trend, confidence, prediction, best_time_to_buy, insights) plus the raw
+    numbers under "stats".
+    """
+    stats = compute_trend_stats(batch)
+    if not stats:
+        return {}
+
+    rounded = {
+        name: values.tolist() if name in ("observations", "trend", "buy_now") else np.round(values, 4).tolist()
+        for name, values in stats.items()
+    }
+    reports = {}
+    for i, product_id in enumerate(batch.product_ids.tolist()):
+        product_stats = {name: values[i] for name, values in rounded.items()}
+        product_stats["trend"] = _TREND_NAMES[product_stats["trend"]]
+        buy_now = product_stats.pop("buy_now")
+        prediction, insights = _describe(product_stats, (currencies or {}).get(product_id, "USD"))
+        reports[product_id] = {
+            "trend": product_stats["trend"],
+            "confidence": round(product_stats["confidence"], 2),
+            "prediction": prediction,
+            "best_time_to_buy": "now" if buy_now else "wait",
+            "insights": insights,
+            "stats": product_stats
+        }
+    return reports
+
+
+async def load_price_series(db: AsyncSession, since: datetime, product_ids: Optional[List[int]] = None,
+                            category: Optional[str] = None) -> PriceSeriesBatch:
+    """Load price history after `since` for the given products (or category) in one query"""
+    statement = select(PriceHistory.product_id, PriceHistory.recorded_at, PriceHistory.price).where(
+        PriceHistory.recorded_at >= since,
+        PriceHistory.price.isnot(None)
+    )
+    if product_ids is not None:
+        statement = statement.where(PriceHistory.product_id.in_(product_ids))
+    if category:
+        statement = statement.join(Product, Product.id == PriceHistory.product_id).where(Product.category == category)
+    statement = statement.order_by(PriceHistory.product_id, PriceHistory.recorded_at)
+
+    result = await db.execute(statement)
+    return PriceSeriesBatch.from_rows(result.all())
@@ -0,0 +1,124 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import AsyncSessionLocal, Product, PriceHistory
+from product_similarity import similarity_index
+
+logger = logging.getLogger(__name__)
+
+# Columns refreshed when a listing we already store shows up again
+_UPSERT_UPDATE_COLUMNS = (
+    "brand", "price", "currency", "source_url", "image_url", "description",
+    "characteristics", "ratings", "reviews_count", "availability", "updated_at",
+)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _product_row(product_data: Dict[str, Any], category: str, now: datetime) -> Dict[str, Any]:
+    """Map an LLM summary product onto Product columns"""
+    # Nulls become "", since (name, NULL) never conflicts on the (name, source) unique key
+    features = product_data.get("key_features") or []
+    return {
+        "name": product_data.get("name") or "",
+        "brand": product_data.get("brand") or "",
+        "category": product_data.get("category") or category,
+        "price": _to_float(product_data.get("price")),
+        "currency": product_data.get("currency") or "USD",
+        "source": product_data.get("source") or "",
+        "source_url": product_data.get("source_url") or "",
+        "image_url": product_data.get("image_url"),
+        "description": ", ".join(str(feature) for feature in features),
+        "characteristics": {
+            "features": features,
+            "pros": product_data.get("pros") or [],
+            "cons": product_data.get("cons") or [],
+        },
+        "ratings": _to_float(product_data.get("rating")),
+        "reviews_count": _to_int(product_data.get("review_count")),
+        "availability": bool(product_data.get("availability", True)),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def upsert_products(products_data: List[Dict[str, Any]], category: str = "general") -> int:
+    """
+    Store a search's products in one batch with its own session.
+
+    Listings are upserted on (name, source) with one multi-row statement, and
+    a PriceHistory row is written in the same transaction for every listing
+    that is new or whose price changed. Returns the number of listings stored.
+    """
+    now = datetime.utcnow()
+    rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for product_data in products_data:
+        row = _product_row(product_data, category, now)
+        if row["name"]:
+            # Later duplicates in the same batch win; one statement can't touch a row twice
+            rows[(row["name"], row["source"])] = row
+    if not rows:
+        return 0
+
+    async with AsyncSessionLocal() as db:
+        try:
+            existing = await db.execute(
+                select(Product.name, Product.source, Product.price).where(
+                    tuple_(Product.name, Product.source).in_(list(rows))
+                )
+            )
+            previous_prices = {(name, source): price for name, source, price in existing}
+
+            dialect = db.bind.dialect.name
+            insert_fn = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            statement = insert_fn(Product).values(list(rows.values()))
+            statement = statement.on_conflict_do_update(
+                index_elements=["name", "source"],
+                set_={column: statement.excluded[column] for column in _UPSERT_UPDATE_COLUMNS}
+            ).returning(Product.id, Product.name, Product.source)
+            stored = (await db.execute(statement)).all()
+
+            price_rows = []
+            for product_id, name, source in stored:
+                row = rows[(name, source)]
+                key = (name, source)
+                if row["price"] is not None and (key not in previous_prices or previous_prices[key] != row["price"]):
+                    price_rows.append({
+                        "product_id": product_id,
+                        "price": row["price"],
+                        "currency": row["currency"],
+                        "source": source,
+                        "recorded_at": now,
+                    })
+            if price_rows:
+                await db.execute(insert(PriceHistory), price_rows)
+
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    # Similar-product lookups see new listings without waiting for the next index sync
+    await similarity_index.add(
+        {**rows[(name, source)], "id": product_id} for product_id, name, source in stored
+    )
+
+    logger.info(f"Upserted {len(stored)} products, {len(price_rows)} price changes recorded")
+    return len(stored)
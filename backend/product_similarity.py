@@ -0,0 +1,398 @@
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, Product
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# How much each field counts towards a product's vector
+FIELD_WEIGHTS = {"name": 1.0, "name_pair": 0.5, "brand": 2.0, "category": 1.0, "characteristics": 0.5}
+
+# Up to this many products every query scans the whole matrix: exact, and still a few milliseconds
+EXACT_SCAN_MAX_ROWS = int(os.getenv("SIMILARITY_EXACT_MAX_ROWS", "5000"))
+# Neighbours less similar than this are left out, as mostly sharing a category or hash collisions
+MIN_SIMILARITY = float(os.getenv("SIMILARITY_MIN_SCORE", "0.1"))
+# Candidates wanted per requested neighbour before buckets one bit away are probed too
+CANDIDATES_PER_RESULT = 50
+# Catalog growth since the last IDF refresh that triggers re-weighting every row
+REWEIGHT_GROWTH = 0.5
+# Rows embedded per NumPy call when storing many at once
+STORE_CHUNK_ROWS = 1024
+
+
+@lru_cache(maxsize=65536)
+def _hash_token(token: str, dimensions: int) -> Tuple[int, float]:
+    """Stable column and sign for a token (the built-in hash() differs per process)"""
+    digest = zlib.crc32(token.encode())
+    return digest % dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+
+def _words(text: Any) -> List[str]:
+    return _TOKEN_PATTERN.findall(str(text).lower()) if text else []
+
+
+def _strings(value: Any) -> Iterable[str]:
+    """Every string in a characteristics JSON value, keys included"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield str(key)
+            yield from _strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+    elif value is not None:
+        yield str(value)
+
+
+def product_terms(product: Dict[str, Any]) -> Counter:
+    """Weighted terms of a product: name words and word pairs, brand, category and characteristics"""
+    terms: Counter = Counter()
+    name = _words(product.get("name"))
+    for word in name:
+        terms[word] += FIELD_WEIGHTS["name"]
+    for first, second in zip(name, name[1:]):
+        terms[f"{first} {second}"] += FIELD_WEIGHTS["name_pair"]
+    # Brand and category match as whole values, so "apple" the brand is not "apple" in a name
+    brand = " ".join(_words(product.get("brand")))
+    if brand:
+        terms[f"brand:{brand}"] += FIELD_WEIGHTS["brand"]
+    category = " ".join(_words(product.get("category")))
+    if category:
+        terms[f"category:{category}"] += FIELD_WEIGHTS["category"]
+    for text in _strings(product.get("characteristics")):
+        for word in _words(text):
+            terms[word] += FIELD_WEIGHTS["characteristics"]
+    return terms
+
+
+class ProductSimilarityIndex:
+    """
+    Hashed TF-IDF vectors for every stored product, with an LSH index for
+    nearest-neighbour queries.
+
+    Terms are hashed into a fixed number of signed columns, so vectors need no
+    vocabulary and new products can be added at any time. Rows are L2
+    normalized, making a dot product their cosine similarity. The approximate
+    index hashes each row into several tables by the signs of random
+    projections; a query re-scores only the rows sharing a bucket with it (or
+    one bit away) and falls back to a full scan when that yields too few.
+
+    IDF weights are refreshed when the catalog has grown by REWEIGHT_GROWTH
+    since the last refresh; rows added in between use the weights of the time.
+    """
+
+    def __init__(self, dimensions: Optional[int] = None, tables: Optional[int] = None, bits: Optional[int] = None,
+                 sync_interval: Optional[float] = None, seed: int = 0):
+        self.dimensions = dimensions or int(os.getenv("SIMILARITY_DIMENSIONS", "1024"))
+        self.tables = tables or int(os.getenv("SIMILARITY_LSH_TABLES", "8"))
+        self.bits = bits or int(os.getenv("SIMILARITY_LSH_BITS", "12"))
+        self.sync_interval = sync_interval if sync_interval is not None else float(os.getenv("SIMILARITY_SYNC_INTERVAL", "60"))
+        self.seed = seed
+        self._planes = np.random.default_rng(seed).standard_normal((self.dimensions, self.tables * self.bits)).astype(np.float32)
+        self._bit_values = 1 << np.arange(self.bits, dtype=np.int64)
+
+        # Row buffers grow by doubling; the first len(self._terms) rows are in use
+        self._vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._rows: Dict[int, int] = {}  # product id -> matrix row
+        self._terms: List[Counter] = []  # per row, kept to re-weight rows when IDF changes
+        self._document_frequency = np.zeros(self.dimensions, dtype=np.float64)
+        self._idf = np.ones(self.dimensions, dtype=np.float32)
+        self._weighted_rows = 0
+        self._keys = np.zeros((0, self.tables), dtype=np.int64)
+        self._buckets: List[Dict[int, Set[int]]] = [defaultdict(set) for _ in range(self.tables)]
+
+        self._synced_through: Optional[datetime] = None
+        self._last_sync = 0.0
+        # Created on first use, inside the running event loop
+        self._sync_lock: Optional[asyncio.Lock] = None
+        self._update_lock: Optional[asyncio.Lock] = None
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _columns(self, terms: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        """Hashed columns of the terms and their sublinear term frequencies"""
+        weights: Dict[int, float] = defaultdict(float)
+        for term, count in terms.items():
+            column, sign = _hash_token(term, self.dimensions)
+            weights[column] += sign * (1.0 + math.log(count)) if count >= 1 else sign * count
+        columns = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+        return columns, np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+
+    def _vector(self, terms: Counter) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        columns, values = self._columns(terms)
+        vector[columns] = values * self._idf[columns]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _hash_keys(self, vectors: np.ndarray) -> np.ndarray:
+        """LSH bucket key per table for each row: the sign bits of its projections"""
+        signs = (vectors @ self._planes > 0).reshape(len(vectors), self.tables, self.bits)
+        return signs.astype(np.int64) @ self._bit_values
+
+    def _refresh_idf(self):
+        rows = len(self._terms)
+        self._idf = (np.log((1.0 + rows) / (1.0 + self._document_frequency)) + 1.0).astype(np.float32)
+        self._weighted_rows = rows
+
+    def _reserve(self, rows: int):
+        if rows <= len(self._vectors):
+            return
+        capacity = max(rows, 2 * len(self._vectors), 64)
+        used = len(self._terms)
+        for name, width, dtype in (("_vectors", self.dimensions, np.float32), ("_keys", self.tables, np.int64)):
+            grown = np.zeros((capacity, width), dtype=dtype)
+            grown[:used] = getattr(self, name)[:used]
+            setattr(self, name, grown)
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:used] = self._ids[:used]
+        self._ids = ids
+
+    def _store_rows(self, first_row: int, terms: List[Counter]):
+        """Embed rows first_row.. and add them to the LSH tables"""
+        # In chunks, so a rebuild in a worker thread never holds the GIL for long in one NumPy call
+        for start in range(0, len(terms), STORE_CHUNK_ROWS):
+            chunk = terms[start:start + STORE_CHUNK_ROWS]
+            row = first_row + start
+            vectors = np.stack([self._vector(row_terms) for row_terms in chunk])
+            keys = self._hash_keys(vectors)
+            self._vectors[row:row + len(chunk)] = vectors
+            self._keys[row:row + len(chunk)] = keys
+            for offset, row_keys in enumerate(keys.tolist()):
+                for table, key in enumerate(row_keys):
+                    self._buckets[table][key].add(row + offset)
+
+    def _reindex(self):
+        """Re-weight every row with fresh IDF and rebuild the LSH tables"""
+        self._refresh_idf()
+        self._buckets = [defaultdict(set) for _ in range(self.tables)]
+        if self._terms:
+            self._store_rows(0, self._terms)
+
+    def add_products(self, products: Iterable[Dict[str, Any]]):
+        """
+        Add or replace products (dicts with id, name, brand, category, characteristics).
+        May re-weight every row, so from the event loop use add() instead.
+        """
+        added_terms, added_ids = [], []
+        for product in products:
+            product_id = product.get("id")
+            if product_id is None:
+                continue
+            terms = product_terms(product)
+            row = self._rows.get(product_id)
+            if row is not None:
+                self._replace_row(row, terms)
+                continue
+            self._rows[product_id] = len(self._terms) + len(added_terms)
+            added_terms.append(terms)
+            added_ids.append(product_id)
+        if not added_terms:
+            return
+
+        for terms in added_terms:
+            columns, _ = self._columns(terms)
+            self._document_frequency[columns] += 1
+        first_row = len(self._terms)
+        self._reserve(first_row + len(added_terms))
+        self._ids[first_row:first_row + len(added_ids)] = added_ids
+        self._terms.extend(added_terms)
+        if self._reweight_due(0):
+            self._reindex()
+        else:
+            self._store_rows(first_row, added_terms)
+
+    def _reweight_due(self, new_rows: int) -> bool:
+        """Whether the catalog, with new_rows more, has outgrown the IDF weights its rows were embedded with"""
+        return not self._weighted_rows or len(self._terms) + new_rows > self._weighted_rows * (1.0 + REWEIGHT_GROWTH)
+
+    def _rebuilt(self, products: List[Dict[str, Any]]) -> "ProductSimilarityIndex":
+        """A new index holding every current row plus the products, all re-weighted; leaves this one untouched"""
+        ids = self._ids[:len(self._terms)].tolist()
+        terms = list(self._terms)
+        rows = dict(self._rows)
+        for product in products:
+            new_terms = product_terms(product)
+            row = rows.get(product["id"])
+            if row is None:
+                rows[product["id"]] = len(terms)
+                ids.append(product["id"])
+                terms.append(new_terms)
+            else:
+                terms[row] = new_terms
+
+        rebuilt = ProductSimilarityIndex(self.dimensions, self.tables, self.bits, self.sync_interval, self.seed)
+        rebuilt._rows = rows
+        for row_terms in terms:
+            columns, _ = rebuilt._columns(row_terms)
+            rebuilt._document_frequency[columns] += 1
+        rebuilt._reserve(len(terms))
+        rebuilt._ids[:len(ids)] = ids
+        rebuilt._terms = terms
+        rebuilt._reindex()
+        return rebuilt
+
+    async def add(self, products: Iterable[Dict[str, Any]]):
+        """
+        add_products for the event loop. When the batch would trigger a
+        re-weighting of every row, the index is rebuilt in a worker thread and
+        swapped in; queries keep using the current rows meanwhile.
+        """
+        products = [product for product in products if product.get("id") is not None]
+        if not products:
+            return
+        if self._update_lock is None:
+            self._update_lock = asyncio.Lock()
+        async with self._update_lock:
+            new_rows = sum(1 for product in products if product["id"] not in self._rows)
+            if new_rows and self._reweight_due(new_rows):
+                self._adopt(await asyncio.to_thread(self._rebuilt, products))
+            else:
+                self.add_products(products)
+
+    def _replace_row(self, row: int, terms: Counter):
+        old_columns, _ = self._columns(self._terms[row])
+        new_columns, _ = self._columns(terms)
+        self._document_frequency[old_columns] -= 1
+        self._document_frequency[new_columns] += 1
+        self._terms[row] = terms
+        for table, key in enumerate(self._keys[row].tolist()):
+            self._buckets[table][key].discard(row)
+        self._vectors[row] = self._vector(terms)
+        self._keys[row] = self._hash_keys(self._vectors[row:row + 1])[0]
+        for table, key in enumerate(self._keys[row].tolist()):
+            self._buckets[table][key].add(row)
+
+    def _candidates(self, vector: np.ndarray, k: int) -> Optional[np.ndarray]:
+        """Rows sharing an LSH bucket with the vector, widened to buckets one bit away if too few"""
+        keys = self._hash_keys(vector[None, :])[0].tolist()
+        candidates: Set[int] = set()
+        for table, key in enumerate(keys):
+            candidates.update(self._buckets[table].get(key, ()))
+        if len(candidates) < CANDIDATES_PER_RESULT * k:
+            for table, key in enumerate(keys):
+                for bit in range(self.bits):
+                    candidates.update(self._buckets[table].get(key ^ (1 << bit), ()))
+        if len(candidates) <= k:
+            return None
+        return np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+
+    def _nearest(self, vector: np.ndarray, k: int, exclude_row: Optional[int] = None) -> List[Tuple[int, float]]:
+        if not len(self._rows) or k <= 0 or not vector.any():
+            return []
+        rows = None
+        if len(self._rows) > EXACT_SCAN_MAX_ROWS:
+            rows = self._candidates(vector, k + 1)
+        if rows is None:
+            rows = np.arange(len(self._terms))
+            scores = self._vectors[:len(rows)] @ vector  # a slice, not a copy of the matrix
+        else:
+            scores = self._vectors[rows] @ vector
+        if exclude_row is not None:
+            scores[rows == exclude_row] = -np.inf
+        top = min(k, len(rows))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(self._ids[rows[i]]), round(float(scores[i]), 4)) for i in best if scores[i] >= MIN_SIMILARITY]
+
+    def similar_to_product(self, product_id: int, k: int = 10) -> Optional[List[Tuple[int, float]]]:
+        """(product id, cosine similarity) of the k nearest stored products, or None if the product is unknown"""
+        row = self._rows.get(product_id)
+        if row is None:
+            return None
+        return self._nearest(self._vectors[row], k, exclude_row=row)
+
+    def similar_to(self, product: Dict[str, Any], k: int = 10) -> List[Tuple[int, float]]:
+        """(product id, cosine similarity) of the k stored products nearest to an arbitrary product description"""
+        terms = product_terms(product)
+        for field in ("description", "features", "key_features"):
+            for text in _strings(product.get(field)):
+                for word in _words(text):
+                    terms[word] += FIELD_WEIGHTS["characteristics"]
+        return self._nearest(self._vector(terms), k)
+
+    async def sync(self, force: bool = False):
+        """
+        Load products stored or updated since the last sync, including those
+        written by other worker processes. Skipped within sync_interval of the
+        previous sync unless forced.
+        """
+        if not force and time.monotonic() - self._last_sync < self.sync_interval:
+            return
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+        async with self._sync_lock:
+            if not force and time.monotonic() - self._last_sync < self.sync_interval:
+                return
+            statement = select(Product.id, Product.name, Product.brand, Product.category,
+                               Product.characteristics, Product.updated_at)
+            if self._synced_through is not None:
+                statement = statement.where(Product.updated_at >= self._synced_through)
+            start = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(statement)).all()
+            self._last_sync = time.monotonic()
+            if not rows:
+                return
+
+            products = [
+                {"id": row.id, "name": row.name, "brand": row.brand, "category": row.category,
+                 "characteristics": row.characteristics}
+                for row in rows
+            ]
+            updated = [row.updated_at for row in rows if row.updated_at is not None]
+            if updated:
+                self._synced_through = max(updated)
+            await self.add(products)
+            logger.info(f"Similarity index synced {len(products)} products in {time.perf_counter() - start:.2f}s "
+                        f"({len(self)} indexed)")
+
+    def sync_in_background(self):
+        """Start a sync if one is due and none is running, without waiting for it (for request handlers)"""
+        if time.monotonic() - self._last_sync < self.sync_interval:
+            return
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._background_sync())
+
+    async def _background_sync(self):
+        try:
+            await self.sync()
+        except Exception as e:
+            logger.warning(f"Similarity index sync failed: {e}")
+
+    def _adopt(self, other: "ProductSimilarityIndex"):
+        for name in ("_vectors", "_ids", "_rows", "_terms", "_document_frequency", "_idf", "_weighted_rows",
+                     "_keys", "_buckets"):
+            setattr(self, name, getattr(other, name))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "products": len(self),
+            "dimensions": self.dimensions,
+            "lsh_tables": self.tables,
+            "lsh_bits": self.bits,
+            "matrix_bytes": int(self._vectors.nbytes),
+        }
+
+
+# Global similarity index
+similarity_index = ProductSimilarityIndex()
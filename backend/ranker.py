@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from result_batch import ResultBatch
+
+logger = logging.getLogger(__name__)
+
+# A price this far outside the requested range (relative to the nearest bound) gets no fit credit
+PRICE_FIT_TOLERANCE = 0.5
+# Currency analysed price ranges are given in; prices in others get no fit credit, like unknown ones
+PRICE_RANGE_CURRENCY = "USD"
+
+
+@dataclass(frozen=True)
+class RankingProfile:
+    """Weights for each relevance feature; a result's score is their weighted sum"""
+    title_match: float = 10.0  # per search query contained in the title
+    rating: float = 2.0  # per rating star
+    availability: float = 5.0
+    discount: float = 2.0  # when the discount exceeds discount_threshold percent
+    discount_threshold: float = 10.0
+    price_fit: float = 4.0  # 1.0 inside the analysed price range, fading to 0 outside it
+    brand_boosts: Dict[str, float] = field(default_factory=lambda: {
+        "apple": 3.0, "samsung": 3.0, "sony": 3.0, "bose": 3.0, "dyson": 3.0
+    })
+
+    def key(self) -> Tuple[Hashable, ...]:
+        """Hashable form of the weights (brand_boosts is a dict)"""
+        return tuple(
+            tuple(sorted(value.items())) if isinstance(value, dict) else value
+            for value in (getattr(self, f.name) for f in fields(self))
+        )
+
+
+RANKING_PROFILES: Dict[str, RankingProfile] = {
+    "default": RankingProfile(),
+    # Price-sensitive shoppers: staying in budget and discounts matter more than brands
+    "budget": RankingProfile(rating=1.5, discount=6.0, discount_threshold=5.0, price_fit=10.0, brand_boosts={}),
+    # Quality first: ratings and known brands dominate, price fit barely counts
+    "quality": RankingProfile(rating=4.0, discount=0.0, price_fit=1.0),
+}
+
+
+def _load_profile_overrides():
+    """Merge RANKING_PROFILES_JSON ({"name": {"weight": value, ...}}) over the built-in profiles"""
+    raw = os.getenv("RANKING_PROFILES_JSON")
+    if not raw:
+        return
+    try:
+        for name, overrides in json.loads(raw).items():
+            base = RANKING_PROFILES.get(name, RANKING_PROFILES["default"])
+            if "brand_boosts" in overrides:
+                overrides["brand_boosts"] = {brand.lower(): float(boost) for brand, boost in overrides["brand_boosts"].items()}
+            RANKING_PROFILES[name] = replace(base, **overrides)
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid RANKING_PROFILES_JSON: {e}")
+
+
+_load_profile_overrides()
+DEFAULT_PROFILE = os.getenv("RANKING_PROFILE", "default")
+
+
+def get_profile(name: Optional[str] = None) -> RankingProfile:
+    profile = RANKING_PROFILES.get(name or DEFAULT_PROFILE)
+    if profile is None:
+        logger.warning(f"Unknown ranking profile {name!r}, using {DEFAULT_PROFILE!r}")
+        profile = RANKING_PROFILES.get(DEFAULT_PROFILE, RANKING_PROFILES["default"])
+    return profile
+
+
+class RankingFeatures:
+    """Normalized per-result features, computed once per batch and reused by every profile"""
+
+    __slots__ = ("titles", "brands", "rating", "available", "discount", "price")
+
+    def __init__(self, batch: ResultBatch):
+        self.titles = [title.lower() for title in batch.title]
+        self.brands = [(brand or "").lower() for brand in batch.brand]
+        self.rating = np.nan_to_num(batch.numeric("rating"))
+        self.available = batch.available().astype(np.float64)
+        self.discount = batch.numeric("discount_percentage")
+        # Price ranges are in dollars, so only dollar prices are compared against them
+        in_range_currency = np.fromiter(
+            ((currency or PRICE_RANGE_CURRENCY) == PRICE_RANGE_CURRENCY for currency in batch.currency),
+            dtype=bool, count=len(batch.currency)
+        )
+        self.price = np.where(in_range_currency, batch.numeric("price"), np.nan)
+
+    def title_matches(self, queries: List[str]) -> np.ndarray:
+        """How many of the queries each title contains"""
+        matches = np.zeros(len(self.titles))
+        # Each distinct query is scanned once; repeated queries still count per occurrence
+        for query, occurrences in Counter(query.lower() for query in queries).items():
+            matches += occurrences * np.fromiter((query in title for title in self.titles), dtype=bool, count=len(self.titles))
+        return matches
+
+    def brand_boost(self, boosts: Dict[str, float]) -> np.ndarray:
+        if not boosts:
+            return np.zeros(len(self.brands))
+        return np.fromiter((boosts.get(brand, 0.0) for brand in self.brands), dtype=np.float64, count=len(self.brands))
+
+    def price_fit(self, price_range: Optional[Dict[str, Any]]) -> np.ndarray:
+        """1.0 for prices inside the range, fading linearly to 0 at PRICE_FIT_TOLERANCE outside it"""
+        bounds = price_bounds(price_range)
+        if bounds is None:
+            return np.zeros(len(self.price))
+
+        low, high = bounds
+        below = np.maximum(low - self.price, 0) / max(low, 1.0)
+        above = np.maximum(self.price - high, 0) / high
+        fit = np.clip(1.0 - (below + above) / PRICE_FIT_TOLERANCE, 0.0, 1.0)
+        return np.nan_to_num(fit)  # unknown and non-dollar prices get no credit
+
+
+def price_bounds(price_range: Optional[Dict[str, Any]]) -> Optional[Tuple[float, float]]:
+    """(min, max) of an analysed price range, or None when it has no usable maximum"""
+    try:
+        low = float((price_range or {}).get("min") or 0)
+        high = float((price_range or {}).get("max") or 0)
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if high <= 0 or high < low:
+        return None
+    return low, high
+
+
+def score_results(features: RankingFeatures, queries: List[str], profile: RankingProfile,
+                  price_range: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    score = features.title_matches(queries) * profile.title_match
+    score += features.rating * profile.rating
+    score += features.available * profile.availability
+    score += features.brand_boost(profile.brand_boosts)
+    score += (features.discount > profile.discount_threshold) * profile.discount  # NaN compares False
+    if profile.price_fit and price_range:
+        score += features.price_fit(price_range) * profile.price_fit
+    return score
+
+
+def top_k_order(score: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Indices of the k best scores, best first; ties keep their original order.
+
+    With k below the candidate count this partitions first (O(n)) and only
+    sorts the k winners, selecting exactly what a full stable sort would.
+    """
+    n = len(score)
+    if k is None or k >= n:
+        return np.argsort(-score, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    threshold = score[np.argpartition(-score, k - 1)[k - 1]]
+    above = np.flatnonzero(score > threshold)
+    ties = np.flatnonzero(score == threshold)[:k - len(above)]
+    chosen = np.concatenate((above, ties))
+    return chosen[np.lexsort((chosen, -score[chosen]))]
+
+
+def ranking_key(queries: List[str], profile: Optional[RankingProfile] = None,
+                price_range: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None) -> Tuple[Hashable, ...]:
+    """
+    Everything rank_results depends on besides the batch: queries, profile
+    weights, the price bounds (when price fit counts) and top_k
+    """
+    profile = profile or get_profile()
+    bounds = price_bounds(price_range) if profile.price_fit else None
+    return tuple(queries), profile.key(), bounds, top_k
+
+
+def rank_results(batch: ResultBatch, queries: List[str], profile: Optional[RankingProfile] = None,
+                 price_range: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None) -> ResultBatch:
+    """Score every result in one vectorized pass and return the top_k (all by default), best first"""
+    if not len(batch):
+        return batch
+    profile = profile or get_profile()
+    score = score_results(RankingFeatures(batch), queries, profile, price_range)
+    return batch.take(top_k_order(score, top_k))
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# (method, path prefix, cost); first match wins, so keep specific rules first.
+# The budget is RATE_LIMIT cost units per window, plain requests cost 1.
+DEFAULT_ROUTE_COSTS: List[Tuple[str, str, float]] = [
+    ("POST", "/api/search/stream", 10),
+    ("POST", "/api/search/chat", 3),
+    ("POST", "/api/search", 10),
+    ("POST", "/api/recommendations/user", 3),
+    ("GET", "/api/recommendations/user", 3),
+    ("GET", "/api/products/", 1),
+    ("*", "/health", 0.1),
+    ("*", "/docs", 0.1),
+    ("*", "/openapi.json", 0.1),
+]
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit: float
+    remaining: float
+    retry_after: int
+
+
+def _sliding_window(window_index: int, prev: float, curr: float, now: float, window: float,
+                    cost: float, limit: float, current_index: int) -> Tuple[int, float, float, RateLimitDecision]:
+    """
+    Sliding-window-counter step shared by all backends.
+
+    The request rate is estimated as the previous window's count weighted by
+    how much of it still overlaps the sliding window, plus the current count.
+    """
+    if window_index != current_index:
+        prev = curr if current_index == window_index + 1 else 0.0
+        curr = 0.0
+        window_index = current_index
+
+    elapsed = (now % window) / window
+    estimated = prev * (1 - elapsed) + curr
+
+    if estimated + cost > limit:
+        headroom = limit - curr - cost
+        if prev > 0 and headroom >= 0:
+            # Wait until enough of the previous window has slid out
+            retry_after = ((1 - headroom / prev) - elapsed) * window
+        else:
+            retry_after = (1 - elapsed) * window
+        decision = RateLimitDecision(False, limit, max(limit - estimated, 0.0), max(1, math.ceil(retry_after)))
+        return window_index, prev, curr, decision
+
+    curr += cost
+    return window_index, prev, curr, RateLimitDecision(True, limit, limit - estimated - cost, 0)
+
+
+class MemoryRateLimitBackend:
+    """Per-process counters: three numbers per client, idle clients evicted periodically"""
+
+    def __init__(self):
+        # key -> [window_index, prev_count, curr_count, last_seen]
+        self._state: Dict[str, list] = {}
+
+    async def hit(self, key: str, cost: float, limit: float, window: float, now: float) -> RateLimitDecision:
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = [0, 0.0, 0.0, now]
+
+        window_index, prev, curr, decision = _sliding_window(
+            state[0], state[1], state[2], now, window, cost, limit, int(now // window)
+        )
+        state[0], state[1], state[2], state[3] = window_index, prev, curr, now
+        return decision
+
+    async def evict_idle(self, idle_before: float) -> int:
+        idle = [key for key, state in self._state.items() if state[3] < idle_before]
+        for key in idle:
+            del self._state[key]
+        return len(idle)
+
+    async def tracked_keys(self) -> int:
+        return len(self._state)
+
+
+class SQLiteRateLimitBackend:
+    """
+    Counters kept in a local SQLite file so every worker process on the host
+    enforces the same limits. Each hit is one short IMMEDIATE transaction.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._store = SQLiteStore(path, (
+            """CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                window_index INTEGER NOT NULL,
+                prev_count REAL NOT NULL,
+                curr_count REAL NOT NULL,
+                last_seen REAL NOT NULL
+            )""",
+        ), synchronous="OFF")
+
+    def _hit(self, key: str, cost: float, limit: float, window: float, now: float) -> RateLimitDecision:
+        conn = self._store.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_index, prev_count, curr_count FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            window_index, prev, curr = row if row else (0, 0.0, 0.0)
+            window_index, prev, curr, decision = _sliding_window(
+                window_index, prev, curr, now, window, cost, limit, int(now // window)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, window_index, prev_count, curr_count, last_seen) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, window_index, prev, curr, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return decision
+
+    def _evict_idle(self, idle_before: float) -> int:
+        return self._store.connection().execute("DELETE FROM rate_limits WHERE last_seen < ?", (idle_before,)).rowcount
+
+    def _tracked_keys(self) -> int:
+        return self._store.connection().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    async def hit(self, key: str, cost: float, limit: float, window: float, now: float) -> RateLimitDecision:
+        return await asyncio.to_thread(self._hit, key, cost, limit, window, now)
+
+    async def evict_idle(self, idle_before: float) -> int:
+        return await asyncio.to_thread(self._evict_idle, idle_before)
+
+    async def tracked_keys(self) -> int:
+        return await asyncio.to_thread(self._tracked_keys)
+
+
+class RateLimiter:
+    """Sliding-window-counter rate limiter with per-route request costs"""
+
+    def __init__(self, limit: float = 100, window: float = 60, backend=None,
+                 route_costs: Optional[List[Tuple[str, str, float]]] = None, sweep_interval: float = 60):
+        self.limit = limit
+        self.window = window
+        self.backend = backend or MemoryRateLimitBackend()
+        self.route_costs = route_costs if route_costs is not None else DEFAULT_ROUTE_COSTS
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+
+        self.allowed = 0
+        self.rejected = 0
+
+    def cost_for(self, method: str, path: str) -> float:
+        for rule_method, prefix, cost in self.route_costs:
+            if (rule_method == "*" or rule_method == method) and path.startswith(prefix):
+                return cost
+        return 1.0
+
+    async def check(self, key: str, method: str, path: str) -> RateLimitDecision:
+        now = time.time()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            try:
+                # A client idle for two windows has no state left that could matter
+                evicted = await self.backend.evict_idle(now - 2 * self.window)
+                if evicted:
+                    logger.debug(f"Evicted {evicted} idle rate limit keys")
+            except Exception as e:
+                logger.warning(f"Rate limit eviction failed: {e}")
+
+        decision = await self.backend.hit(key, self.cost_for(method, path), self.limit, self.window, now)
+        if decision.allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return decision
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "window_seconds": self.window,
+            "backend": type(self.backend).__name__,
+            "tracked_clients": await self.backend.tracked_keys(),
+            "allowed": self.allowed,
+            "rejected": self.rejected
+        }
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Build the limiter from RATE_LIMIT* environment variables"""
+    backend_name = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if backend_name == "sqlite":
+        backend = SQLiteRateLimitBackend(os.getenv("RATE_LIMIT_DB_PATH", "./rate_limits.db"))
+    else:
+        backend = MemoryRateLimitBackend()
+
+    return RateLimiter(
+        limit=float(os.getenv("RATE_LIMIT", "100")),
+        window=float(os.getenv("RATE_LIMIT_WINDOW", "60")),
+        backend=backend
+    )
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Deque, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean the host wants us to slow down
+BACKOFF_STATUSES = (429, 503)
+# Hosts tracked before idle ones are forgotten
+MAX_TRACKED_HOSTS = 1024
+
+
+class Priority(IntEnum):
+    """Lower values are served first when requests compete for a slot"""
+    INTERACTIVE = 0  # a user is waiting on the result (search rounds, product pages)
+    BACKGROUND = 1  # refreshes and prefetches nobody is waiting on
+
+
+@dataclass(frozen=True)
+class HostLimits:
+    rate: float = 5.0  # requests started per second
+    burst: int = 5  # requests that may start back to back after an idle spell
+    concurrency: int = 4  # requests in flight at once
+    backoff: float = 1.0  # first pause after a 429/503 without Retry-After, doubling per repeat
+    max_backoff: float = 60.0
+
+
+DEFAULT_HOST_LIMITS = HostLimits(
+    rate=float(os.getenv("SCRAPE_HOST_RATE", "5")),
+    burst=int(os.getenv("SCRAPE_HOST_BURST", "5")),
+    concurrency=int(os.getenv("SCRAPE_HOST_CONCURRENCY", "4")),
+)
+
+HOST_LIMITS: Dict[str, HostLimits] = {
+    # DuckDuckGo blocks aggressive clients; keep well under its limits
+    "html.duckduckgo.com": replace(DEFAULT_HOST_LIMITS, rate=1.0, burst=3, concurrency=2, backoff=5.0),
+}
+
+
+def _load_host_overrides():
+    """Merge SCRAPE_HOST_LIMITS_JSON ({"host": {"rate": 2, ...}}) over the built-in limits"""
+    raw = os.getenv("SCRAPE_HOST_LIMITS_JSON")
+    if not raw:
+        return
+    try:
+        for host, overrides in json.loads(raw).items():
+            HOST_LIMITS[host.lower()] = replace(HOST_LIMITS.get(host.lower(), DEFAULT_HOST_LIMITS), **overrides)
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid SCRAPE_HOST_LIMITS_JSON: {e}")
+
+
+_load_host_overrides()
+
+# Seconds a request may wait for a slot before it is given up (0 waits as long as it takes)
+MAX_QUEUE_WAIT: Dict[Priority, float] = {
+    Priority.INTERACTIVE: float(os.getenv("SCRAPE_MAX_QUEUE_WAIT", "5")),
+    Priority.BACKGROUND: float(os.getenv("SCRAPE_MAX_QUEUE_WAIT_BACKGROUND", "0")),
+}
+
+
+class QueueTimeout(Exception):
+    """A request waited longer than its priority's MAX_QUEUE_WAIT for a slot"""
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds asked for by a Retry-After header (delta-seconds or an HTTP date), if any"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostState:
+    __slots__ = ("limits", "tokens", "refilled_at", "active", "backoff_until", "strikes", "queues")
+
+    def __init__(self, limits: HostLimits, now: float):
+        self.limits = limits
+        self.tokens = float(limits.burst)
+        self.refilled_at = now
+        self.active = 0
+        self.backoff_until = 0.0
+        self.strikes = 0  # consecutive backoffs; each halves the rate until requests succeed again
+        self.queues: List[Deque[asyncio.Future]] = [deque() for _ in Priority]
+
+    def rate(self) -> float:
+        return self.limits.rate / (2 ** self.strikes)
+
+    def refill(self, now: float):
+        self.tokens = min(self.limits.burst, self.tokens + (now - self.refilled_at) * self.rate())
+        self.refilled_at = now
+
+    def top_priority(self) -> Optional[int]:
+        for priority, queue in enumerate(self.queues):
+            while queue and queue[0].done():  # cancelled waiters
+                queue.popleft()
+            if queue:
+                return priority
+        return None
+
+    def ready_at(self, now: float) -> float:
+        """When the next request may start, ignoring the concurrency limit"""
+        token_wait = (1.0 - self.tokens) / self.rate() if self.tokens < 1.0 else 0.0
+        return max(now + token_wait, self.backoff_until)
+
+    def idle(self) -> bool:
+        return not self.active and not any(self.queues) and not self.strikes
+
+
+class RequestScheduler:
+    """
+    Admission control for outbound scraping. Each host gets its own token-bucket
+    rate, concurrency limit and backoff, so a slow or throttling retailer only
+    holds up requests to itself. Free slots go to the highest priority class
+    waiting, round-robin across hosts, under a global concurrency cap.
+
+    Requests run inside `async with scheduler.slot(url, priority):`. A 429 or 503
+    raised from the block (response.raise_for_status()) pauses the host for its
+    Retry-After, or an exponential backoff, and halves its rate until requests
+    succeed again. A request still waiting after its priority's max_queue_wait
+    raises QueueTimeout instead of entering the block.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_queue_wait: Optional[Dict[Priority, float]] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv("SCRAPE_MAX_CONCURRENCY", "16"))
+        self.max_queue_wait = max_queue_wait if max_queue_wait is not None else MAX_QUEUE_WAIT
+        self._hosts: Dict[str, _HostState] = {}
+        self._rotation: Deque[str] = deque()  # hosts with waiters, next to serve first
+        self._active = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = float("inf")
+
+    def _host(self, host: str, now: float) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= MAX_TRACKED_HOSTS:
+                for name in [name for name, other in self._hosts.items() if other.idle()]:
+                    del self._hosts[name]
+            state = self._hosts[host] = _HostState(HOST_LIMITS.get(host, DEFAULT_HOST_LIMITS), now)
+        return state
+
+    @asynccontextmanager
+    async def slot(self, url: str, priority: Priority = Priority.INTERACTIVE):
+        """Wait for a request slot to the url's host and hold it for the block"""
+        host = (urlparse(url).hostname or "").lower()
+        now = time.monotonic()
+        state = self._host(host, now)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        state.queues[priority].append(waiter)
+        if host not in self._rotation:
+            self._rotation.append(host)
+        self._dispatch()
+        max_wait = self.max_queue_wait.get(priority)
+        deadline = loop.call_later(max_wait, self._give_up, waiter, host, priority, max_wait) if max_wait else None
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self._release(state)  # granted just as we were cancelled
+            raise
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+        metrics.observe("scrape_queue_wait_seconds", time.monotonic() - now, priority.name.lower())
+
+        try:
+            yield
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in BACKOFF_STATUSES:
+                self._back_off(host, state, _retry_after(e.response))
+            raise
+        else:
+            state.strikes = max(state.strikes - 1, 0)
+        finally:
+            self._release(state)
+
+    def _give_up(self, waiter: asyncio.Future, host: str, priority: Priority, max_wait: float):
+        """Fail a waiter that is still queued; _dispatch skips it like a cancelled one"""
+        if not waiter.done():
+            metrics.inc("scrape_queue_timeouts_total", priority.name.lower())
+            waiter.set_exception(QueueTimeout(f"No request slot for {host} within {max_wait:g}s"))
+
+    def _back_off(self, host: str, state: _HostState, retry_after: Optional[float]):
+        state.strikes = min(state.strikes + 1, 6)
+        delay = retry_after if retry_after is not None else state.limits.backoff * 2 ** (state.strikes - 1)
+        delay = min(delay, state.limits.max_backoff) * random.uniform(1.0, 1.2)
+        state.backoff_until = max(state.backoff_until, time.monotonic() + delay)
+        metrics.inc("scrape_backoffs_total")
+        logger.warning(f"{host} asked us to slow down, pausing it for {delay:.1f}s")
+
+    def _release(self, state: _HostState):
+        state.active -= 1
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Start every waiter that may run now, then wake up when the next one may"""
+        now = time.monotonic()
+        next_at = float("inf")
+        while self._active < self.max_concurrency:
+            best_host, best_priority = None, None
+            for host in list(self._rotation):
+                state = self._hosts[host]
+                priority = state.top_priority()
+                if priority is None:
+                    self._rotation.remove(host)
+                    continue
+                if state.active >= state.limits.concurrency:
+                    continue  # a release will dispatch again
+                state.refill(now)
+                ready_at = state.ready_at(now)
+                if ready_at > now:
+                    next_at = min(next_at, ready_at)
+                    continue
+                if best_priority is None or priority < best_priority:
+                    best_host, best_priority = host, priority
+            if best_host is None:
+                break
+
+            state = self._hosts[best_host]
+            state.queues[best_priority].popleft().set_result(None)
+            state.tokens -= 1.0
+            state.active += 1
+            self._active += 1
+            # Served hosts go to the back, so equal-priority hosts take turns
+            self._rotation.remove(best_host)
+            if state.top_priority() is not None:
+                self._rotation.append(best_host)
+
+        if next_at < self._timer_at:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer_at = next_at
+            self._timer = asyncio.get_running_loop().call_later(next_at - now, self._on_timer)
+
+    def _on_timer(self):
+        self._timer, self._timer_at = None, float("inf")
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-host load, for hosts with requests running, queued or backing off"""
+        now = time.monotonic()
+        return {
+            host: {
+                "active": state.active,
+                "queued": sum(len(queue) for queue in state.queues),
+                "rate": round(state.rate(), 3),
+                "backoff_remaining": round(max(state.backoff_until - now, 0.0), 1),
+            }
+            for host, state in self._hosts.items()
+            if not state.idle() or state.backoff_until > now
+        }
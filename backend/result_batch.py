@@ -0,0 +1,154 @@
+import sys
+from array import array
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Fields each search result carries, in the order SearchService fills them in
+STRING_COLUMNS = ("title", "currency", "source", "url", "image_url", "description", "category", "brand")
+NUMERIC_COLUMNS = ("price", "rating", "review_count", "discount_percentage")
+
+# Shape of a result inside a SearchRound, LLM prompts and stored search history
+RECORD_FIELDS = (
+    "title", "price", "currency", "source", "url", "image_url",
+    "description", "rating", "review_count", "availability",
+)
+
+_MISSING = float("nan")
+
+
+def _number(value: Optional[float]) -> float:
+    return _MISSING if value is None else float(value)
+
+
+class ResultBatch:
+    """
+    Search results stored column by column.
+
+    String columns are plain lists, numeric columns are packed float arrays with
+    NaN standing in for "unknown", and availability is a bytearray. Numeric
+    columns can be viewed as NumPy arrays without copying, and the dict form
+    used by SearchRound and the LLM prompts is built once and then reused.
+
+    A batch is append-only while it is being filled; once handed out (cached,
+    ranked, turned into records) treat it as read-only.
+    """
+
+    __slots__ = STRING_COLUMNS + NUMERIC_COLUMNS + ("availability", "features", "_records")
+
+    def __init__(self):
+        for column in STRING_COLUMNS:
+            setattr(self, column, [])
+        for column in NUMERIC_COLUMNS:
+            setattr(self, column, array("d"))
+        self.availability = bytearray()
+        self.features: List[Optional[List[str]]] = []
+        self._records: Optional[List[Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        return len(self.title)
+
+    def append(self, title: str, price: Optional[float], currency: str, source: str, url: str,
+               image_url: Optional[str], description: str, rating: Optional[float],
+               review_count: Optional[int], availability: bool = True, category: Optional[str] = None,
+               brand: Optional[str] = None, features: Optional[List[str]] = None,
+               discount_percentage: Optional[float] = None):
+        self.title.append(title)
+        self.price.append(_number(price))
+        self.currency.append(currency)
+        self.source.append(source)
+        self.url.append(url)
+        self.image_url.append(image_url)
+        self.description.append(description)
+        self.rating.append(_number(rating))
+        self.review_count.append(_number(review_count))
+        self.availability.append(1 if availability else 0)
+        self.category.append(category)
+        self.brand.append(brand)
+        self.features.append(features)
+        self.discount_percentage.append(_number(discount_percentage))
+        self._records = None
+
+    def extend(self, other: "ResultBatch"):
+        for column in STRING_COLUMNS + NUMERIC_COLUMNS + ("availability", "features"):
+            getattr(self, column).extend(getattr(other, column))
+        self._records = None
+
+    @classmethod
+    def concat(cls, batches: Iterable["ResultBatch"]) -> "ResultBatch":
+        combined = cls()
+        for batch in batches:
+            combined.extend(batch)
+        return combined
+
+    def take(self, indices: Sequence[int]) -> "ResultBatch":
+        """New batch holding the given rows, in the given order"""
+        picked = ResultBatch()
+        indices = np.asarray(indices, dtype=np.intp)
+        if not len(indices):
+            return picked
+
+        getter = itemgetter(*indices.tolist())
+        for column in STRING_COLUMNS + ("features",):
+            values = getter(getattr(self, column))
+            setattr(picked, column, list(values) if len(indices) > 1 else [values])
+        for column in NUMERIC_COLUMNS:
+            getattr(picked, column).frombytes(self.numeric(column)[indices].tobytes())
+        picked.availability = bytearray(np.frombuffer(self.availability, dtype=np.uint8)[indices].tobytes())
+        return picked
+
+    def head(self, n: int) -> "ResultBatch":
+        return self.take(range(min(n, len(self))))
+
+    def numeric(self, column: str) -> np.ndarray:
+        """Zero-copy float64 view of a numeric column (NaN where unknown)"""
+        return np.frombuffer(getattr(self, column), dtype=np.float64) if len(self) else np.empty(0)
+
+    def available(self) -> np.ndarray:
+        return np.frombuffer(self.availability, dtype=np.uint8).astype(bool) if len(self) else np.empty(0, dtype=bool)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        Results as RECORD_FIELDS dicts, built once per batch.
+
+        The same list is returned on every call (cached batches share it across
+        requests), so callers must not mutate it.
+        """
+        if self._records is None:
+            review_counts = [None if count is None else int(count) for count in self._optional_floats("review_count")]
+            # Dict literals are allocated at their final size, unlike dict(zip(...))
+            self._records = [
+                {
+                    "title": title, "price": price, "currency": currency, "source": source, "url": url,
+                    "image_url": image_url, "description": description, "rating": rating,
+                    "review_count": review_count, "availability": availability
+                }
+                for title, price, currency, source, url, image_url, description, rating, review_count, availability
+                in zip(self.title, self._optional_floats("price"), self.currency, self.source, self.url,
+                       self.image_url, self.description, self._optional_floats("rating"), review_counts,
+                       self.available().tolist())
+            ]
+        return self._records
+
+    def _optional_floats(self, column: str) -> List[Optional[float]]:
+        values = self.numeric(column)
+        return np.where(np.isnan(values), None, values).tolist()
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the batch, for cache accounting"""
+        size = sys.getsizeof(self)
+        for column in STRING_COLUMNS:
+            values = getattr(self, column)
+            size += sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values if value is not None)
+        for column in NUMERIC_COLUMNS:
+            size += sys.getsizeof(getattr(self, column))
+        size += sys.getsizeof(self.availability) + sys.getsizeof(self.features)
+        size += sum(
+            sys.getsizeof(features) + sum(sys.getsizeof(feature) for feature in features)
+            for features in self.features if features
+        )
+        if self._records is not None:
+            # Records share the column strings; count only the containers
+            size += sys.getsizeof(self._records) + sum(sys.getsizeof(record) for record in self._records)
+        return size
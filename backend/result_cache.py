@@ -0,0 +1,150 @@
+import heapq
+import itertools
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import is_dataclass, fields
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+def approximate_size(obj: Any, _depth: int = 0) -> int:
+    """Rough recursive size of an object graph in bytes (good enough for cache accounting)"""
+    if _depth > 6:
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(
+            approximate_size(k, _depth + 1) + approximate_size(v, _depth + 1)
+            for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(approximate_size(item, _depth + 1) for item in obj)
+    if is_dataclass(obj):
+        return size + sum(approximate_size(getattr(obj, f.name), _depth + 1) for f in fields(obj))
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value: Any, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class ResultCache:
+    """
+    Bounded in-process cache with LRU eviction and active TTL expiry.
+
+    Entries are evicted least-recently-used first once either max_entries or
+    max_bytes is exceeded. Expired entries are removed eagerly through an
+    expiry heap on every access, not only when they are read again.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof or approximate_size
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, int, Hashable]] = []
+        self._sequence = itertools.count()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        self.expire()
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value and mark it as recently used"""
+        self.expire()
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting old entries until the cache is back within its limits"""
+        self.expire()
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            # Never let a single oversized value flush the whole cache
+            self.delete(key)
+            return
+
+        self.delete(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = _Entry(value, expires_at, size)
+        self._bytes += size
+        heapq.heappush(self._expiry_heap, (expires_at, next(self._sequence), key))
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, old_entry = self._entries.popitem(last=False)
+            self._bytes -= old_entry.size
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        return True
+
+    def clear(self):
+        self._entries.clear()
+        self._expiry_heap.clear()
+        self._bytes = 0
+
+    def expire(self) -> int:
+        """Drop every entry whose TTL has passed and return how many were removed"""
+        now = time.monotonic()
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # Heap items for replaced or evicted keys are stale, skip them
+            if entry is not None and entry.expires_at == expires_at:
+                self.delete(key)
+                self.expirations += 1
+                removed += 1
+
+        # Stale heap items pile up under heavy churn; rebuild once they dominate
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(e.expires_at, next(self._sequence), k) for k, e in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        self.expire()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -1,25 +1,54 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
+import time
 
-from database import get_db, Product, PriceHistory
+from database import get_async_db, Product, PriceHistory
 from llm_service import llm_service
+from catalog_search import search_catalog
+from price_trends import load_price_series, trend_reports
 
 router = APIRouter()
 
+MAX_ANALYSIS_DAYS = 365
+MAX_BATCH_PRODUCTS = 10000
+
+class BatchPriceAnalysisRequest(BaseModel):
+    product_ids: Optional[List[int]] = None
+    category: Optional[str] = None
+    days: int = 90
+
+@router.get("/search")
+async def search_products_catalog(q: str, limit: int = 20, category: Optional[str] = None,
+                                  db: AsyncSession = Depends(get_async_db)):
+    """Full-text search over stored products (BM25 ranked), no LLM or scraping involved"""
+    start = time.perf_counter()
+    results = await search_catalog(db, q, limit=min(max(limit, 1), 100), category=category)
+    return {
+        "query": q,
+        "count": len(results),
+        "results": results,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+
 @router.get("/{product_id}")
-async def get_product_details(product_id: int, db: Session = Depends(get_db)):
+async def get_product_details(product_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get detailed product information"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    result = await db.execute(select(Product).where(Product.id == product_id))
+    product = result.scalars().first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
     # Get price history
-    price_history = db.query(PriceHistory).filter(
-        PriceHistory.product_id == product_id
-    ).order_by(PriceHistory.recorded_at.desc()).limit(30).all()
+    result = await db.execute(
+        select(PriceHistory).where(
+            PriceHistory.product_id == product_id
+        ).order_by(PriceHistory.recorded_at.desc()).limit(30)
+    )
+    price_history = result.scalars().all()
     
     return {
         "product": {
@@ -49,48 +78,58 @@ async def get_product_details(product_id: int, db: Session = Depends(get_db)):
     }
 
 @router.get("/{product_id}/price-analysis")
-async def get_price_analysis(product_id: int, db: Session = Depends(get_db)):
-    """Get price trend analysis using LLM"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def get_price_analysis(product_id: int, days: int = 90, narrative: bool = False,
+                             db: AsyncSession = Depends(get_async_db)):
+    """Get price trend analysis computed from price history, optionally narrated by the LLM"""
+    result = await db.execute(select(Product).where(Product.id == product_id))
+    product = result.scalars().first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Get price history for last 90 days
-    since_date = datetime.utcnow() - timedelta(days=90)
-    price_history = db.query(PriceHistory).filter(
-        PriceHistory.product_id == product_id,
-        PriceHistory.recorded_at >= since_date
-    ).order_by(PriceHistory.recorded_at).all()
+    since_date = datetime.utcnow() - timedelta(days=min(max(days, 1), MAX_ANALYSIS_DAYS))
+    batch = await load_price_series(db, since_date, product_ids=[product_id])
+    analysis = trend_reports(batch, {product_id: product.currency or "USD"}).get(product_id)
     
-    if not price_history:
+    if not analysis:
         return {"message": "No price history available"}
     
-    # Prepare price data for LLM analysis
-    price_data = [
-        {
-            "price": ph.price,
-            "date": ph.recorded_at.isoformat(),
-            "source": ph.source
-        }
-        for ph in price_history
-    ]
-    
-    # Get LLM analysis
-    analysis = await llm_service.analyze_price_trends(price_data)
+    if narrative:
+        explained = await llm_service.analyze_price_trends(analysis)
+        analysis["insights"] = explained.get("insights") or analysis["insights"]
     
     return {
         "product_name": product.name,
         "current_price": product.price,
         "analysis": analysis,
-        "data_points": len(price_data)
+        "data_points": analysis["stats"]["observations"]
+    }
+
+@router.post("/price-analysis/batch")
+async def get_price_analysis_batch(request: BatchPriceAnalysisRequest, db: AsyncSession = Depends(get_async_db)):
+    """Price trend analysis for many products (or a whole category) in one pass, no LLM involved"""
+    if request.product_ids is None and not request.category:
+        raise HTTPException(status_code=400, detail="Provide product_ids or category")
+    if request.product_ids is not None and len(request.product_ids) > MAX_BATCH_PRODUCTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_PRODUCTS} products per request")
+    
+    start = time.perf_counter()
+    since_date = datetime.utcnow() - timedelta(days=min(max(request.days, 1), MAX_ANALYSIS_DAYS))
+    batch = await load_price_series(db, since_date, product_ids=request.product_ids, category=request.category)
+    reports = trend_reports(batch)
+    
+    return {
+        "count": len(reports),
+        "analyses": {str(product_id): report for product_id, report in reports.items()},
+        "took_ms": round((time.perf_counter() - start) * 1000, 2)
     }
 
 @router.get("/category/{category}")
-async def get_products_by_category(category: str, limit: int = 20, db: Session = Depends(get_db)):
+async def get_products_by_category(category: str, limit: int = 20, db: AsyncSession = Depends(get_async_db)):
     """Get products by category"""
-    products = db.query(Product).filter(
-        Product.category == category
-    ).limit(limit).all()
+    result = await db.execute(
+        select(Product).where(Product.category == category).limit(limit)
+    )
+    products = result.scalars().all()
     
     return [
         {
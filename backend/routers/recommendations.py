@@ -1,26 +1,31 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db, User, SearchHistory, UserInteraction, Product
+from database import get_async_db, User, SearchHistory, UserInteraction, Product
 from llm_service import llm_service
+from product_similarity import similarity_index
+from trending import trending_engine
 
 router = APIRouter()
 
 @router.get("/user/{user_id}")
-async def get_user_recommendations(user_id: int, limit: int = 10, db: Session = Depends(get_db)):
+async def get_user_recommendations(user_id: int, limit: int = 10, db: AsyncSession = Depends(get_async_db)):
     """Get personalized recommendations for a user"""
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get user's search history
-    search_history = db.query(SearchHistory).filter(
-        SearchHistory.user_id == user_id
-    ).order_by(SearchHistory.created_at.desc()).limit(10).all()
-    
-    search_queries = [search.query for search in search_history]
+    result = await db.execute(
+        select(SearchHistory.query).where(
+            SearchHistory.user_id == user_id
+        ).order_by(SearchHistory.created_at.desc()).limit(10)
+    )
+    search_queries = list(result.scalars().all())
     
     # Generate recommendations using LLM
     recommendations = await llm_service.generate_recommendations(
@@ -34,41 +39,47 @@ async def get_user_recommendations(user_id: int, limit: int = 10, db: Session =
     }
 
 @router.get("/trending")
-async def get_trending_products(category: Optional[str] = None, limit: int = 20, db: Session = Depends(get_db)):
+async def get_trending_products(category: Optional[str] = None, limit: int = 20, db: AsyncSession = Depends(get_async_db)):
     """Get trending products based on user interactions"""
     
-    # Mock trending products (in production, this would analyze actual interaction data)
+    # Time-decayed interaction weights, kept up to date as interactions arrive
+    top = trending_engine.top_products(limit, category)
+    products = {}
+    if top:
+        result = await db.execute(select(Product).where(Product.id.in_([product_id for product_id, _ in top])))
+        products = {product.id: product for product in result.scalars()}
+    
+    best = top[0][1] if top else 1.0
     trending = [
         {
-            "product_name": "iPhone 15 Pro",
-            "category": "electronics",
-            "estimated_price": 999.99,
-            "trending_score": 0.95,
-            "reason": "High search volume and user engagement"
-        },
-        {
-            "product_name": "AirPods Pro 3",
-            "category": "electronics", 
-            "estimated_price": 249.99,
-            "trending_score": 0.87,
-            "reason": "Frequently viewed with phones"
-        },
-        {
-            "product_name": "Nike Air Max",
-            "category": "fashion",
-            "estimated_price": 129.99,
-            "trending_score": 0.82,
-            "reason": "Popular in sports category"
+            "product_id": product.id,
+            "product_name": product.name,
+            "category": product.category,
+            "estimated_price": product.price,
+            "image_url": product.image_url,
+            "trending_score": round(weight / best, 3),
+            "reason": "Recent views, clicks and likes"
         }
+        for product_id, weight in top
+        if (product := products.get(product_id)) is not None
     ]
     
-    if category:
-        trending = [item for item in trending if item["category"] == category]
-    
-    return {"trending": trending[:limit]}
+    top_categories = trending_engine.top_categories(10)
+    top_queries = trending_engine.top_queries(10)
+    return {
+        "trending": trending,
+        "categories": [
+            {"category": name, "trending_score": round(weight / top_categories[0][1], 3)}
+            for name, weight in top_categories
+        ],
+        "searches": [
+            {"query": query, "trending_score": round(weight / top_queries[0][1], 3)}
+            for query, weight in top_queries
+        ]
+    }
 
 @router.get("/deals")
-async def get_current_deals(category: Optional[str] = None, limit: int = 15, db: Session = Depends(get_db)):
+async def get_current_deals(category: Optional[str] = None, limit: int = 15, db: AsyncSession = Depends(get_async_db)):
     """Get current deals and discounts"""
     
     # Mock deals (in production, this would query real deal data)
@@ -108,10 +119,46 @@ async def get_current_deals(category: Optional[str] = None, limit: int = 15, db:
     return {"deals": deals[:limit]}
 
 @router.post("/user/{user_id}/similar")
-async def get_similar_products(user_id: int, product_info: Dict[str, Any], db: Session = Depends(get_db)):
+async def get_similar_products(user_id: int, product_info: Dict[str, Any], limit: int = 10,
+                               db: AsyncSession = Depends(get_async_db)):
     """Get products similar to user's interests"""
     
-    # Use LLM to find similar products
+    # Nearest stored products by TF-IDF similarity: a stored product by id, else the described one.
+    # Products other workers stored are picked up in the background, never on this request.
+    similarity_index.sync_in_background()
+    neighbours = None
+    try:
+        product_id = product_info.get("id", product_info.get("product_id"))
+        if product_id is not None:
+            neighbours = similarity_index.similar_to_product(int(product_id), limit)
+    except (TypeError, ValueError):
+        pass
+    if neighbours is None:
+        neighbours = similarity_index.similar_to(product_info, limit)
+    
+    if neighbours:
+        result = await db.execute(select(Product).where(Product.id.in_([product_id for product_id, _ in neighbours])))
+        products = {product.id: product for product in result.scalars()}
+        similar_products = [
+            {
+                "id": product.id,
+                "name": product.name,
+                "brand": product.brand,
+                "category": product.category,
+                "price": product.price,
+                "currency": product.currency,
+                "ratings": product.ratings,
+                "image_url": product.image_url,
+                "source_url": product.source_url,
+                "similarity": similarity
+            }
+            for product_id, similarity in neighbours
+            if (product := products.get(product_id)) is not None
+        ]
+        if similar_products:
+            return {"similar_products": similar_products}
+    
+    # Nothing related in the catalog yet: ask the LLM
     messages = [
         {
             "role": "system",
@@ -124,7 +171,7 @@ async def get_similar_products(user_id: int, product_info: Dict[str, Any], db: S
         }
     ]
     
-    response = await llm_service.call_llm(messages)
+    response = await llm_service.call_llm(messages, operation="similar_products")
     
     try:
         import json
@@ -134,13 +181,16 @@ async def get_similar_products(user_id: int, product_info: Dict[str, Any], db: S
         return {"similar_products": [], "message": "Could not generate similar products"}
 
 @router.get("/categories/{category}/popular")
-async def get_popular_in_category(category: str, limit: int = 10, db: Session = Depends(get_db)):
+async def get_popular_in_category(category: str, limit: int = 10, db: AsyncSession = Depends(get_async_db)):
     """Get popular products in a specific category"""
     
     # Get products from database in this category
-    products = db.query(Product).filter(
-        Product.category == category
-    ).order_by(Product.ratings.desc()).limit(limit).all()
+    result = await db.execute(
+        select(Product).where(
+            Product.category == category
+        ).order_by(Product.ratings.desc()).limit(limit)
+    )
+    products = result.scalars().all()
     
     return [
         {
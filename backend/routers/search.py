@@ -1,20 +1,36 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import asyncio
+import json
 import logging
+import os
 
-from database import get_db, SearchHistory, Product, PriceHistory
-from llm_service import llm_service, SearchRound
+from database import get_async_db, AsyncSessionLocal, SearchHistory
+from llm_service import llm_service, SearchRound, round_payload
 from search_service import search_service
+from result_batch import ResultBatch
+from metrics import metrics
+from singleflight import SingleFlight
+from product_ingest import upsert_products
+from search_store import save_search, load_search_payload, legacy_summaries
+from chat_digest import build_chat_digest, referenced_products
+from ranker import RankingProfile, get_profile
+from trending import trending_engine
 
 router = APIRouter()
 
+# Ranked results kept per search round (the top-k of everything the sources returned)
+SEARCH_RESULTS_PER_ROUND = int(os.getenv("SEARCH_RESULTS_PER_ROUND", "50"))
+
 class SearchRequest(BaseModel):
     query: str
     user_id: Optional[int] = None
     max_rounds: int = 3
+    ranking_profile: Optional[str] = None  # "default", "budget", "quality" or a RANKING_PROFILES_JSON name
 
 class SearchResponse(BaseModel):
     query: str
@@ -31,6 +47,8 @@ class ChatRequest(BaseModel):
     search_id: int
     message: str
     user_id: Optional[int] = None
+    include_product_details: bool = True  # Attach full details of products the message mentions
+    include_reasoning: bool = False  # /chat/stream only: also stream the model's reasoning tokens
 
 def create_mock_search_response(query: str) -> Dict[str, Any]:
     """Create a mock search response when LLM service is unavailable"""
@@ -94,120 +112,191 @@ def create_mock_search_response(query: str) -> Dict[str, Any]:
         "buying_recommendation": f"For {query}, consider the Budget Model for value or Premium Edition for best features. Professional Grade is ideal if you need maximum quality."
     }
 
+def _mock_query_analysis(query: str) -> Dict[str, Any]:
+    """Query analysis used when the LLM service is unavailable"""
+    return {
+        "product_name": query,
+        "category": "general",
+        "key_features": [],
+        "price_range": {"min": 0, "max": 1000},
+        "search_keywords": [query],
+        "intent": "research",
+        "specificity": "medium"
+    }
+
+async def _fetch_round(query_analysis: Dict[str, Any], round_num: int,
+                       profile: RankingProfile) -> Tuple[List[str], ResultBatch]:
+    """Generate the queries for a round, run them across all sources and keep the best ranked"""
+    logging.info(f"Starting search round {round_num}")
+    search_queries = await llm_service.generate_search_queries(query_analysis, round_num)
+    round_results = await search_service.search_multiple_sources(
+        search_queries,
+        price_range=query_analysis.get("price_range"),
+        profile=profile,
+        top_k=SEARCH_RESULTS_PER_ROUND
+    )
+    return search_queries, round_results
+
+def _discard_task(task: asyncio.Task):
+    """Cancel speculative work that is no longer needed"""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled() and task.exception() is not None:
+        logging.info(f"Discarded speculative round failed: {task.exception()}")
+
+async def run_search_pipeline(request: SearchRequest) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the multi-round search and yield (event, data) pairs as soon as each step is ready.
+
+    Events, in order: "analysis" (query analysis dict), then per round "round"
+    (SearchRound) and "round_analysis" (dict), and finally "summary" (product summary dict).
+    """
+    metrics.add("search_pipelines_in_flight", 1)
+    try:
+        async for step in _search_steps(request):
+            yield step
+    finally:
+        metrics.add("search_pipelines_in_flight", -1)
+
+async def _search_steps(request: SearchRequest) -> AsyncIterator[Tuple[str, Any]]:
+    # Step 1: Try LLM analysis, fallback to mock if it fails
+    try:
+        logging.info(f"Starting search for query: {request.query}")
+        query_analysis = await llm_service.analyze_user_query(request.query)
+        use_llm = True
+    except Exception as llm_error:
+        logging.warning(f"LLM service unavailable, using mock data: {llm_error}")
+        query_analysis = _mock_query_analysis(request.query)
+        use_llm = False
+
+    yield "analysis", query_analysis
+
+    if not use_llm:
+        # Use mock data when LLM is unavailable
+        logging.info("Using mock search results")
+        product_summary = create_mock_search_response(request.query)
+        yield "round", SearchRound(
+            query=f"Mock search for: {request.query}",
+            results=product_summary["products"],
+            reasoning="Mock search results for demonstration"
+        )
+        yield "summary", product_summary
+        return
+
+    # Step 2: Perform multiple rounds of searching with LLM. Rounds are pipelined:
+    # while round N is being analysed, the queries and searches for round N+1 already
+    # run speculatively and are discarded if the analysis says to stop.
+    search_rounds = []
+    profile = get_profile(request.ranking_profile)
+    next_round = asyncio.create_task(_fetch_round(query_analysis, 1, profile))
+
+    try:
+        for round_num in range(1, request.max_rounds + 1):
+            search_queries, round_results = await next_round
+            next_round = None
+
+            if round_num < request.max_rounds:
+                next_round = asyncio.create_task(_fetch_round(query_analysis, round_num + 1, profile))
+
+            # Dict form is built once per batch and shared with cached repeats
+            round_results_dict = round_results.records()
+
+            # Create search round object (already-built records need no validation copy)
+            search_round = SearchRound.model_construct(
+                query=f"Round {round_num}: {', '.join(search_queries)}",
+                results=round_results_dict,
+                reasoning=f"Round {round_num} focused on: " + (
+                    "basic product info and prices" if round_num == 1 else
+                    "technical specs and reviews" if round_num == 2 else
+                    "deals and alternatives"
+                )
+            )
+
+            search_rounds.append(search_round)
+            yield "round", search_round
+
+            # Analyze current results and decide if more rounds are needed
+            analysis = await llm_service.analyze_search_results(
+                request.query,
+                round_results_dict,
+                search_rounds[:-1]
+            )
+            yield "round_analysis", {"round": round_num, "analysis": analysis}
+
+            # Stop early if we have sufficient quality results
+            if not analysis.get("needs_more_rounds", True) and round_num >= 2:
+                logging.info(f"Stopping search early after round {round_num} - sufficient results found")
+                break
+    finally:
+        if next_round is not None:
+            _discard_task(next_round)
+
+    # Step 3: Generate comprehensive summary using LLM
+    logging.info("Generating product summary with LLM")
+    yield "summary", await llm_service.generate_product_summary(search_rounds)
+
+async def save_search_history(db: AsyncSession, request: SearchRequest, search_rounds: List[SearchRound],
+                        product_summary: Dict[str, Any], query_analysis: Dict[str, Any]) -> SearchHistory:
+    """Persist a completed search and return the stored row"""
+    search = await save_search(
+        db,
+        request.user_id,
+        request.query,
+        [round_payload(round) for round in search_rounds],
+        product_summary,
+        query_analysis,
+        chat_digest=build_chat_digest(request.query, query_analysis, product_summary)
+    )
+    trending_engine.record_search(request.query, query_analysis.get("category"))
+    return search
+
+# Coalesces identical concurrent searches into one pipeline run
+search_flights = SingleFlight()
+
+def _search_flight_key(request: SearchRequest) -> Tuple[str, int, Optional[str]]:
+    return " ".join(request.query.lower().split()), request.max_rounds, request.ranking_profile
+
+async def _collect_search(request: SearchRequest) -> Tuple[Dict[str, Any], List[SearchRound], Dict[str, Any]]:
+    """Run the search pipeline to completion and return (analysis, rounds, summary)"""
+    query_analysis = {}
+    search_rounds = []
+    product_summary = {}
+
+    async for event, data in run_search_pipeline(request):
+        if event == "analysis":
+            query_analysis = data
+        elif event == "round":
+            search_rounds.append(data)
+        elif event == "summary":
+            product_summary = data
+
+    return query_analysis, search_rounds, product_summary
+
 @router.post("/", response_model=SearchResponse)
-async def search_products(request: SearchRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def search_products(request: SearchRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
     """
     Perform multi-round LLM-powered product search
     """
     try:
-        # Step 1: Try LLM analysis, fallback to mock if it fails
-        try:
-            logging.info(f"Starting search for query: {request.query}")
-            query_analysis = await llm_service.analyze_user_query(request.query)
-            use_llm = True
-        except Exception as llm_error:
-            logging.warning(f"LLM service unavailable, using mock data: {llm_error}")
-            query_analysis = {
-                "product_name": request.query,
-                "category": "general",
-                "key_features": [],
-                "price_range": {"min": 0, "max": 1000},
-                "search_keywords": [request.query],
-                "intent": "research",
-                "specificity": "medium"
-            }
-            use_llm = False
-        
-        if use_llm:
-            # Step 2: Perform multiple rounds of searching with LLM
-            search_rounds = []
-            all_search_results = []
-            
-            for round_num in range(1, request.max_rounds + 1):
-                logging.info(f"Starting search round {round_num}")
-                
-                # Generate search queries for this round
-                search_queries = await llm_service.generate_search_queries(query_analysis, round_num)
-                
-                # Perform searches across multiple sources
-                round_results = await search_service.search_multiple_sources(search_queries)
-                
-                # Convert search results to dict format
-                round_results_dict = [
-                    {
-                        "title": result.title,
-                        "price": result.price,
-                        "currency": result.currency,
-                        "source": result.source,
-                        "url": result.url,
-                        "image_url": result.image_url,
-                        "description": result.description,
-                        "rating": result.rating,
-                        "review_count": result.review_count,
-                        "availability": result.availability
-                    }
-                    for result in round_results
-                ]
-                
-                # Create search round object
-                search_round = SearchRound(
-                    query=f"Round {round_num}: {', '.join(search_queries)}",
-                    results=round_results_dict,
-                    reasoning=f"Round {round_num} focused on: " + (
-                        "basic product info and prices" if round_num == 1 else
-                        "technical specs and reviews" if round_num == 2 else
-                        "deals and alternatives"
-                    )
-                )
-                
-                search_rounds.append(search_round)
-                all_search_results.extend(round_results_dict)
-                
-                # Analyze current results and decide if more rounds are needed
-                analysis = await llm_service.analyze_search_results(
-                    request.query, 
-                    round_results_dict, 
-                    search_rounds[:-1]
-                )
-                
-                # Stop early if we have sufficient quality results
-                if not analysis.get("needs_more_rounds", True) and round_num >= 2:
-                    logging.info(f"Stopping search early after round {round_num} - sufficient results found")
-                    break
-            
-            # Step 3: Generate comprehensive summary using LLM
-            logging.info("Generating product summary with LLM")
-            product_summary = await llm_service.generate_product_summary(search_rounds)
-            
-        else:
-            # Use mock data when LLM is unavailable
-            logging.info("Using mock search results")
-            product_summary = create_mock_search_response(request.query)
-            search_rounds = [SearchRound(
-                query=f"Mock search for: {request.query}",
-                results=product_summary["products"],
-                reasoning="Mock search results for demonstration"
-            )]
-        
-        # Step 4: Store search history in database
-        search_history = SearchHistory(
-            user_id=request.user_id,
-            query=request.query,
-            search_results={
-                "rounds": [round.dict() for round in search_rounds],
-                "summary": product_summary,
-                "analysis": query_analysis
-            },
-            search_rounds=len(search_rounds)
+        # Identical concurrent searches share one pipeline run
+        (query_analysis, search_rounds, product_summary), shared = await search_flights.do(
+            _search_flight_key(request), lambda: _collect_search(request)
         )
-        
-        db.add(search_history)
-        db.commit()
-        db.refresh(search_history)
-        
-        # Step 5: Store products in database (background task)
-        background_tasks.add_task(store_products_background, product_summary.get("products", []), db)
-        
+        if shared:
+            metrics.inc("search_coalesced_total")
+            logging.info(f"Joined in-flight search for query: {request.query}")
+
+        # Step 4: Store search history in database
+        search_history = await save_search_history(db, request, search_rounds, product_summary, query_analysis)
+
+        # Step 5: Store products in database (background task, once per pipeline run)
+        if not shared:
+            background_tasks.add_task(
+                store_products_background,
+                product_summary.get("products", []),
+                query_analysis.get("category") or "general"
+            )
+
         # Step 6: Prepare response
         response = SearchResponse(
             query=request.query,
@@ -220,67 +309,156 @@ async def search_products(request: SearchRequest, background_tasks: BackgroundTa
             buying_recommendation=product_summary.get("buying_recommendation", ""),
             search_id=search_history.id
         )
-        
+
         logging.info(f"Search completed successfully. Found {len(product_summary.get('products', []))} products.")
         return response
-        
+
     except Exception as e:
         logging.error(f"Search failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+def _sse(event: str, data: Any) -> str:
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/stream")
+async def stream_search_products(request: SearchRequest, http_request: Request):
+    """
+    Multi-round product search streamed as Server-Sent Events.
+
+    Emits "analysis", "round", "round_analysis" and "summary" events as each step
+    finishes, then "done" with the stored search id. Disconnecting stops the search.
+    """
+    async def event_stream():
+        query_analysis = {}
+        search_rounds = []
+        product_summary = {}
+
+        try:
+            async for event, data in run_search_pipeline(request):
+                if await http_request.is_disconnected():
+                    logging.info(f"Client disconnected, cancelling streamed search for: {request.query}")
+                    return
+
+                if event == "analysis":
+                    query_analysis = data
+                elif event == "round":
+                    search_rounds.append(data)
+                    data = {"round": len(search_rounds), **round_payload(data)}
+                elif event == "summary":
+                    product_summary = data
+
+                yield _sse(event, data)
+
+            # The request-scoped session may already be closed while the body streams
+            async with AsyncSessionLocal() as db:
+                search_history = await save_search_history(db, request, search_rounds, product_summary, query_analysis)
+                search_id = search_history.id
+
+            yield _sse("done", {
+                "search_id": search_id,
+                "rounds_completed": len(search_rounds),
+                "total_results": len(product_summary.get("products", []))
+            })
+
+            await store_products_background(
+                product_summary.get("products", []),
+                query_analysis.get("category") or "general"
+            )
+
+        except asyncio.CancelledError:
+            logging.info(f"Streamed search cancelled for: {request.query}")
+            raise
+        except Exception as e:
+            logging.error(f"Streamed search failed: {str(e)}")
+            yield _sse("error", {"detail": f"Search failed: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            # Keeps GZipMiddleware from buffering the event stream
+            "Content-Encoding": "identity"
+        }
+    )
+
+async def _chat_messages(db: AsyncSession, search_history: SearchHistory, request: ChatRequest) -> List[Dict[str, str]]:
+    """LLM messages for a chat turn: the stored search digest plus details of products the message mentions"""
+    # Compact digest built when the search was stored; older searches get one built now
+    digest = (await load_search_payload(db, search_history, parts=("digest",)))["digest"]
+    if not digest:
+        stored = await load_search_payload(db, search_history, parts=("analysis", "summary"))
+        digest = build_chat_digest(search_history.query, stored["analysis"], stored["summary"])
+    
+    search_context = f"Search context:\n{digest['text']}"
+    
+    # Full details only for the products this message refers to
+    if request.include_product_details:
+        positions = referenced_products(request.message, digest.get("products", []))
+        if positions:
+            summary = (await load_search_payload(db, search_history, parts=("summary",)))["summary"]
+            products = summary.get("products") or []
+            details = [{"position": position + 1, **products[position]}
+                       for position in positions if position < len(products)]
+            if details:
+                search_context += f"\n\nDetails of the products the user mentioned: {json.dumps(details, default=str)}"
+    
+    return [
+        {
+            "role": "system",
+            "content": """You are a helpful shopping assistant. The user is asking about their previous search results. 
+            Provide helpful, specific advice based on the search results. You can:
+            - Answer questions about specific products
+            - Compare products from the search results
+            - Provide buying advice
+            - Clarify product features
+            - Suggest alternatives from the results
+            
+            Be conversational and helpful."""
+        },
+        {
+            "role": "user",
+            "content": f"{search_context}\n\nUser question: {request.message}"
+        }
+    ]
+
+def _fallback_chat_response(query: str, message: str) -> str:
+    """Simple canned answer used when the LLM is unavailable"""
+    if "price" in message.lower():
+        return f"Based on your search for '{query}', I found products ranging from budget to premium options. The price analysis shows good variety to fit different budgets."
+    elif "recommend" in message.lower():
+        return f"For '{query}', I'd recommend considering the budget model for value or the premium edition for best features, depending on your needs and budget."
+    elif "compare" in message.lower():
+        return f"The products from your '{query}' search differ mainly in price, features, and brand reputation. Each has different strengths depending on your priorities."
+    else:
+        return f"I found several options for '{query}'. What specific aspect would you like to know more about - pricing, features, or recommendations?"
+
+async def _get_search_or_404(db: AsyncSession, search_id: int) -> SearchHistory:
+    result = await db.execute(select(SearchHistory).where(SearchHistory.id == search_id))
+    search_history = result.scalars().first()
+    if not search_history:
+        raise HTTPException(status_code=404, detail="Search not found")
+    return search_history
+
 @router.post("/chat")
-async def chat_about_search(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat_about_search(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Continue conversation about search results
     """
     try:
         # Get search history
-        search_history = db.query(SearchHistory).filter(SearchHistory.id == request.search_id).first()
-        if not search_history:
-            raise HTTPException(status_code=404, detail="Search not found")
+        search_history = await _get_search_or_404(db, request.search_id)
         
         # Try LLM response, fallback to simple response
         try:
-            # Prepare context for LLM
-            search_context = {
-                "original_query": search_history.query,
-                "search_results": search_history.search_results,
-                "user_message": request.message
-            }
-            
-            # Generate LLM response based on user's message and search context
-            messages = [
-                {
-                    "role": "system",
-                    "content": """You are a helpful shopping assistant. The user is asking about their previous search results. 
-                    Provide helpful, specific advice based on the search results. You can:
-                    - Answer questions about specific products
-                    - Compare products from the search results
-                    - Provide buying advice
-                    - Clarify product features
-                    - Suggest alternatives from the results
-                    
-                    Be conversational and helpful."""
-                },
-                {
-                    "role": "user",
-                    "content": f"Search context: {search_context}\n\nUser question: {request.message}"
-                }
-            ]
-            
-            response = await llm_service.call_llm(messages)
+            messages = await _chat_messages(db, search_history, request)
+            response = await llm_service.call_llm(messages, operation="chat")
             
         except Exception as llm_error:
             logging.warning(f"LLM chat failed, using fallback: {llm_error}")
-            # Simple fallback responses
-            if "price" in request.message.lower():
-                response = f"Based on your search for '{search_history.query}', I found products ranging from budget to premium options. The price analysis shows good variety to fit different budgets."
-            elif "recommend" in request.message.lower():
-                response = f"For '{search_history.query}', I'd recommend considering the budget model for value or the premium edition for best features, depending on your needs and budget."
-            elif "compare" in request.message.lower():
-                response = f"The products from your '{search_history.query}' search differ mainly in price, features, and brand reputation. Each has different strengths depending on your priorities."
-            else:
-                response = f"I found several options for '{search_history.query}'. What specific aspect would you like to know more about - pricing, features, or recommendations?"
+            response = _fallback_chat_response(search_history.query, request.message)
         
         return {
             "response": response,
@@ -288,46 +466,127 @@ async def chat_about_search(request: ChatRequest, db: Session = Depends(get_db))
             "query": search_history.query
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Chat failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
+@router.post("/chat/stream")
+async def stream_chat_about_search(request: ChatRequest, http_request: Request,
+                                   db: AsyncSession = Depends(get_async_db)):
+    """
+    Chat about search results with the answer streamed as Server-Sent Events.
+
+    Emits "token" events ({"text": ...}) as the model produces them, "reasoning"
+    events too when include_reasoning is set, then "done". Disconnecting stops
+    the upstream generation.
+    """
+    search_history = await _get_search_or_404(db, request.search_id)
+    try:
+        messages = await _chat_messages(db, search_history, request)
+    except Exception as e:
+        logging.warning(f"Failed to build chat context, using fallback: {e}")
+        messages = None
+
+    async def event_stream():
+        streamed = False
+        try:
+            if messages is not None:
+                tokens = llm_service.stream_llm(messages, operation="chat", include_reasoning=request.include_reasoning)
+                try:
+                    async for kind, text in tokens:
+                        if await http_request.is_disconnected():
+                            logging.info(f"Client disconnected, stopping chat stream for search {request.search_id}")
+                            return
+                        streamed = streamed or kind == "content"
+                        yield _sse("token" if kind == "content" else "reasoning", {"text": text})
+                finally:
+                    # Closes the upstream response right away instead of at garbage collection
+                    await tokens.aclose()
+        except asyncio.CancelledError:
+            logging.info(f"Chat stream cancelled for search {request.search_id}")
+            raise
+        except Exception as llm_error:
+            if streamed:
+                logging.error(f"Chat stream failed midway: {llm_error}")
+                yield _sse("error", {"detail": f"Chat failed: {str(llm_error)}"})
+                return
+            logging.warning(f"LLM chat stream failed, using fallback: {llm_error}")
+
+        if not streamed:
+            yield _sse("token", {"text": _fallback_chat_response(search_history.query, request.message)})
+        yield _sse("done", {"search_id": request.search_id, "query": search_history.query})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            # Keeps GZipMiddleware from buffering the event stream
+            "Content-Encoding": "identity"
+        }
+    )
+
 @router.get("/history")
-async def get_search_history(user_id: int, limit: int = 10, db: Session = Depends(get_db)):
+async def get_search_history(user_id: int, limit: int = 10, db: AsyncSession = Depends(get_async_db)):
     """
     Get user's search history
     """
     try:
-        searches = db.query(SearchHistory).filter(
-            SearchHistory.user_id == user_id
-        ).order_by(
-            SearchHistory.created_at.desc()
-        ).limit(limit).all()
+        # Only the small summary columns; payloads are never read for listings
+        result = await db.execute(
+            select(
+                SearchHistory.id,
+                SearchHistory.query,
+                SearchHistory.created_at,
+                SearchHistory.search_rounds,
+                SearchHistory.results_count,
+                SearchHistory.top_products,
+                SearchHistory.price_min,
+                SearchHistory.price_max
+            ).where(
+                SearchHistory.user_id == user_id
+            ).order_by(
+                SearchHistory.created_at.desc()
+            ).limit(limit)
+        )
+        searches = result.all()
         
-        return {
-            "searches": [
-                {
-                    "id": search.id,
-                    "query": search.query,
-                    "created_at": search.created_at,
-                    "search_rounds": search.search_rounds,
-                    "results_count": len(search.search_results.get("summary", {}).get("products", []))
-                }
-                for search in searches
-            ]
-        }
+        # Rows stored before the summary columns existed fall back to their blob
+        legacy = await legacy_summaries(db, [search.id for search in searches if search.results_count is None])
+        
+        history = []
+        for search in searches:
+            summary = legacy.get(search.id) or {
+                "results_count": search.results_count,
+                "top_products": search.top_products or [],
+                "price_min": search.price_min,
+                "price_max": search.price_max
+            }
+            history.append({
+                "id": search.id,
+                "query": search.query,
+                "created_at": search.created_at,
+                "search_rounds": search.search_rounds,
+                **summary
+            })
+        
+        return {"searches": history}
         
     except Exception as e:
         logging.error(f"Failed to get search history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get search history: {str(e)}")
 
 @router.get("/{search_id}")
-async def get_search_details(search_id: int, db: Session = Depends(get_db)):
+async def get_search_details(search_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get detailed information about a specific search
     """
     try:
-        search = db.query(SearchHistory).filter(SearchHistory.id == search_id).first()
+        result = await db.execute(select(SearchHistory).where(SearchHistory.id == search_id))
+        search = result.scalars().first()
         if not search:
             raise HTTPException(status_code=404, detail="Search not found")
         
@@ -335,7 +594,7 @@ async def get_search_details(search_id: int, db: Session = Depends(get_db)):
             "id": search.id,
             "query": search.query,
             "created_at": search.created_at,
-            "search_results": search.search_results,
+            "search_results": await load_search_payload(db, search),
             "search_rounds": search.search_rounds
         }
         
@@ -343,37 +602,10 @@ async def get_search_details(search_id: int, db: Session = Depends(get_db)):
         logging.error(f"Failed to get search details: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get search details: {str(e)}")
 
-async def store_products_background(products_data: List[Dict], db: Session):
+async def store_products_background(products_data: List[Dict], category: str = "general"):
     """Store products in database as background task"""
     try:
-        for product_data in products_data:
-            # Check if product already exists
-            existing = db.query(Product).filter(
-                Product.name == product_data.get("name"),
-                Product.source == product_data.get("source")
-            ).first()
-            
-            if not existing:
-                product = Product(
-                    name=product_data.get("name", ""),
-                    brand=product_data.get("brand", ""),
-                    category="general",  # Could be improved with LLM categorization
-                    price=product_data.get("price", 0.0),
-                    currency=product_data.get("currency", "USD"),
-                    source=product_data.get("source", ""),
-                    source_url=product_data.get("source_url", ""),
-                    image_url=product_data.get("image_url"),
-                    description=", ".join(product_data.get("key_features", [])),
-                    features=product_data.get("key_features", []),
-                    rating=product_data.get("rating"),
-                    review_count=product_data.get("review_count"),
-                    availability=product_data.get("availability", True)
-                )
-                db.add(product)
-                
-        db.commit()
-        logging.info(f"Stored {len(products_data)} products in database")
-        
+        stored = await upsert_products(products_data, category=category)
+        logging.info(f"Stored {stored} products in database")
     except Exception as e:
         logging.error(f"Failed to store products: {str(e)}")
-        db.rollback() 
\ No newline at end of file
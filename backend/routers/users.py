@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db, User, UserInteraction
+from database import get_async_db, User, UserInteraction, Product
+from trending import trending_engine
 
 router = APIRouter()
 
@@ -25,12 +27,13 @@ class UserResponse(BaseModel):
     created_at: Any
 
 @router.post("/register", response_model=UserResponse)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user exists
-    existing_user = db.query(User).filter(
-        (User.email == user.email) | (User.username == user.username)
-    ).first()
+    result = await db.execute(
+        select(User).where(or_(User.email == user.email, User.username == user.username))
+    )
+    existing_user = result.scalars().first()
     
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
@@ -44,20 +47,21 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
 @router.put("/{user_id}/preferences")
-async def update_preferences(user_id: int, preferences: UserPreferences, db: Session = Depends(get_db)):
+async def update_preferences(user_id: int, preferences: UserPreferences, db: AsyncSession = Depends(get_async_db)):
     """Update user preferences for personalized recommendations"""
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.preferences = preferences.dict()
-    db.commit()
+    await db.commit()
     
     return {"message": "Preferences updated successfully"}
 
@@ -78,7 +82,7 @@ async def get_recommended_categories():
     return {"categories": categories}
 
 @router.post("/{user_id}/interaction")
-async def track_interaction(user_id: int, interaction_data: Dict[str, Any], db: Session = Depends(get_db)):
+async def track_interaction(user_id: int, interaction_data: Dict[str, Any], db: AsyncSession = Depends(get_async_db)):
     """Track user interactions for analytics and recommendations"""
     interaction = UserInteraction(
         user_id=user_id,
@@ -89,6 +93,17 @@ async def track_interaction(user_id: int, interaction_data: Dict[str, Any], db:
     )
     
     db.add(interaction)
-    db.commit()
+    await db.commit()
+    
+    # Count it towards trending products and categories straight away
+    try:
+        product_id = int(interaction.product_id) if interaction.product_id is not None else None
+    except (TypeError, ValueError):
+        product_id = None
+    category = interaction_data.get("category")
+    if product_id is not None and not category and product_id not in trending_engine.product_categories:
+        result = await db.execute(select(Product.category).where(Product.id == product_id))
+        category = result.scalar()
+    trending_engine.record_interaction(interaction.interaction_type, product_id, category)
     
     return {"message": "Interaction tracked"} 
\ No newline at end of file
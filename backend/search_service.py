@@ -1,38 +1,70 @@
 import asyncio
+import os
 import httpx
-from bs4 import BeautifulSoup
-import json
 from typing import List, Dict, Any, Optional
-import re
-from urllib.parse import urljoin, urlparse
-from dataclasses import dataclass
+from urllib.parse import urlparse
 import logging
-from asyncio_throttle import Throttler
 import hashlib
+import math
 import time
 from functools import lru_cache
 import random
+from collections import Counter
 
-@dataclass
-class SearchResult:
-    title: str
-    price: Optional[float]
-    currency: str
-    source: str
-    url: str
-    image_url: Optional[str]
-    description: str
-    rating: Optional[float]
-    review_count: Optional[int]
-    availability: bool = True
-    category: Optional[str] = None
-    brand: Optional[str] = None
-    features: List[str] = None
-    discount_percentage: Optional[float] = None
+import numpy as np
+
+from result_cache import ResultCache
+from result_batch import ResultBatch
+from ranker import RankingProfile, rank_results, ranking_key
+from price_extractor import extract_price, extract_prices
+from page_parser import parse_product_page, parse_search_results
+from parse_pool import ParsePool
+from request_scheduler import Priority, QueueTimeout, RequestScheduler
+from page_cache import ProductPageCache
+from metrics import metrics
+
+# Product pages that no longer exist; their cached details are dropped
+GONE_STATUSES = frozenset({404, 410})
+
+
+def _retailer_failing(error: Exception) -> bool:
+    """Unreachable, overloaded or throttling us: cached details may be served past their freshness"""
+    if isinstance(error, QueueTimeout):
+        return True  # backed off or backed up, as good as a 429
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+# Log-spaced price buckets: two prices within 10% of each other always land in
+# the same or an adjacent bucket. Prices below the floor share one bucket.
+_PRICE_BUCKET_WIDTH = -math.log(0.9)
+_PRICE_BUCKET_FLOOR = math.floor(math.log(0.1) / _PRICE_BUCKET_WIDTH) - 1
+
+def _price_bucket(price: Optional[float]) -> int:
+    if not price or price <= 0:
+        return _PRICE_BUCKET_FLOOR
+    return max(math.floor(math.log(price) / _PRICE_BUCKET_WIDTH), _PRICE_BUCKET_FLOOR)
+
+def _title_prefix(words: frozenset, word_counts: Counter) -> List[str]:
+    """
+    Rarest-first prefix of a title's words. Two titles whose overlap exceeds
+    70% of the longer one always share a word within these prefixes.
+    """
+    if not words:
+        return []
+    # Smallest overlap that can pass the `overlap / max(...) > 0.7` check in deduplicate_results
+    min_overlap = math.floor(0.7 * len(words))
+    while min_overlap / len(words) <= 0.7:
+        min_overlap += 1
+    ordered = sorted(words, key=lambda word: (word_counts[word], word))
+    return ordered[:len(words) - min_overlap + 1]
 
 class SearchService:
     def __init__(self):
-        self.throttler = Throttler(rate_limit=15, period=1.0)  # Increased rate limit
+        # Per-host rate, concurrency and backoff for every outbound scrape
+        self.scheduler = RequestScheduler()
+        # Extracted product pages, revalidated with ETag/Last-Modified once stale
+        self.page_cache = ProductPageCache()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -44,16 +76,46 @@ class SearchService:
             'Sec-Fetch-Mode': 'navigate',
             'Sec-Fetch-Site': 'none',
         }
-        self.search_cache = {}
-        self.cache_ttl = 300  # 5 minutes cache
+        self.cache_ttl = int(os.getenv("SEARCH_CACHE_TTL", "300"))  # 5 minutes cache
+        self.search_cache = ResultCache(
+            max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            ttl=self.cache_ttl,
+            sizeof=ResultBatch.nbytes
+        )
+        # Ranked batches of cached results, per profile, price range and top_k; bounded on its own
+        self.ranking_cache = ResultCache(
+            max_entries=int(os.getenv("RANKING_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("RANKING_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            ttl=self.cache_ttl,
+            sizeof=ResultBatch.nbytes
+        )
+        # Page parsing runs off the event loop, in worker processes
+        self.parse_pool = ParsePool()
+
+    async def close(self):
+        """Stop the parse pool workers"""
+        await self.parse_pool.close()
 
-    def _cache_key(self, query: str) -> str:
-        """Generate cache key for search query"""
-        return hashlib.md5(query.lower().encode()).hexdigest()
+    def _cache_key(self, queries: List[str]) -> str:
+        """Generate an order-insensitive cache key for a list of search queries"""
+        normalized = sorted({" ".join(query.lower().split()) for query in queries})
+        return hashlib.md5("\x1f".join(normalized).encode()).hexdigest()
 
-    def _is_cache_valid(self, cache_entry: Dict) -> bool:
-        """Check if cache entry is still valid"""
-        return time.time() - cache_entry['timestamp'] < self.cache_ttl
+    def _ranked(self, cache_key: str, results: ResultBatch, queries: List[str], price_range: Optional[Dict[str, Any]],
+                profile: Optional[RankingProfile], top_k: Optional[int], fresh: bool = False) -> ResultBatch:
+        """
+        Rank results through ranking_cache, so a repeated request gets the same
+        ranked batch and records back. Fresh results always replace the ranking.
+        """
+        key = (cache_key, ranking_key(queries, profile, price_range, top_k))
+        ranked = None if fresh else self.ranking_cache.get(key)
+        if ranked is None:
+            ranked = rank_results(results, queries, profile, price_range, top_k)
+            # Built before caching so the entry size includes them
+            ranked.records()
+            self.ranking_cache.set(key, ranked)
+        return ranked
 
     @lru_cache(maxsize=128)
     def _categorize_product(self, query: str) -> str:
@@ -77,7 +139,7 @@ class SearchService:
         
         return 'general'
 
-    def _generate_enhanced_mock_results(self, query: str) -> List[SearchResult]:
+    def _generate_enhanced_mock_results(self, query: str) -> ResultBatch:
         """Generate more sophisticated mock search results"""
         category = self._categorize_product(query)
         base_price = self._estimate_base_price(query)
@@ -100,7 +162,7 @@ class SearchService:
             {'name': 'Newegg', 'reliability': 0.9, 'price_factor': 1.03}
         ]
         
-        results = []
+        results = ResultBatch()
         
         for i, variation in enumerate(variations[:4]):  # Limit to 4 results
             source = sources[i % len(sources)]
@@ -122,7 +184,7 @@ class SearchService:
             image_urls = self._get_category_images(category)
             image_url = image_urls[i % len(image_urls)]
             
-            result = SearchResult(
+            results.append(
                 title=f"{query} {variation['suffix']}",
                 price=round(variant_price, 2),
                 currency="USD",
@@ -138,7 +200,6 @@ class SearchService:
                 features=features,
                 discount_percentage=round(discount_pct, 0) if discount_pct > 5 else None
             )
-            results.append(result)
         
         return results
 
@@ -225,218 +286,195 @@ class SearchService:
         
         return image_sets.get(category, image_sets['electronics'])
 
-    async def search_multiple_sources(self, queries: List[str]) -> List[SearchResult]:
-        """Enhanced search with caching and better result generation"""
-        # Check cache first
-        cache_key = self._cache_key(str(queries))
-        if cache_key in self.search_cache and self._is_cache_valid(self.search_cache[cache_key]):
+    async def search_multiple_sources(self, queries: List[str], price_range: Optional[Dict[str, Any]] = None,
+                                      profile: Optional[RankingProfile] = None,
+                                      top_k: Optional[int] = None,
+                                      priority: Priority = Priority.INTERACTIVE) -> ResultBatch:
+        """Enhanced search with caching and better result generation, ranked best first"""
+        # Check cache first; it holds deduplicated results, ranked per profile and range on the way out
+        cache_key = self._cache_key(queries)
+        cached_results = self.search_cache.get(cache_key)
+        if cached_results is not None:
             logging.info(f"Returning cached results for queries: {queries}")
-            return self.search_cache[cache_key]['results']
+            return self._ranked(cache_key, cached_results, queries, price_range, profile, top_k)
         
-        all_results = []
+        all_results = ResultBatch()
         
         # Enhanced mock search with better data
         for query in queries:
-            enhanced_results = self._generate_enhanced_mock_results(query)
-            all_results.extend(enhanced_results)
+            all_results.extend(self._generate_enhanced_mock_results(query))
         
         # Try real web search as fallback/supplement
         try:
             search_tasks = []
             for query in queries[:2]:  # Limit real searches
-                search_tasks.append(self.search_web_general(query))
+                search_tasks.append(self.search_web_general(query, priority))
             
-            # Execute searches with throttling
+            # Execute searches; the scheduler paces them per host
             results = await asyncio.gather(*search_tasks, return_exceptions=True)
             
             for result in results:
-                if isinstance(result, list):
-                    all_results.extend(result[:2])  # Limit results per source
+                if isinstance(result, ResultBatch):
+                    all_results.extend(result.head(2))  # Limit results per source
                 elif isinstance(result, Exception):
                     logging.warning(f"Search failed: {result}")
         except Exception as e:
             logging.warning(f"Real search failed, using mock data only: {e}")
         
-        # Deduplicate and sort results
+        # Deduplicate and cache; ranking depends on the caller's profile and price range
         unique_results = self.deduplicate_results(all_results)
-        sorted_results = self._sort_results_by_relevance(unique_results, queries)
-        
-        # Cache results
-        self.search_cache[cache_key] = {
-            'results': sorted_results,
-            'timestamp': time.time()
-        }
+        self.search_cache.set(cache_key, unique_results)
         
-        return sorted_results
+        return self._ranked(cache_key, unique_results, queries, price_range, profile, top_k, fresh=True)
 
-    def _sort_results_by_relevance(self, results: List[SearchResult], queries: List[str]) -> List[SearchResult]:
-        """Sort results by relevance score"""
-        def calculate_relevance(result: SearchResult) -> float:
-            score = 0.0
-            
-            # Title relevance
-            for query in queries:
-                if query.lower() in result.title.lower():
-                    score += 10
-            
-            # Rating contribution
-            if result.rating:
-                score += result.rating * 2
-            
-            # Availability bonus
-            if result.availability:
-                score += 5
-            
-            # Brand recognition (higher score for known brands)
-            known_brands = ['Apple', 'Samsung', 'Sony', 'Bose', 'Dyson']
-            if result.brand and result.brand in known_brands:
-                score += 3
-            
-            # Discount bonus
-            if result.discount_percentage and result.discount_percentage > 10:
-                score += 2
-            
-            return score
-        
-        return sorted(results, key=calculate_relevance, reverse=True)
-
-    async def search_shopping_apis(self, query: str) -> List[SearchResult]:
+    async def search_shopping_apis(self, query: str) -> ResultBatch:
         """Enhanced shopping API search with better mock data"""
-        await self.throttler.acquire()
-        
         try:
             return self._generate_enhanced_mock_results(query)
         except Exception as e:
             logging.error(f"Shopping API search failed: {e}")
-            return []
+            return ResultBatch()
 
-    async def search_web_general(self, query: str) -> List[SearchResult]:
+    async def search_web_general(self, query: str, priority: Priority = Priority.INTERACTIVE) -> ResultBatch:
         """Enhanced general web search"""
-        await self.throttler.acquire()
-        
+        start = time.perf_counter()
         try:
             # Use DuckDuckGo HTML search (respects robots.txt)
             search_url = f"https://html.duckduckgo.com/html/?q={query} buy online store price"
             
-            async with httpx.AsyncClient(headers=self.headers, timeout=15.0) as client:
-                response = await client.get(search_url)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                # Parse search results with better extraction
-                for result_div in soup.find_all('div', class_='result')[:3]:  # Limit results
-                    try:
-                        title_elem = result_div.find('a', class_='result__a')
-                        if not title_elem:
-                            continue
-                            
-                        title = title_elem.get_text(strip=True)
-                        url = title_elem.get('href', '')
-                        
-                        # Extract description
-                        desc_elem = result_div.find('a', class_='result__snippet')
-                        description = desc_elem.get_text(strip=True) if desc_elem else ""
-                        
-                        # Enhanced price extraction
-                        price = self.extract_price_from_text(f"{title} {description}")
-                        if not price:
-                            price = self._estimate_base_price(query)
-                        
-                        # Generate realistic supplementary data
-                        rating = round(random.uniform(3.5, 4.8), 1)
-                        review_count = random.randint(50, 2000)
-                        
-                        results.append(SearchResult(
-                            title=title,
-                            price=price,
-                            currency="USD",
-                            source=urlparse(url).netloc if url else "Web Store",
-                            url=url,
-                            image_url=random.choice(self._get_category_images(self._categorize_product(query))),
-                            description=description,
-                            rating=rating,
-                            review_count=review_count,
-                            category=self._categorize_product(query),
-                            brand=self._generate_brand(self._categorize_product(query)),
-                            features=self._generate_features(self._categorize_product(query), 'Standard')
-                        ))
-                        
-                    except Exception as e:
-                        logging.warning(f"Failed to parse search result: {e}")
-                        continue
-                
-                return results
+            async with self.scheduler.slot(search_url, priority):
+                async with httpx.AsyncClient(headers=self.headers, timeout=15.0) as client:
+                    response = await client.get(search_url)
+                    response.raise_for_status()
+            
+            results = ResultBatch()
+            
+            # Only the first result blocks are parsed (limit results)
+            listings = await self.parse_pool.run(parse_search_results, response.content, 3, response.charset_encoding)
+            
+            # Prices for all snippets in one pass
+            prices = extract_prices(f"{title} {description}" for title, _, description in listings)
+            
+            for (title, url, description), extracted in zip(listings, prices):
+                try:
+                    if extracted:
+                        price, currency = extracted
+                    else:
+                        price, currency = self._estimate_base_price(query), "USD"
+                    
+                    # Generate realistic supplementary data
+                    rating = round(random.uniform(3.5, 4.8), 1)
+                    review_count = random.randint(50, 2000)
+                    
+                    results.append(
+                        title=title,
+                        price=price,
+                        currency=currency,
+                        source=urlparse(url).netloc if url else "Web Store",
+                        url=url,
+                        image_url=random.choice(self._get_category_images(self._categorize_product(query))),
+                        description=description,
+                        rating=rating,
+                        review_count=review_count,
+                        category=self._categorize_product(query),
+                        brand=self._generate_brand(self._categorize_product(query)),
+                        features=self._generate_features(self._categorize_product(query), 'Standard')
+                    )
+                    
+                except Exception as e:
+                    logging.warning(f"Failed to parse search result: {e}")
+                    continue
+            
+            return results
                 
+        except QueueTimeout as e:
+            # DuckDuckGo is backed up; the search goes ahead without its supplementary results
+            logging.warning(f"Skipping web search: {e}")
+            return ResultBatch()
         except Exception as e:
             logging.error(f"Web search failed: {e}")
-            return []
+            metrics.inc("scrape_errors_total", "duckduckgo")
+            return ResultBatch()
+        finally:
+            metrics.observe("scrape_duration_seconds", time.perf_counter() - start, "duckduckgo")
 
-    async def search_comparison_sites(self, query: str) -> List[SearchResult]:
+    async def search_comparison_sites(self, query: str) -> ResultBatch:
         """Enhanced comparison site search"""
-        await self.throttler.acquire()
-        
         try:
-            return self._generate_enhanced_mock_results(query)[:2]  # Limit comparison results
+            return self._generate_enhanced_mock_results(query).head(2)  # Limit comparison results
         except Exception as e:
             logging.error(f"Comparison site search failed: {e}")
-            return []
+            return ResultBatch()
 
     def extract_price_from_text(self, text: str) -> Optional[float]:
-        """Enhanced price extraction with better patterns"""
-        # Enhanced price patterns
-        patterns = [
-            r'\$\s*(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',  # $1,234.56
-            r'(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)\s*dollars?',  # 1234.56 dollars
-            r'USD\s*(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',  # USD 1234.56
-            r'Price:?\s*\$?(\d{1,4}(?:,\d{3})*(?:\.\d{2})?)',  # Price: $1234.56
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                try:
-                    price = float(matches[0].replace(',', ''))
-                    if 5 <= price <= 20000:  # Reasonable price range
-                        return price
-                except (ValueError, AttributeError):
-                    continue
-        
-        return None
+        """First plausible price in the text, in any supported currency or locale format"""
+        extracted = extract_price(text)
+        return extracted.amount if extracted else None
+
+    def deduplicate_results(self, results: ResultBatch) -> ResultBatch:
+        """
+        Drop near-duplicates: results whose title word overlap exceeds 70% and
+        whose price differs by less than 10% from an already kept result.
+
+        Uses prefix filtering over an inverted index: titles are ordered
+        rarest-word-first, and two titles overlapping by more than 70% must share
+        a word within their short prefixes. Only the prefixes are indexed, per
+        price bucket, so each candidate is checked against a handful of kept
+        results instead of all of them.
+        """
+        if not len(results):
+            return results
+
+        titles = [frozenset(title.lower().split()) for title in results.title]
+        word_counts = Counter(word for words in titles for word in words)
+        # Unknown prices compare as 0, like None did
+        prices = np.nan_to_num(results.numeric("price")).tolist()
+
+        unique_results: List[int] = []
+        kept_titles: List[frozenset] = []
+        kept_prices: List[float] = []
+        # price bucket -> word -> indices of kept results whose prefix holds that word
+        index: Dict[int, Dict[str, List[int]]] = {}
+
+        for position, (title_words, price) in enumerate(zip(titles, prices)):
+            bucket = _price_bucket(price)
+            prefix = _title_prefix(title_words, word_counts)
 
-    def deduplicate_results(self, results: List[SearchResult]) -> List[SearchResult]:
-        """Enhanced deduplication with similarity scoring"""
-        if not results:
-            return []
-        
-        unique_results = []
-        seen_combinations = set()
-        
-        for result in results:
-            # Create a signature based on title and price
-            title_words = set(result.title.lower().split())
-            signature = (
-                frozenset(title_words),
-                result.price,
-                result.source
-            )
-            
-            # Check for similar existing results
             is_duplicate = False
-            for seen_sig in seen_combinations:
-                title_overlap = len(signature[0].intersection(seen_sig[0])) / max(len(signature[0]), len(seen_sig[0]))
-                price_diff = abs((signature[1] or 0) - (seen_sig[1] or 0)) / max(signature[1] or 1, seen_sig[1] or 1)
-                
-                if title_overlap > 0.7 and price_diff < 0.1:
-                    is_duplicate = True
+            checked = set()
+            for neighbour in (bucket - 1, bucket, bucket + 1):
+                postings = index.get(neighbour)
+                if not postings:
+                    continue
+                for word in prefix:
+                    for kept in postings.get(word, ()):
+                        if kept in checked:
+                            continue
+                        checked.add(kept)
+
+                        seen_words = kept_titles[kept]
+                        title_overlap = len(title_words & seen_words) / max(len(title_words), len(seen_words))
+                        seen_price = kept_prices[kept]
+                        price_diff = abs((price or 0) - (seen_price or 0)) / max(price or 1, seen_price or 1)
+
+                        if title_overlap > 0.7 and price_diff < 0.1:
+                            is_duplicate = True
+                            break
+                    if is_duplicate:
+                        break
+                if is_duplicate:
                     break
-            
+
             if not is_duplicate:
-                seen_combinations.add(signature)
-                unique_results.append(result)
-        
-        return unique_results
+                kept = len(unique_results)
+                unique_results.append(position)
+                kept_titles.append(title_words)
+                kept_prices.append(price)
+                postings = index.setdefault(bucket, {})
+                for word in prefix:
+                    postings.setdefault(word, []).append(kept)
+
+        return results.take(unique_results)
 
     def titles_similar(self, title1: str, title2: str, threshold: float = 0.8) -> bool:
         """Check if two titles are similar using simple word overlap"""
@@ -451,93 +489,53 @@ class SearchService:
         
         return similarity >= threshold
 
-    async def get_product_details(self, url: str) -> Dict[str, Any]:
+    async def get_product_details(self, url: str, priority: Priority = Priority.INTERACTIVE) -> Dict[str, Any]:
         """Scrape detailed product information from a specific URL"""
-        await self.throttler.acquire()
+        cached = await self.page_cache.get(url)
+        if cached is not None and cached.fresh:
+            self.page_cache.record("hit")
+            return cached.details
         
+        start = time.perf_counter()
         try:
-            async with httpx.AsyncClient(headers=self.headers, timeout=15.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Extract structured data (JSON-LD)
-                structured_data = self.extract_structured_data(soup)
-                
-                # Extract meta information
-                meta_info = self.extract_meta_info(soup)
-                
-                # Combine and return product details
-                return {
-                    "structured_data": structured_data,
-                    "meta_info": meta_info,
-                    "page_title": soup.title.string if soup.title else "",
-                    "images": self.extract_images(soup, url)
-                }
-                
+            host = urlparse(url).hostname or ""
+            async with self.scheduler.slot(url, priority):
+                async with httpx.AsyncClient(headers=self.headers, timeout=15.0) as client:
+                    response = await client.get(url, headers=cached.conditional_headers() if cached else None)
+                    if response.status_code != 304 or cached is None:
+                        response.raise_for_status()
+            
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            if response.status_code == 304:
+                # Unchanged since we cached it: no body to download or parse
+                self.page_cache.record("revalidated")
+                await self.page_cache.touch(url, host, etag, last_modified)
+                return cached.details
+            
+            # JSON-LD product data, meta tags, title and product images in one pass
+            details = await self.parse_pool.run(parse_product_page, response.content, url, response.charset_encoding)
+            self.page_cache.record("miss")
+            if "no-store" not in response.headers.get("Cache-Control", ""):
+                await self.page_cache.set(url, host, details, etag, last_modified)
+            elif cached is not None:
+                # Its validators no longer describe anything we may keep
+                await self.page_cache.delete(url)
+            return details
+            
         except Exception as e:
             logging.error(f"Failed to get product details from {url}: {e}")
+            metrics.inc("scrape_errors_total", "product_page")
+            status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+            if status in GONE_STATUSES and cached is not None:
+                # The product page is gone; so are its details
+                await self.page_cache.delete(url)
+            elif cached is not None and _retailer_failing(e):
+                # Stale details beat none while the retailer is failing
+                self.page_cache.record("stale")
+                return cached.details
             return {}
-
-    def extract_structured_data(self, soup: BeautifulSoup) -> Dict[str, Any]:
-        """Extract JSON-LD structured data"""
-        structured_data = {}
-        
-        # Look for JSON-LD scripts
-        scripts = soup.find_all('script', type='application/ld+json')
-        for script in scripts:
-            try:
-                data = json.loads(script.string)
-                if isinstance(data, dict) and data.get('@type') == 'Product':
-                    structured_data = data
-                    break
-            except (json.JSONDecodeError, AttributeError):
-                continue
-        
-        return structured_data
-
-    def extract_meta_info(self, soup: BeautifulSoup) -> Dict[str, Any]:
-        """Extract meta tag information"""
-        meta_info = {}
-        
-        # Common meta tags for products
-        meta_tags = [
-            'og:title', 'og:description', 'og:price:amount', 
-            'og:price:currency', 'og:image', 'product:price:amount',
-            'product:price:currency', 'twitter:title', 'twitter:description'
-        ]
-        
-        for tag_name in meta_tags:
-            meta_tag = soup.find('meta', {'property': tag_name}) or soup.find('meta', {'name': tag_name})
-            if meta_tag and meta_tag.get('content'):
-                meta_info[tag_name] = meta_tag['content']
-        
-        return meta_info
-
-    def extract_images(self, soup: BeautifulSoup, base_url: str) -> List[str]:
-        """Extract product images from page"""
-        images = []
-        
-        # Look for common image selectors
-        image_selectors = [
-            'img[data-src*="product"]',
-            'img[src*="product"]', 
-            '.product-image img',
-            '#product-image img',
-            '.gallery img'
-        ]
-        
-        for selector in image_selectors:
-            img_elements = soup.select(selector)
-            for img in img_elements[:5]:  # Limit to 5 images
-                src = img.get('data-src') or img.get('src')
-                if src:
-                    full_url = urljoin(base_url, src)
-                    if full_url not in images:
-                        images.append(full_url)
-        
-        return images
+        finally:
+            metrics.observe("scrape_duration_seconds", time.perf_counter() - start, "product_page")
 
 # Global search service instance
-search_service = SearchService() 
\ No newline at end of file
+search_service = SearchService() 
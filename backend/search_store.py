@@ -0,0 +1,127 @@
+import json
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import SearchHistory, SearchPayload
+
+# Payload parts making up the old search_results shape; a "digest" part holds the chat context
+PAYLOAD_PARTS = ("analysis", "summary", "rounds")
+# Products copied into SearchHistory.top_products for listings
+TOP_PRODUCTS = 5
+
+
+def compress_payload(data: Any) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(",", ":"), default=str).encode(), 6)
+
+
+def decompress_payload(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+
+
+def _price(product: Dict[str, Any]) -> Optional[float]:
+    try:
+        price = float(product.get("price"))
+    except (TypeError, ValueError):
+        return None
+    return price if price > 0 else None
+
+
+def summarize_products(product_summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary column values for a product summary: count, top products and price range"""
+    products = product_summary.get("products") or []
+    prices = [price for price in (_price(product) for product in products) if price is not None]
+    return {
+        "results_count": len(products),
+        "top_products": [
+            {
+                "name": product.get("name"),
+                "price": _price(product),
+                "currency": product.get("currency", "USD"),
+                "source": product.get("source")
+            }
+            for product in products[:TOP_PRODUCTS]
+        ],
+        "price_min": min(prices) if prices else None,
+        "price_max": max(prices) if prices else None
+    }
+
+
+def is_legacy(search: SearchHistory) -> bool:
+    """Rows stored before the split have no summary columns and keep everything in search_results"""
+    return search.results_count is None
+
+
+async def save_search(db: AsyncSession, user_id: Optional[int], query: str, rounds: List[Dict[str, Any]],
+                      product_summary: Dict[str, Any], query_analysis: Dict[str, Any],
+                      chat_digest: Optional[Dict[str, Any]] = None) -> SearchHistory:
+    """Store a search as summary columns plus one compressed payload row per part and round"""
+    search = SearchHistory(
+        user_id=user_id,
+        query=query,
+        search_rounds=len(rounds),
+        **summarize_products(product_summary)
+    )
+    db.add(search)
+    await db.flush()
+
+    payloads = [
+        SearchPayload(search_id=search.id, part="analysis", position=0, data=compress_payload(query_analysis)),
+        SearchPayload(search_id=search.id, part="summary", position=0, data=compress_payload(product_summary))
+    ]
+    payloads.extend(
+        SearchPayload(search_id=search.id, part="round", position=position, data=compress_payload(search_round))
+        for position, search_round in enumerate(rounds, start=1)
+    )
+    if chat_digest is not None:
+        payloads.append(SearchPayload(search_id=search.id, part="digest", position=0, data=compress_payload(chat_digest)))
+    db.add_all(payloads)
+
+    await db.commit()
+    await db.refresh(search)
+    return search
+
+
+async def load_search_payload(db: AsyncSession, search: SearchHistory,
+                              parts: Iterable[str] = PAYLOAD_PARTS) -> Dict[str, Any]:
+    """
+    Fetch only the requested parts ("analysis", "summary", "rounds", "digest") of a stored search.
+
+    Returns the same shape the old search_results blob had, restricted to those keys.
+    """
+    parts = tuple(parts)
+    if is_legacy(search):
+        result = await db.execute(select(SearchHistory.search_results).where(SearchHistory.id == search.id))
+        blob = result.scalar() or {}
+        return {part: blob.get(part, [] if part == "rounds" else {}) for part in parts}
+
+    stored_parts = ["round" if part == "rounds" else part for part in parts]
+    result = await db.execute(
+        select(SearchPayload.part, SearchPayload.data).where(
+            SearchPayload.search_id == search.id,
+            SearchPayload.part.in_(stored_parts)
+        ).order_by(SearchPayload.part, SearchPayload.position)
+    )
+
+    payload: Dict[str, Any] = {part: [] if part == "rounds" else {} for part in parts}
+    for part, data in result:
+        if part == "round":
+            payload["rounds"].append(decompress_payload(data))
+        else:
+            payload[part] = decompress_payload(data)
+    return payload
+
+
+async def legacy_summaries(db: AsyncSession, search_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Summary column values computed from the blobs of pre-split rows"""
+    if not search_ids:
+        return {}
+    result = await db.execute(
+        select(SearchHistory.id, SearchHistory.search_results).where(SearchHistory.id.in_(search_ids))
+    )
+    return {
+        search_id: summarize_products((blob or {}).get("summary") or {})
+        for search_id, blob in result
+    }
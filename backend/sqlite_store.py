@@ -0,0 +1,54 @@
+import sqlite3
+import threading
+from typing import Callable, Optional, Sequence
+
+
+class SQLiteStore:
+    """
+    Local SQLite file in WAL mode, shared by every worker process on the host
+    and kept across restarts. Used from worker threads via asyncio.to_thread.
+
+    Each thread gets its own connection, as to_thread may run a caller on any
+    pool thread. The schema statements run once per process, and prune, when
+    given, is called every prune_every writes to keep the file bounded.
+    """
+
+    def __init__(self, path: str, schema: Sequence[str], synchronous: str = "NORMAL",
+                 prune: Optional[Callable[[sqlite3.Connection], None]] = None, prune_every: int = 100):
+        self.path = path
+        self.schema = schema
+        self.synchronous = synchronous
+        self.prune = prune
+        self.prune_every = prune_every
+
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._writes_since_prune = 0
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, with the schema in place"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    for statement in self.schema:
+                        conn.execute(statement)
+                    self._initialized = True
+        return conn
+
+    def wrote(self, conn: sqlite3.Connection):
+        """Count a write made on conn, pruning once prune_every have piled up"""
+        if self.prune is None:
+            return
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= self.prune_every:
+            self._writes_since_prune = 0
+            self.prune(conn)
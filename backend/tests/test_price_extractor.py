@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+from price_extractor import ExtractedPrice, extract_price, extract_prices, parse_number
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "price_corpus.jsonl")
+
+with open(CORPUS_PATH, encoding="utf-8") as f:
+    CORPUS = [json.loads(line) for line in f if line.strip()]
+
+
+def _expected(case):
+    return None if case["currency"] is None else ExtractedPrice(case["amount"], case["currency"])
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["text"][:40] for case in CORPUS])
+def test_corpus(case):
+    assert extract_price(case["text"]) == _expected(case)
+
+
+def test_batch_matches_single():
+    assert extract_prices(case["text"] for case in CORPUS) == [_expected(case) for case in CORPUS]
+
+
+@pytest.mark.parametrize("text, expected", [
+    # A plain dollar amount wins over earlier prices in other currencies
+    ("Approx. €45 / $49.99 shipped", ExtractedPrice(49.99, "USD")),
+    ("Price: 449,00 € (about $485)", ExtractedPrice(485.0, "USD")),
+    # Implausible dollar amounts are skipped, not taken
+    ("Kindle Paperwhite $3 off, now $139.99", ExtractedPrice(139.99, "USD")),
+    ("$2 coupon, 59,90 €", ExtractedPrice(59.9, "EUR")),
+    # Other dollars are not plain dollars
+    ("Gaming mouse C$ 89.99", ExtractedPrice(89.99, "CAD")),
+    ("A$129.00 incl. GST", ExtractedPrice(129.0, "AUD")),
+    ("US$ 1,299.00", ExtractedPrice(1299.0, "USD")),
+])
+def test_dollar_first(text, expected):
+    assert extract_price(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1.299,99 €", ExtractedPrice(1299.99, "EUR")),
+    ("12,99 EUR", ExtractedPrice(12.99, "EUR")),
+    ("£1,049.00", ExtractedPrice(1049.0, "GBP")),
+    ("CHF 1'234.50", ExtractedPrice(1234.5, "CHF")),
+    ("1 299,00 zł", ExtractedPrice(1299.0, "PLN")),
+    ("₹1,23,456", ExtractedPrice(123456.0, "INR")),
+    ("¥15,800", ExtractedPrice(15800.0, "JPY")),
+    ("49.99USD", ExtractedPrice(49.99, "USD")),
+    ("Price: 49.99", ExtractedPrice(49.99, "USD")),
+])
+def test_locales(text, expected):
+    assert extract_price(text) == expected
+
+
+def test_default_currency_for_labelled_numbers():
+    assert extract_price("Price: 79.00", default_currency="GBP") == ExtractedPrice(79.0, "GBP")
+
+
+@pytest.mark.parametrize("text", [
+    "Galaxy S24 Ultra 512GB",
+    "Visit EUROPE 2024 edition",
+    "4.5 out of 5 stars, 12,345 reviews",
+])
+def test_no_price(text):
+    assert extract_price(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,234.56", 1234.56), ("1.234,56", 1234.56), ("1 234,56", 1234.56), ("1'234.56", 1234.56),
+    ("12,99", 12.99), ("1,23,456", 123456.0), ("1.299", 1299.0), ("1,2,3", None),
+])
+def test_parse_number(text, expected):
+    assert parse_number(text) == expected
@@ -0,0 +1,243 @@
+import heapq
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, Product, SearchHistory, SearchPayload, UserInteraction
+from search_store import decompress_payload
+
+logger = logging.getLogger(__name__)
+
+# Weight of one event by interaction type; unknown types count as a view
+EVENT_WEIGHTS = {"view": 1.0, "search": 1.0, "click": 2.0, "like": 4.0, "share": 4.0, "add_to_cart": 6.0, "purchase": 8.0}
+# Decay exponent at which counters are rescaled to a new landmark, well inside float range
+_RESCALE_EXPONENT = 50.0
+
+
+class SpaceSaving:
+    """
+    Space-saving heavy hitters over weighted increments.
+
+    At most `capacity` keys are counted. A new key arriving when full takes
+    over the smallest counter and inherits its count as error, so a key
+    whose true weight exceeds total / capacity is always kept and no count
+    is underestimated by more than its error.
+    """
+
+    __slots__ = ("capacity", "counts", "errors", "_heap")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, float] = {}
+        self.errors: Dict[Hashable, float] = {}
+        self._heap: List[Tuple[float, Hashable]] = []  # (count, key), with stale entries skipped lazily
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def add(self, key: Hashable, weight: float) -> Optional[Hashable]:
+        """Count weight for key; returns the key evicted to make room, if any"""
+        evicted = None
+        if key in self.counts:
+            self.counts[key] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0.0
+        else:
+            evicted, floor = self._pop_min()
+            self.counts[key] = floor + weight
+            self.errors[key] = floor
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, key) for key, count in self.counts.items()]
+            heapq.heapify(self._heap)
+        return evicted
+
+    def _pop_min(self) -> Tuple[Hashable, float]:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                del self.counts[key]
+                del self.errors[key]
+                return key, count
+
+    def scale(self, factor: float):
+        for key in self.counts:
+            self.counts[key] *= factor
+            self.errors[key] *= factor
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k: int) -> List[Tuple[Hashable, float]]:
+        return heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])
+
+
+class TrendingEngine:
+    """
+    Exponentially time-decayed popularity of products, categories and search
+    queries, updated as interactions and searches arrive.
+
+    Uses forward decay: an event at time t adds weight * e^(λ(t - landmark)),
+    so stored counters never need touching as time passes; dividing by
+    e^(λ(now - landmark)) at read time gives each key's weight with a
+    half-life of `half_life` seconds. Decay scales every counter alike, so
+    it never changes their order. Counters live in bounded space-saving
+    summaries, and the ranked lists are rebuilt at most once per
+    `refresh_interval`, so a read only slices the first k entries.
+
+    Counters are per process; each worker replays the recent tables once at
+    startup, then counts the events it handles itself.
+    """
+
+    def __init__(self, half_life: Optional[float] = None, capacity: Optional[int] = None,
+                 refresh_interval: Optional[float] = None, max_results: int = 100):
+        self.half_life = half_life or float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24")) * 3600
+        self.capacity = capacity or int(os.getenv("TRENDING_CAPACITY", "2000"))
+        self.refresh_interval = (refresh_interval if refresh_interval is not None
+                                 else float(os.getenv("TRENDING_REFRESH_SECONDS", "2")))
+        self.max_results = max_results
+        self.decay_rate = math.log(2) / self.half_life
+        self.landmark = time.time()
+
+        self.products = SpaceSaving(self.capacity)
+        self.categories = SpaceSaving(max(self.capacity // 10, 16))
+        self.queries = SpaceSaving(self.capacity)
+        # Per-category product summaries, only for categories the category summary keeps
+        self.category_products: Dict[str, SpaceSaving] = {}
+        self.product_categories: Dict[int, str] = {}
+
+        self._ranked: Dict[Tuple[str, Optional[str]], List[Tuple[Hashable, float]]] = {}
+        self._ranked_at = 0.0
+
+    def _summaries(self) -> List[SpaceSaving]:
+        return [self.products, self.categories, self.queries, *self.category_products.values()]
+
+    def _weight(self, weight: float, at: Optional[float]) -> float:
+        """Forward-decayed weight of an event at `at` (epoch seconds, default now)"""
+        at = time.time() if at is None else at
+        exponent = self.decay_rate * (at - self.landmark)
+        if exponent > _RESCALE_EXPONENT:
+            factor = math.exp(-exponent)
+            for summary in self._summaries():
+                summary.scale(factor)
+            self.landmark = at
+            exponent = 0.0
+        return weight * math.exp(exponent)
+
+    def _decay_now(self) -> float:
+        return math.exp(-self.decay_rate * (time.time() - self.landmark))
+
+    def record_interaction(self, interaction_type: Optional[str], product_id: Optional[int] = None,
+                           category: Optional[str] = None, at: Optional[float] = None):
+        weight = self._weight(EVENT_WEIGHTS.get((interaction_type or "").lower(), 1.0), at)
+        if product_id is not None:
+            evicted = self.products.add(product_id, weight)
+            if evicted is not None:
+                self.product_categories.pop(evicted, None)
+            if category:
+                self.product_categories[product_id] = category
+            category = category or self.product_categories.get(product_id)
+        if category:
+            self._add_category(category, weight, product_id)
+
+    def record_search(self, query: str, category: Optional[str] = None, at: Optional[float] = None):
+        weight = self._weight(EVENT_WEIGHTS["search"], at)
+        normalized = " ".join(query.lower().split())
+        if normalized:
+            self.queries.add(normalized, weight)
+        if category and category != "general":
+            self._add_category(category, weight, None)
+
+    def _add_category(self, category: str, weight: float, product_id: Optional[int]):
+        category = category.lower()
+        evicted = self.categories.add(category, weight)
+        if evicted is not None:
+            self.category_products.pop(evicted, None)
+        if product_id is not None:
+            summary = self.category_products.get(category)
+            if summary is None:
+                summary = self.category_products[category] = SpaceSaving(max(self.capacity // 4, 16))
+            summary.add(product_id, weight)
+
+    def _ranking(self, kind: str, category: Optional[str] = None) -> List[Tuple[Hashable, float]]:
+        """Top max_results of a summary with current decayed weights, rebuilt at most every refresh_interval"""
+        now = time.monotonic()
+        if now - self._ranked_at > self.refresh_interval:
+            self._ranked, self._ranked_at = {}, now
+        key = (kind, category)
+        ranked = self._ranked.get(key)
+        if ranked is None:
+            if kind == "products" and category:
+                summary = self.category_products.get(category.lower())
+            else:
+                summary = getattr(self, kind)
+            decay = self._decay_now()
+            ranked = [(item, count * decay) for item, count in summary.top(self.max_results)] if summary else []
+            self._ranked[key] = ranked
+        return ranked
+
+    def top_products(self, k: int = 20, category: Optional[str] = None) -> List[Tuple[int, float]]:
+        """(product id, decayed weight) of the k most engaged-with products, optionally in one category"""
+        return self._ranking("products", category)[:k]
+
+    def top_categories(self, k: int = 10) -> List[Tuple[str, float]]:
+        return self._ranking("categories")[:k]
+
+    def top_queries(self, k: int = 10) -> List[Tuple[str, float]]:
+        return self._ranking("queries")[:k]
+
+    async def warm_up(self, max_events: int = 50000):
+        """Replay recent interactions and searches (the last few half-lives) into the counters"""
+        since = datetime.utcnow() - timedelta(seconds=4 * self.half_life)
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            interactions = (await db.execute(
+                select(UserInteraction.interaction_type, UserInteraction.product_id, Product.category,
+                       UserInteraction.created_at)
+                .outerjoin(Product, Product.id == UserInteraction.product_id)
+                .where(UserInteraction.created_at >= since)
+                .order_by(UserInteraction.created_at.desc()).limit(max_events)
+            )).all()
+            searches = (await db.execute(
+                select(SearchHistory.query, SearchPayload.data, SearchHistory.created_at)
+                .outerjoin(SearchPayload, (SearchPayload.search_id == SearchHistory.id) & (SearchPayload.part == "analysis"))
+                .where(SearchHistory.created_at >= since)
+                .order_by(SearchHistory.created_at.desc()).limit(max_events)
+            )).all()
+
+        for interaction_type, product_id, category, created_at in reversed(interactions):
+            self.record_interaction(interaction_type, product_id, category, at=_epoch(created_at))
+        for query, analysis, created_at in reversed(searches):
+            category = None
+            if analysis is not None:
+                try:
+                    category = decompress_payload(analysis).get("category")
+                except Exception:
+                    pass
+            self.record_search(query or "", category, at=_epoch(created_at))
+        logger.info(f"Trending counters warmed from {len(interactions)} interactions and {len(searches)} searches "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "half_life_hours": round(self.half_life / 3600, 2),
+            "products": len(self.products),
+            "categories": len(self.categories),
+            "queries": len(self.queries),
+        }
+
+
+def _epoch(created_at: Optional[datetime]) -> Optional[float]:
+    """Epoch seconds of a naive UTC timestamp"""
+    if created_at is None:
+        return None
+    return (created_at - datetime(1970, 1, 1)).total_seconds()
+
+
+# Global trending engine
+trending_engine = TrendingEngine()